@@ -1,13 +1,44 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+from utils import versioned_cache
+from result_viewer import result_viewer
+from row_selection import selection_caption
 
-def advanced_querying_section(data):
+def query_positions(data, query):
+    """Row positions matching a query, cached per dataset version; no rows are copied"""
+    cache = versioned_cache('query_positions', data)
+    
+    if query not in cache:
+        mask = data.eval(query)
+        # Only boolean masks; other results (numbers, text) would be truth-cast
+        if not isinstance(mask, pd.Series) or not pd.api.types.is_bool_dtype(mask.dtype):
+            raise ValueError("The query must produce a boolean mask (True/False per row)")
+        cache[query] = np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+    
+    return cache[query]
+
+def advanced_querying_section(data, positions=None):
     st.markdown("### Advanced Querying")
+    selection_caption(data, positions)
     
     query = st.text_area("Enter your SQL-like query:")
     if st.button("Run Query"):
-        try:
-            result = data.query(query)
-            st.write(result)
-        except Exception as e:
-            st.error(f"Error: {e}")
\ No newline at end of file
+        st.session_state.advanced_query = query
+    
+    # The last query stays shown while paging and sorting its result
+    query = st.session_state.get('advanced_query')
+    if not query:
+        return
+    
+    try:
+        matches = query_positions(data, query)
+    except Exception as e:
+        st.error(f"Error: {e}")
+        return
+    
+    # Both are sorted positions, so restricting to the filtered rows is a merge
+    if positions is not None:
+        matches = np.intersect1d(matches, positions, assume_unique=True)
+    
+    result_viewer(data, matches, key="query", file_name="query_result")
\ No newline at end of file
@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+# Total size of stored deltas before the oldest steps stop being undoable
+JOURNAL_MAX_MB = 256
+
+class FrameDelta:
+    """
+    Reversible difference between two consecutive versions of the cleaned data.
+    
+    Only what changed is kept: the dropped rows, the changed cells of each
+    column (old and new values), whole columns whose dtype changed, and
+    removed/added columns. Frames whose rows cannot be aligned by a unique
+    index fall back to storing both versions in full.
+    """
+    
+    def __init__(self, before, after):
+        self.before_columns = list(before.columns)
+        self.after_columns = list(after.columns)
+        self.before_dtypes = before.dtypes
+        self.n_before = len(before)
+        self.snapshot = None
+        self.dropped_positions = np.empty(0, dtype=np.intp)
+        self.dropped_rows = None
+        self.changed = {}
+        self.replaced = {}
+        self.removed = {}
+        self.added = {}
+        
+        if not _can_align(before, after):
+            self.snapshot = (before, after)
+            return
+        
+        kept = before
+        if not before.index.equals(after.index):
+            kept_mask = before.index.isin(after.index)
+            self.dropped_positions = np.flatnonzero(~kept_mask)
+            self.dropped_rows = before.iloc[self.dropped_positions]
+            kept = before[kept_mask]
+        
+        for col in self.before_columns:
+            if col not in after.columns:
+                self.removed[col] = kept[col]
+                continue
+            
+            old, new = kept[col], after[col]
+            if old.dtype != new.dtype:
+                self.replaced[col] = (old, new)
+                continue
+            
+            positions = changed_positions(old, new)
+            if len(positions):
+                self.changed[col] = (positions, old.iloc[positions], new.iloc[positions])
+        
+        for col in self.after_columns:
+            if col not in before.columns:
+                self.added[col] = after[col]
+    
+    def revert(self, after):
+        """Rebuild the earlier frame from the later one"""
+        if self.snapshot is not None:
+            return self.snapshot[0]
+        
+        frame = after.copy(deep=False)
+        for col, (old, _) in self.replaced.items():
+            frame[col] = old
+        for col, (positions, old, _) in self.changed.items():
+            frame[col] = _set_positions(frame[col], positions, old)
+        frame = frame.drop(columns=list(self.added))
+        for col, values in self.removed.items():
+            frame[col] = values
+        frame = frame[self.before_columns]
+        
+        if len(self.dropped_positions):
+            frame = self._reinsert_rows(frame)
+        return frame
+    
+    def apply(self, before):
+        """Rebuild the later frame from the earlier one (used for redo and replay)"""
+        if self.snapshot is not None:
+            return self.snapshot[1]
+        
+        frame = before
+        if len(self.dropped_positions):
+            frame = before.iloc[self._kept_positions()]
+        
+        frame = frame.drop(columns=list(self.removed))
+        for col, (_, new) in self.replaced.items():
+            frame[col] = new
+        for col, (positions, _, new) in self.changed.items():
+            frame[col] = _set_positions(frame[col], positions, new)
+        for col, values in self.added.items():
+            frame[col] = values
+        return frame[self.after_columns]
+    
+    def _kept_positions(self):
+        kept_mask = np.ones(self.n_before, dtype=bool)
+        kept_mask[self.dropped_positions] = False
+        return np.flatnonzero(kept_mask)
+    
+    def _reinsert_rows(self, frame):
+        """Put the dropped rows back at their original positions"""
+        combined = pd.concat([frame, self.dropped_rows])
+        order = np.empty(self.n_before, dtype=np.intp)
+        order[self._kept_positions()] = np.arange(len(frame))
+        order[self.dropped_positions] = len(frame) + np.arange(len(self.dropped_positions))
+        combined = combined.iloc[order]
+        
+        # Concatenation can widen dtypes (e.g. categories); restore the originals
+        for col, dtype in self.before_dtypes.items():
+            if combined[col].dtype != dtype:
+                combined[col] = combined[col].astype(dtype)
+        return combined
+    
+    def describe(self):
+        """Short human-readable summary of the change"""
+        if self.snapshot is not None:
+            return "full snapshot"
+        
+        parts = []
+        if len(self.dropped_positions):
+            parts.append(f"-{len(self.dropped_positions):,} rows")
+        cells = sum(len(positions) for positions, _, _ in self.changed.values())
+        if cells:
+            parts.append(f"{cells:,} cells")
+        if self.replaced:
+            parts.append(f"{len(self.replaced)} dtype changes")
+        if self.removed:
+            parts.append(f"-{len(self.removed)} columns")
+        if self.added:
+            parts.append(f"+{len(self.added)} columns")
+        return ", ".join(parts) if parts else "no changes"
+    
+    def nbytes(self):
+        """Memory held by this delta"""
+        stored = [self.dropped_rows, *self.removed.values(), *self.added.values()]
+        stored += [series for pair in self.replaced.values() for series in pair]
+        stored += [series for _, old, new in self.changed.values() for series in (old, new)]
+        if self.snapshot is not None:
+            stored += list(self.snapshot)
+        
+        total = self.dropped_positions.nbytes
+        total += sum(positions.nbytes for positions, _, _ in self.changed.values())
+        for item in stored:
+            if item is not None:
+                total += int(np.sum(item.memory_usage(deep=True)))
+        return total
+
+def _can_align(before, after):
+    """True if rows of after are a subset of before in the same order and labels are unique"""
+    if not (before.columns.is_unique and after.columns.is_unique):
+        return False
+    if before.index.equals(after.index):
+        return True
+    if not (before.index.is_unique and after.index.is_unique):
+        return False
+    return before.index[before.index.isin(after.index)].equals(after.index)
+
+def changed_positions(old, new):
+    """Positions where two aligned columns of the same dtype differ (missing == missing)"""
+    both_missing = (old.isna() & new.isna()).to_numpy()
+    try:
+        differs = old.ne(new).to_numpy(dtype=bool, na_value=True)
+    except (TypeError, ValueError):
+        # Values that cannot be compared elementwise, e.g. categoricals with other categories
+        differs = np.array([a is not b and a != b for a, b in zip(old, new)], dtype=bool)
+    return np.flatnonzero(differs & ~both_missing)
+
+def _set_positions(series, positions, values):
+    series = series.copy()
+    series.iloc[positions] = values.array
+    return series
+
+class CleaningJournal:
+    """
+    Undo/redo stack of cleaning steps, each stored as a FrameDelta.
+    When the deltas outgrow max_mb the oldest steps are forgotten; they stay
+    applied but can no longer be undone.
+    """
+    
+    def __init__(self, max_mb=JOURNAL_MAX_MB):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.done = []
+        self.undone = []
+        self.evicted = 0
+    
+    def record(self, before, after, entry):
+        """Store a new step; anything that was undone can no longer be redone"""
+        delta = FrameDelta(before, after)
+        entry['Change'] = delta.describe()
+        self.done.append({'entry': entry, 'delta': delta, 'nbytes': delta.nbytes()})
+        self.undone.clear()
+        self._evict()
+        return entry
+    
+    def undo(self, current):
+        """Return the frame before the last step and that step's history entry"""
+        step = self.done.pop()
+        self.undone.append(step)
+        return step['delta'].revert(current), step['entry']
+    
+    def redo(self, current):
+        """Re-apply the most recently undone step"""
+        step = self.undone.pop()
+        self.done.append(step)
+        return step['delta'].apply(current), step['entry']
+    
+    def replay(self, original, step):
+        """Rebuild the dataset as of step N by replaying deltas on the original"""
+        if self.evicted:
+            raise ValueError("The oldest steps were dropped from the journal and cannot be replayed")
+        
+        frame = original
+        for record in (self.done + self.undone[::-1])[:step]:
+            frame = record['delta'].apply(frame)
+        return frame
+    
+    def position(self):
+        """Number of steps currently applied"""
+        return self.evicted + len(self.done)
+    
+    def nbytes(self):
+        return sum(step['nbytes'] for step in self.done + self.undone)
+    
+    def _evict(self):
+        while len(self.done) > 1 and self.nbytes() > self.max_bytes:
+            self.done.pop(0)
+            self.evicted += 1
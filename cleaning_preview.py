@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+from cleaning_recipes import GROUP_STATISTICS, group_fill_values, parse_custom_value
+from type_optimizer import fill_with, widen_to_fit
+
+# Rows shown in a preview; at most PREVIEW_CHANGED_ROWS of them are rows the operation changes
+PREVIEW_ROWS = 10
+PREVIEW_CHANGED_ROWS = 6
+
+# Valid neighbours used on each side when previewing polynomial interpolation
+POLYNOMIAL_WINDOW = 10
+
+def sample_positions(changed_mask, size=PREVIEW_ROWS, changed_rows=PREVIEW_CHANGED_ROWS):
+    """
+    Pick a small, representative set of row positions: evenly spread rows that
+    the operation changes, topped up with unchanged rows for context.
+    """
+    changed = np.flatnonzero(changed_mask)
+    unchanged = np.flatnonzero(~changed_mask)
+    
+    n_changed = min(len(changed), changed_rows if len(unchanged) else size)
+    n_unchanged = min(len(unchanged), size - n_changed)
+    
+    picked = [
+        changed[np.linspace(0, len(changed) - 1, n_changed).astype(int)] if n_changed else changed[:0],
+        unchanged[np.linspace(0, len(unchanged) - 1, n_unchanged).astype(int)] if n_unchanged else unchanged[:0]
+    ]
+    return np.unique(np.concatenate(picked))
+
+def fill_parameters(data, column):
+    """Mean/median/mode of a column, computed once per dataset version"""
+    cache = versioned_cache('fill_parameters', data)
+    
+    if column not in cache:
+        col_data = data[column]
+        mode_val = col_data.mode()
+        params = {'mode': mode_val.iloc[0] if len(mode_val) > 0 else None}
+        if pd.api.types.is_numeric_dtype(col_data):
+            params['mean'] = col_data.mean()
+            params['median'] = col_data.median()
+        cache[column] = params
+    
+    return cache[column]
+
+def valid_positions(data, column):
+    """Positions of the non-null values in a column, computed once per dataset version"""
+    cache = versioned_cache('valid_positions', data)
+    
+    if column not in cache:
+        cache[column] = np.flatnonzero(data[column].notna().to_numpy())
+    
+    return cache[column]
+
+def group_fill_column(data, column, group_by, method):
+    """Per-row group statistic for a column, computed once per dataset version"""
+    cache = versioned_cache('group_fill_values', data)
+    key = (column, tuple(group_by), method)
+    
+    if key not in cache:
+        values = group_fill_values(data, [column], list(group_by), GROUP_STATISTICS[method])
+        cache[key] = values[column].to_numpy()
+    
+    return cache[key]
+
+def preview_fill(data, column, method, custom_value=None, size=PREVIEW_ROWS, group_by=None):
+    """
+    Evaluate a fill method on a sample of rows only.
+    Returns (before, after) frames of the sampled rows; for "Drop Rows" the
+    after frame holds only the rows that survive.
+    """
+    col_data = data[column]
+    null_mask = col_data.isna().to_numpy()
+    positions = sample_positions(null_mask, size)
+    before = data.iloc[positions][[column]]
+    
+    if method == "Drop Rows":
+        return before, before[~null_mask[positions]]
+    
+    sample = before[column]
+    sample_nulls = null_mask[positions]
+    params = fill_parameters(data, column)
+    
+    if group_by and method in GROUP_STATISTICS:
+        group_values = group_fill_column(data, column, group_by, method)[positions]
+        filled = fill_with(sample, pd.Series(group_values, index=sample.index))
+    elif method == "Mean":
+        filled = fill_with(sample, params['mean'])
+    elif method == "Median":
+        filled = fill_with(sample, params['median'])
+    elif method == "Mode":
+        filled = sample if params['mode'] is None else fill_with(sample, params['mode'])
+    elif method == "Custom Value":
+        filled = fill_with(sample, parse_custom_value(custom_value)) if custom_value else sample
+    elif method in ("Forward Fill", "Backward Fill", "Linear Interpolation"):
+        values = neighbour_fill(data, column, positions[sample_nulls], method)
+        filled = widen_to_fit(sample, values).copy()
+        filled.iloc[np.flatnonzero(sample_nulls)] = values
+    elif method == "Polynomial Interpolation":
+        values = [local_polynomial_fill(data, column, positions[i]) for i in np.flatnonzero(sample_nulls)]
+        filled = widen_to_fit(sample, values).copy()
+        filled.iloc[np.flatnonzero(sample_nulls)] = values
+    else:
+        filled = sample
+    
+    return before, filled.to_frame(column)
+
+def neighbour_fill(data, column, targets, method):
+    """Values forward/backward fill or linear interpolation would put at the target positions"""
+    values = data[column]
+    valid = valid_positions(data, column)
+    result = np.full(len(targets), np.nan, dtype=object)
+    
+    if len(valid) == 0 or len(targets) == 0:
+        return result
+    
+    # Index of the last valid position before (and first one after) each target
+    after_idx = np.searchsorted(valid, targets)
+    before_idx = after_idx - 1
+    has_before = before_idx >= 0
+    has_after = after_idx < len(valid)
+    
+    prev_values = np.where(has_before, values.iloc[valid[np.clip(before_idx, 0, len(valid) - 1)]].to_numpy(), np.nan)
+    next_values = np.where(has_after, values.iloc[valid[np.clip(after_idx, 0, len(valid) - 1)]].to_numpy(), np.nan)
+    
+    if method == "Forward Fill":
+        return prev_values
+    if method == "Backward Fill":
+        return next_values
+    
+    # Linear interpolation treats positions as equally spaced; trailing gaps keep the last value
+    prev_pos = valid[np.clip(before_idx, 0, len(valid) - 1)]
+    next_pos = valid[np.clip(after_idx, 0, len(valid) - 1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (targets - prev_pos) / (next_pos - prev_pos)
+        interpolated = prev_values.astype(float) + (next_values.astype(float) - prev_values.astype(float)) * fraction
+    return np.where(has_before & has_after, interpolated, np.where(has_before, prev_values, np.nan))
+
+def local_polynomial_fill(data, column, position):
+    """Approximate polynomial interpolation at one position from its nearest valid neighbours"""
+    valid = valid_positions(data, column)
+    split = np.searchsorted(valid, position)
+    window = valid[max(0, split - POLYNOMIAL_WINDOW):split + POLYNOMIAL_WINDOW]
+    
+    if split == 0 or split >= len(valid) or len(window) < 3:
+        return np.nan
+    
+    local_positions = np.sort(np.append(window, position))
+    local = data[column].iloc[local_positions]
+    try:
+        interpolated = local.interpolate(method='polynomial', order=2)
+    except Exception:
+        return np.nan
+    return interpolated.iloc[np.searchsorted(local_positions, position)]
+
+def preview_outlier_action(data, column, action, outlier_mask, lower_bound, upper_bound, size=PREVIEW_ROWS):
+    """Evaluate an outlier action on a sample of rows that includes outliers"""
+    positions = sample_positions(outlier_mask, size)
+    before = data.iloc[positions][[column]]
+    
+    if action == "Remove Outliers":
+        return before, before[~outlier_mask[positions]]
+    if action == "Cap at Boundaries":
+        return before, before[column].clip(lower_bound, upper_bound).to_frame(column)
+    if action == "Transform (Log)":
+        return before, np.log1p(before[column]).to_frame(column)
+    return before, before
@@ -3,9 +3,34 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 import re
 from datetime import datetime
+from utils import versioned_cache
+from row_fingerprints import count_duplicates, duplicated_mask, drop_duplicate_rows
+from cleaning_preview import preview_fill, preview_outlier_action, PREVIEW_ROWS
+from cleaning_journal import CleaningJournal
+from outlier_scan import (
+    scan_outliers, apply_outlier_scan, cached_anomaly_scores, anomaly_mask,
+    cached_rolling_statistics, rolling_bounds, rolling_outlier_mask, order_positions,
+    ANOMALY_MODELS, ANOMALY_SAMPLE_ROWS, ROLLING_METHODS, ROLLING_PLOT_POINTS, MAD_SCALE
+)
+from knn_imputation import impute_knn, DEFAULT_NEIGHBORS, DEFAULT_MAX_DONORS
+from type_optimizer import optimize_dtypes, category_estimates
+from cleaning_recipes import (
+    recipe_step, apply_operation, save_recipe, load_recipe,
+    apply_date_parses, IMPUTATION_METHODS, GROUP_STATISTICS, ANOMALY_SCORE_COLUMN, PARSE_FAILED_SUFFIX
+)
+from date_parsing import parse_date_columns, cached_date_parses
+from string_dictionary import factorize_column, pattern_mask, text_columns
+from near_duplicates import DEFAULT_THRESHOLD, cached_near_duplicates, near_duplicate_mask, cluster_summary
+from memory_accounting import MEMORY_SAMPLE_ROWS, frame_memory, format_memory
+from data_export import (
+    EXPORT_FORMATS, TEXT_FORMATS, FORMAT_HELP, COMPRESSIONS, EXCEL_MAX_ROWS, export_bytes, export_dir,
+    export_file_name, export_mime, prune_exports
+)
+from validation_rules import (
+    RULE_TYPES, make_rule, check_rules, cached_rule_evaluation, violation_mask, save_rules, load_rules
+)
 
 def data_cleaning_section(data):
     """
@@ -16,8 +41,11 @@ def data_cleaning_section(data):
     # Initialize session state for cleaning history
     if 'cleaning_history' not in st.session_state:
         st.session_state.cleaning_history = []
+    if 'cleaning_journal' not in st.session_state:
+        st.session_state.cleaning_journal = CleaningJournal()
     if 'original_data' not in st.session_state:
-        st.session_state.original_data = data.copy()
+        # The uploaded frame is never modified, so it can serve as the original without a copy
+        st.session_state.original_data = data
     if 'cleaned_data' not in st.session_state:
         st.session_state.cleaned_data = data.copy()
     
@@ -81,12 +109,16 @@ def handle_missing_values(data):
     
     strategy = st.radio(
         "Choose approach:",
-        ["Column-Specific Strategy", "Global Strategy", "Threshold-Based Dropping"],
-        help="Column-specific allows different strategies per column, Global applies same strategy to all"
+        ["Column-Specific Strategy", "Imputation Planner", "KNN Imputation", "Global Strategy", "Threshold-Based Dropping"],
+        help="Column-specific previews one column at a time, the planner fills many columns in one pass, Global applies same strategy to all"
     )
     
     if strategy == "Column-Specific Strategy":
         apply_column_specific_strategy(data, missing_cols)
+    elif strategy == "Imputation Planner":
+        apply_imputation_plan(data, missing_cols)
+    elif strategy == "KNN Imputation":
+        apply_knn_imputation(data, missing_cols)
     elif strategy == "Global Strategy":
         apply_global_strategy(data, missing_cols)
     else:
@@ -124,28 +156,155 @@ def apply_column_specific_strategy(data, missing_cols):
                 ["Mode", "Forward Fill", "Backward Fill", "Custom Value", "Drop Rows"]
             )
         
-        # Preview before apply
+        custom_val = None
+        if method == "Custom Value":
+            custom_val = st.text_input(f"Enter custom value for {selected_col}", key=f"custom_{selected_col}")
+        
+        group_by = []
+        if method in GROUP_STATISTICS:
+            group_by = st.multiselect(
+                "Compute within groups of (optional)",
+                [col for col in data.columns if col != selected_col],
+                key="fill_group_by",
+                help="E.g. fill a missing price with the mean price of the same region and product. Groups with no values fall back to the overall statistic."
+            )
+        
+        # Preview on a sample of rows (including rows with missing values) before apply
+        before, after = preview_fill(data, selected_col, method, custom_val, group_by=group_by)
         preview_col1, preview_col2 = st.columns(2)
         
         with preview_col1:
             st.markdown("**Before:**")
-            st.dataframe(data[[selected_col]].head(10), use_container_width=True)
+            st.dataframe(before, use_container_width=True)
         
         with preview_col2:
             st.markdown("**Preview After:**")
-            preview_data = data.copy()
-            preview_data = apply_fill_method(preview_data, selected_col, method)
-            st.dataframe(preview_data[[selected_col]].head(10), use_container_width=True)
+            st.dataframe(after, use_container_width=True)
+        
+        if method == "Polynomial Interpolation":
+            st.caption("Preview values are approximated from nearby rows; the full interpolation runs on apply.")
         
         # Apply button
         if st.button(f"✅ Apply {method} to {selected_col}", key=f"apply_{selected_col}"):
-            data_before = data.copy()
-            data = apply_fill_method(data, selected_col, method)
-            st.session_state.cleaned_data = data
-            log_cleaning_action(f"Applied {method} to column '{selected_col}'")
+            grouping = f" grouped by {', '.join(map(str, group_by))}" if group_by else ""
+            apply_recipe_step(
+                data, f"Applied {method}{grouping} to column '{selected_col}'",
+                'fill_missing', column=selected_col, method=method, custom_value=custom_val, group_by=group_by or None
+            )
             st.success(f"✅ Applied {method} to {selected_col}")
             st.rerun()
 
+def apply_imputation_plan(data, missing_cols):
+    """Assign a strategy to every column with missing values and apply them in one pass"""
+    st.markdown("### Imputation Planner")
+    
+    st.info("Pick a strategy per column in the table, then apply the whole plan at once")
+    
+    group_by = st.multiselect(
+        "Compute Mean/Median/Mode within groups of (optional)",
+        data.columns.tolist(),
+        key="plan_group_by",
+        help="Groups with no values fall back to the overall statistic"
+    )
+    
+    plan_df = pd.DataFrame({
+        'Column': [str(col) for col in missing_cols.index],
+        'Type': [str(data[col].dtype) for col in missing_cols.index],
+        'Missing': missing_cols.values,
+        'Missing %': (missing_cols.values / len(data) * 100).round(2),
+        'Strategy': "Keep",
+        'Custom Value': ""
+    })
+    
+    edited = st.data_editor(
+        plan_df,
+        column_config={
+            'Strategy': st.column_config.SelectboxColumn("Strategy", options=list(IMPUTATION_METHODS), required=True),
+            'Custom Value': st.column_config.TextColumn("Custom Value", help="Used by the Custom Value strategy")
+        },
+        disabled=['Column', 'Type', 'Missing', 'Missing %'],
+        hide_index=True,
+        use_container_width=True,
+        key="imputation_plan"
+    )
+    
+    columns = dict(zip(plan_df['Column'], missing_cols.index))
+    plan = [
+        {
+            'column': columns[row['Column']],
+            'method': row['Strategy'],
+            'value': row['Custom Value'] or None,
+            'group_by': [col for col in group_by if col != columns[row['Column']]] or None
+        }
+        for _, row in edited.iterrows()
+        if row['Strategy'] != "Keep"
+    ]
+    
+    # Numeric-only strategies cannot be applied to text or date columns
+    invalid = [
+        str(entry['column']) for entry in plan
+        if IMPUTATION_METHODS[entry['method']] and not pd.api.types.is_numeric_dtype(data[entry['column']])
+    ]
+    missing_custom = [str(entry['column']) for entry in plan if entry['method'] == "Custom Value" and not entry['value']]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Columns in Plan", len(plan))
+    with col2:
+        st.metric("Missing Values Addressed", int(sum(missing_cols[entry['column']] for entry in plan)))
+    
+    if invalid:
+        st.error(f"❌ Numeric strategies chosen for non-numeric columns: {', '.join(invalid)}")
+    if missing_custom:
+        st.warning(f"Custom Value chosen without a value for: {', '.join(missing_custom)}")
+    
+    if plan and not invalid and st.button("✅ Apply Imputation Plan", key="apply_plan"):
+        apply_recipe_step(data, f"Imputation plan applied to {len(plan)} columns", 'impute_columns', plan=plan)
+        st.success(f"✅ Applied imputation plan to {len(plan)} columns")
+        st.rerun()
+
+def apply_knn_imputation(data, missing_cols):
+    """Multivariate imputation from the nearest rows over numeric features"""
+    st.markdown("### KNN Imputation")
+    
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    targets = [col for col in missing_cols.index if col in numeric_cols]
+    
+    if not targets or len(numeric_cols) < 2:
+        st.warning("KNN imputation needs a numeric column with missing values and at least one other numeric column")
+        return
+    
+    st.info("Each missing value is filled with the average of its k most similar rows, compared on standardized numeric features")
+    
+    columns = st.multiselect("Columns to impute", targets, default=targets, key="knn_columns")
+    features = st.multiselect("Feature columns", numeric_cols, default=numeric_cols, key="knn_features")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        k = st.slider("Neighbors (k)", 1, 20, DEFAULT_NEIGHBORS, key="knn_k")
+    with col2:
+        max_donors = st.number_input(
+            "Max donor rows", 100, 1_000_000, DEFAULT_MAX_DONORS, step=1000, key="knn_donors",
+            help="Rows with a value are sampled down to this many candidates; fewer is faster"
+        )
+    
+    if columns:
+        rows_to_fill = int(missing_cols[columns].sum())
+        st.caption(f"{rows_to_fill:,} values to impute, each compared against up to {int(max_donors):,} donor rows")
+    
+    if columns and features and st.button("✅ Apply KNN Imputation", key="apply_knn"):
+        progress_bar = st.progress(0.0, text="Finding neighbors...")
+        imputed = impute_knn(
+            data, columns, features, k, int(max_donors),
+            progress=lambda fraction: progress_bar.progress(min(fraction, 1.0), text=f"Finding neighbors... {fraction:.0%}")
+        )
+        commit_cleaning_step(
+            imputed, f"KNN imputation (k={k}) on {len(columns)} columns",
+            recipe_step('knn_impute', columns=columns, features=features, k=k, max_donors=int(max_donors))
+        )
+        st.success(f"✅ Imputed {len(columns)} columns")
+        st.rerun()
+
 def apply_global_strategy(data, missing_cols):
     """Apply same strategy to all columns with missing values"""
     st.markdown("### Global Strategy")
@@ -171,40 +330,7 @@ def apply_global_strategy(data, missing_cols):
         st.info(f"This will fill missing values in {len(missing_cols)} columns")
     
     if st.button("✅ Apply Global Strategy", key="apply_global"):
-        data_before = data.copy()
-        
-        if method == "Mean (numeric only)":
-            numeric_cols = data.select_dtypes(include=[np.number]).columns
-            for col in numeric_cols:
-                if col in missing_cols.index:
-                    data[col].fillna(data[col].mean(), inplace=True)
-        
-        elif method == "Median (numeric only)":
-            numeric_cols = data.select_dtypes(include=[np.number]).columns
-            for col in numeric_cols:
-                if col in missing_cols.index:
-                    data[col].fillna(data[col].median(), inplace=True)
-        
-        elif method == "Mode":
-            for col in missing_cols.index:
-                mode_val = data[col].mode()
-                if len(mode_val) > 0:
-                    data[col].fillna(mode_val[0], inplace=True)
-        
-        elif method == "Forward Fill":
-            data.fillna(method='ffill', inplace=True)
-        
-        elif method == "Backward Fill":
-            data.fillna(method='bfill', inplace=True)
-        
-        elif method == "Drop Rows with Any Missing":
-            data.dropna(axis=0, how='any', inplace=True)
-        
-        elif method == "Drop Rows with All Missing":
-            data.dropna(axis=0, how='all', inplace=True)
-        
-        st.session_state.cleaned_data = data
-        log_cleaning_action(f"Applied global strategy: {method}")
+        apply_recipe_step(data, f"Applied global strategy: {method}", 'fill_all_missing', method=method)
         st.success(f"✅ Applied {method} globally")
         st.rerun()
 
@@ -227,9 +353,10 @@ def apply_threshold_dropping(data):
         st.warning(f"Will drop {len(cols_to_drop)} columns: {', '.join(cols_to_drop) if cols_to_drop else 'None'}")
         
         if cols_to_drop and st.button("✅ Drop Columns", key="drop_cols_threshold"):
-            data.drop(columns=cols_to_drop, inplace=True)
-            st.session_state.cleaned_data = data
-            log_cleaning_action(f"Dropped {len(cols_to_drop)} columns with >{threshold}% missing values")
+            apply_recipe_step(
+                data, f"Dropped {len(cols_to_drop)} columns with >{threshold}% missing values",
+                'drop_sparse_columns', threshold=threshold
+            )
             st.success(f"✅ Dropped {len(cols_to_drop)} columns")
             st.rerun()
     
@@ -240,50 +367,31 @@ def apply_threshold_dropping(data):
         st.warning(f"Will drop {rows_to_drop} rows ({(rows_to_drop/len(data)*100):.2f}% of data)")
         
         if rows_to_drop > 0 and st.button("✅ Drop Rows", key="drop_rows_threshold"):
-            data_filtered = data[missing_pct_rows <= threshold]
-            st.session_state.cleaned_data = data_filtered
-            log_cleaning_action(f"Dropped {rows_to_drop} rows with >{threshold}% missing values")
+            apply_recipe_step(
+                data, f"Dropped {rows_to_drop} rows with >{threshold}% missing values",
+                'drop_sparse_rows', threshold=threshold
+            )
             st.success(f"✅ Dropped {rows_to_drop} rows")
             st.rerun()
 
-def apply_fill_method(data, column, method):
-    """Apply specific fill method to a column"""
-    data = data.copy()
-    
-    if method == "Mean":
-        data[column].fillna(data[column].mean(), inplace=True)
-    elif method == "Median":
-        data[column].fillna(data[column].median(), inplace=True)
-    elif method == "Mode":
-        mode_val = data[column].mode()
-        if len(mode_val) > 0:
-            data[column].fillna(mode_val[0], inplace=True)
-    elif method == "Forward Fill":
-        data[column].fillna(method='ffill', inplace=True)
-    elif method == "Backward Fill":
-        data[column].fillna(method='bfill', inplace=True)
-    elif method == "Linear Interpolation":
-        data[column].interpolate(method='linear', inplace=True)
-    elif method == "Polynomial Interpolation":
-        data[column].interpolate(method='polynomial', order=2, inplace=True)
-    elif method == "Drop Rows":
-        data.dropna(subset=[column], inplace=True)
-    elif method == "Custom Value":
-        custom_val = st.text_input(f"Enter custom value for {column}", key=f"custom_{column}")
-        if custom_val:
-            try:
-                data[column].fillna(float(custom_val), inplace=True)
-            except ValueError:
-                data[column].fillna(custom_val, inplace=True)
-    
-    return data
-
 def handle_duplicates(data):
     """Duplicate detection and removal"""
     st.subheader("Duplicate Management")
     
-    # Check for duplicates
-    duplicate_count = data.duplicated().sum()
+    mode = st.radio(
+        "Duplicate type:",
+        ["Exact", "Near Duplicates (Text)"],
+        horizontal=True,
+        key="duplicate_mode",
+        help="Near duplicates differ only by typos, casing, punctuation or whitespace"
+    )
+    
+    if mode != "Exact":
+        handle_near_duplicates(data)
+        return
+    
+    # Check for duplicates (hashed row fingerprints, reused until the data changes)
+    duplicate_count = count_duplicates(data)
     
     col1, col2 = st.columns(2)
     with col1:
@@ -310,15 +418,12 @@ def handle_duplicates(data):
     if criteria == "Specific Columns":
         subset_cols = st.multiselect("Select columns to check", data.columns.tolist())
         if subset_cols:
-            duplicate_count = data.duplicated(subset=subset_cols).sum()
+            duplicate_count = count_duplicates(data, subset=subset_cols)
             st.info(f"Found {duplicate_count} duplicates based on selected columns")
     
     # Preview duplicates
     if st.checkbox("👀 Preview Duplicate Rows", value=False):
-        if subset_cols:
-            duplicates = data[data.duplicated(subset=subset_cols, keep=False)]
-        else:
-            duplicates = data[data.duplicated(keep=False)]
+        duplicates = data[duplicated_mask(data, subset=subset_cols or None, keep=False)]
         
         st.dataframe(duplicates.head(20), use_container_width=True)
     
@@ -334,23 +439,78 @@ def handle_duplicates(data):
     if st.button("🗑️ Remove Duplicates", key="remove_duplicates"):
         initial_count = len(data)
         
-        if keep_option == "none":
-            if subset_cols:
-                data = data[~data.duplicated(subset=subset_cols, keep=False)]
-            else:
-                data = data[~data.duplicated(keep=False)]
-        else:
-            if subset_cols:
-                data.drop_duplicates(subset=subset_cols, keep=keep_option, inplace=True)
-            else:
-                data.drop_duplicates(keep=keep_option, inplace=True)
+        keep = False if keep_option == "none" else keep_option
+        data = drop_duplicate_rows(data, subset=subset_cols or None, keep=keep)
         
         removed_count = initial_count - len(data)
-        st.session_state.cleaned_data = data
-        log_cleaning_action(f"Removed {removed_count} duplicate rows (keep={keep_option})")
+        commit_cleaning_step(
+            data, f"Removed {removed_count} duplicate rows (keep={keep_option})",
+            recipe_step('drop_duplicates', subset=subset_cols or None, keep=keep)
+        )
         st.success(f"✅ Removed {removed_count} duplicate rows")
         st.rerun()
 
+def handle_near_duplicates(data):
+    """Near-duplicate clusters by MinHash/LSH, with review and keep-one-per-cluster"""
+    st.markdown("### Near-Duplicate Detection")
+    
+    text_cols = text_columns(data)
+    columns = st.multiselect("Compare columns", data.columns.tolist(), default=text_cols[:1], key="near_dup_cols")
+    threshold = st.slider(
+        "Similarity threshold", 0.5, 1.0, DEFAULT_THRESHOLD, 0.05, key="near_dup_threshold",
+        help="Jaccard similarity of character 3-grams after lowercasing and removing punctuation and extra whitespace"
+    )
+    
+    if not columns:
+        st.info("Select the columns to compare")
+        return
+    
+    # Clusters are cached, so reviewing and removing does not re-hash
+    result = cached_near_duplicates(data, columns, threshold, compute=False)
+    if result is None:
+        if st.button("🔍 Find Near Duplicates", key="find_near_duplicates"):
+            with st.spinner("Hashing and clustering rows..."):
+                result = cached_near_duplicates(data, columns, threshold)
+        else:
+            return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Clusters", result['n_clusters'])
+    with col2:
+        st.metric("Removable Rows", result['n_duplicates'])
+    
+    if result['n_clusters'] == 0:
+        st.success("✅ No near-duplicate rows found!")
+        return
+    
+    summary = cluster_summary(data, columns, result)
+    st.dataframe(summary.head(100), use_container_width=True)
+    
+    sizes = dict(zip(summary['Cluster'], summary['Rows']))
+    cluster = st.selectbox(
+        "Review cluster", summary['Cluster'].head(100).tolist(),
+        format_func=lambda c: f"Cluster {c} ({sizes[c]} rows)", key="near_dup_cluster"
+    )
+    st.dataframe(data[result['labels'] == cluster], use_container_width=True)
+    
+    keep_option = st.selectbox(
+        "Which row to keep per cluster?",
+        ["first", "last", "none"],
+        key="near_dup_keep",
+        help="none removes every row that belongs to a cluster"
+    )
+    
+    if st.button("🗑️ Keep One per Cluster", key="remove_near_duplicates"):
+        keep = False if keep_option == "none" else keep_option
+        mask = near_duplicate_mask(result, keep)
+        commit_cleaning_step(
+            data[~mask], f"Removed {int(mask.sum())} near-duplicate rows on {columns} (similarity ≥ {threshold}, keep={keep_option})",
+            recipe_step('drop_near_duplicates', columns=columns, threshold=threshold, keep=keep)
+        )
+        st.success(f"✅ Removed {int(mask.sum())} near-duplicate rows")
+        st.rerun()
+
 def handle_outliers(data):
     """Outlier detection and handling"""
     st.subheader("Outlier Detection & Handling")
@@ -361,6 +521,23 @@ def handle_outliers(data):
         st.warning("No numeric columns found for outlier detection")
         return
     
+    scope = st.radio(
+        "Analyze:",
+        ["Single Column", "All Numeric Columns", "Time Series (Rolling Window)", "Multivariate (Anomaly Detection)"],
+        horizontal=True,
+        key="outlier_scope"
+    )
+    
+    if scope == "All Numeric Columns":
+        handle_all_outliers(data)
+        return
+    if scope == "Multivariate (Anomaly Detection)":
+        handle_anomalies(data, numeric_cols)
+        return
+    if scope == "Time Series (Rolling Window)":
+        handle_rolling_outliers(data, numeric_cols)
+        return
+    
     selected_col = st.selectbox("Select column for outlier analysis", numeric_cols)
     
     if selected_col:
@@ -369,16 +546,19 @@ def handle_outliers(data):
         # Detection method
         method = st.radio(
             "Detection Method:",
-            ["IQR (Interquartile Range)", "Z-Score"],
-            help="IQR: values beyond 1.5*IQR from quartiles. Z-Score: values beyond threshold standard deviations"
+            ["IQR (Interquartile Range)", "Z-Score", "MAD (Median Absolute Deviation)"],
+            help="IQR: values beyond 1.5*IQR from quartiles. Z-Score: values beyond threshold standard deviations. MAD: robust z-score around the median"
         )
         
         if method == "IQR (Interquartile Range)":
-            multiplier = st.slider("IQR Multiplier", 1.0, 3.0, 1.5, 0.1)
-            outliers, lower_bound, upper_bound = detect_outliers_iqr(col_data, multiplier)
+            factor = st.slider("IQR Multiplier", 1.0, 3.0, 1.5, 0.1)
+            outliers, lower_bound, upper_bound = detect_outliers_iqr(col_data, factor)
+        elif method == "Z-Score":
+            factor = st.slider("Z-Score Threshold", 1.0, 5.0, 3.0, 0.1)
+            outliers, lower_bound, upper_bound = detect_outliers_zscore(col_data, factor)
         else:
-            threshold = st.slider("Z-Score Threshold", 1.0, 5.0, 3.0, 0.1)
-            outliers, lower_bound, upper_bound = detect_outliers_zscore(col_data, threshold)
+            factor = st.slider("MAD Threshold", 1.0, 10.0, 3.5, 0.5)
+            outliers, lower_bound, upper_bound = detect_outliers_mad(col_data, factor)
         
         # Visualization
         st.markdown("### 📊 Visual Analysis")
@@ -420,24 +600,219 @@ def handle_outliers(data):
                 ["Remove Outliers", "Cap at Boundaries", "Transform (Log)", "Keep (No Action)"]
             )
             
-            # Preview
-            preview_data = data.copy()
+            # Preview on a sample of rows that includes outliers
             if action == "Remove Outliers":
-                preview_data = preview_data[~preview_data[selected_col].isin(outliers)]
                 st.warning(f"Will remove {outlier_count} rows")
             elif action == "Cap at Boundaries":
-                preview_data[selected_col] = preview_data[selected_col].clip(lower_bound, upper_bound)
                 st.info(f"Will cap {outlier_count} values at boundaries")
             elif action == "Transform (Log)":
-                preview_data[selected_col] = np.log1p(preview_data[selected_col])
                 st.info("Will apply log transformation")
             
+            if action != "Keep (No Action)":
+                outlier_mask = ((data[selected_col] < lower_bound) | (data[selected_col] > upper_bound)).to_numpy()
+                before, after = preview_outlier_action(data, selected_col, action, outlier_mask, lower_bound, upper_bound)
+                
+                preview_col1, preview_col2 = st.columns(2)
+                with preview_col1:
+                    st.markdown("**Before:**")
+                    st.dataframe(before, use_container_width=True)
+                with preview_col2:
+                    st.markdown("**Preview After:**")
+                    st.dataframe(after, use_container_width=True)
+            
             if action != "Keep (No Action)" and st.button(f"✅ Apply {action}", key="apply_outlier"):
-                st.session_state.cleaned_data = preview_data
-                log_cleaning_action(f"Outlier handling: {action} on column '{selected_col}'")
+                # Full-data work only happens on apply
+                apply_recipe_step(
+                    data, f"Outlier handling: {action} on column '{selected_col}'",
+                    'handle_outliers', column=selected_col, method=method, factor=factor, action=action
+                )
                 st.success(f"✅ Applied {action}")
                 st.rerun()
 
+def handle_all_outliers(data):
+    """Scan every numeric column at once and remove or cap outliers"""
+    method = st.radio(
+        "Detection Method:",
+        ["IQR (Interquartile Range)", "Z-Score", "MAD (Median Absolute Deviation)"],
+        key="scan_method",
+        help="IQR: values beyond 1.5*IQR from quartiles. Z-Score: values beyond threshold standard deviations. MAD: robust z-score around the median"
+    )
+    
+    if method == "IQR (Interquartile Range)":
+        factor = st.slider("IQR Multiplier", 1.0, 3.0, 1.5, 0.1, key="scan_iqr")
+    elif method == "Z-Score":
+        factor = st.slider("Z-Score Threshold", 1.0, 5.0, 3.0, 0.1, key="scan_z")
+    else:
+        factor = st.slider("MAD Threshold", 1.0, 10.0, 3.5, 0.5, key="scan_mad")
+    
+    # Bounds and the outlier mask matrix are cached per dataset version and setting
+    scan = scan_outliers(data, method, factor)
+    row_counts = scan['row_counts']
+    rows_with_outliers = int((row_counts > 0).sum())
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Columns Scanned", len(scan['columns']))
+    with col2:
+        st.metric("Outlier Values", int(scan['column_counts'].sum()))
+    with col3:
+        st.metric("Rows with Outliers", f"{rows_with_outliers} ({(rows_with_outliers/max(len(data), 1)*100):.2f}%)")
+    
+    summary = pd.DataFrame({
+        'Column': [str(col) for col in scan['columns']],
+        'Lower Bound': scan['lower'].to_numpy(),
+        'Upper Bound': scan['upper'].to_numpy(),
+        'Outliers': scan['column_counts'].to_numpy(),
+        'Outliers %': (scan['column_counts'].to_numpy() / max(len(data), 1) * 100).round(2)
+    })
+    st.dataframe(summary, use_container_width=True)
+    
+    if rows_with_outliers == 0:
+        st.success("✅ No outliers found with this setting")
+        return
+    
+    with st.expander("Rows by number of outlier columns"):
+        per_row = pd.Series(row_counts[row_counts > 0]).value_counts().sort_index()
+        st.dataframe(
+            pd.DataFrame({'Outlier Columns': per_row.index, 'Rows': per_row.values}),
+            use_container_width=True
+        )
+    
+    st.markdown("### Handling Strategy")
+    
+    flagged = [col for col in scan['columns'] if scan['column_counts'][col] > 0]
+    columns = st.multiselect("Columns to handle", flagged, default=flagged, key="scan_columns")
+    action = st.selectbox("What to do with outliers?", ["Remove Rows", "Cap at Boundaries"], key="scan_action")
+    
+    min_columns = 1
+    if action == "Remove Rows" and len(columns) > 1:
+        min_columns = st.slider(
+            "Remove rows with outliers in at least N of these columns", 1, len(columns), 1, key="scan_min_columns"
+        )
+    
+    if columns:
+        positions = [scan['columns'].index(col) for col in columns]
+        affected = scan['mask'][:, positions].sum(axis=1) >= (min_columns if action == "Remove Rows" else 1)
+        if action == "Remove Rows":
+            st.warning(f"Will remove {int(affected.sum())} rows")
+        else:
+            st.info(f"Will cap {int(scan['mask'][:, positions].sum())} values in {len(columns)} columns")
+        
+        before = data.iloc[np.flatnonzero(affected)[:PREVIEW_ROWS]][columns]
+        st.markdown("**Sample affected rows:**")
+        st.dataframe(before, use_container_width=True)
+    
+    if columns and st.button(f"✅ Apply {action}", key="apply_scan"):
+        cleaned = apply_outlier_scan(data, scan, columns, action, min_columns)
+        commit_cleaning_step(
+            cleaned, f"Outlier scan ({method}): {action} on {len(columns)} columns",
+            recipe_step('handle_outliers_all', columns=columns, method=method, factor=factor,
+                        action=action, min_columns=min_columns)
+        )
+        st.success(f"✅ Applied {action}")
+        st.rerun()
+
+def handle_rolling_outliers(data, numeric_cols):
+    """Flag values that are unusual relative to their neighbours in time rather than to the whole column"""
+    st.info("Bounds follow a rolling window, so seasonal peaks and trends are not flagged as outliers")
+    
+    datetime_cols = data.select_dtypes(include=['datetime', 'datetimetz']).columns.tolist()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        column = st.selectbox("Column to check", numeric_cols, key="rolling_column")
+        order_options = ["(Row order)"] + datetime_cols + [col for col in numeric_cols if col != column]
+        order_by = st.selectbox("Order rows by", order_options, key="rolling_order")
+        order_by = None if order_by == "(Row order)" else order_by
+    with col2:
+        method = st.radio("Rolling statistic:", ROLLING_METHODS, key="rolling_method")
+        group_options = [col for col in data.columns if col not in (column, order_by)]
+        group_by = st.multiselect("Separate series per group (optional)", group_options, key="rolling_group_by")
+    
+    if order_by in datetime_cols:
+        window = st.text_input(
+            "Window (time span)", "1D", key="rolling_window_span",
+            help="Pandas offset such as 30min, 12h or 7D, centred on each row"
+        ).strip()
+        try:
+            pd.tseries.frequencies.to_offset(window)
+        except ValueError:
+            st.error(f"'{window}' is not a valid time span")
+            return
+    else:
+        window = int(st.number_input("Window (rows)", 5, 100_000, 25, step=5, key="rolling_window_rows"))
+    
+    if method == "Rolling Z-Score":
+        factor = st.slider("Z-Score Threshold", 1.0, 5.0, 3.0, 0.1, key="rolling_z")
+    else:
+        factor = st.slider("MAD Threshold", 1.0, 10.0, 3.5, 0.5, key="rolling_mad")
+    
+    # Rolling statistics are cached per column and window, so the threshold slider only re-thresholds
+    stats = cached_rolling_statistics(data, column, order_by, window, method, group_by)
+    mask = rolling_outlier_mask(data, column, stats, factor)
+    outlier_count = int(mask.sum())
+    st.metric("Outliers Detected", f"{outlier_count} ({(outlier_count/max(len(data), 1)*100):.2f}%)")
+    
+    # Plot an evenly spaced subset of the first series plus its outliers
+    positions = order_positions_for_plot(data, order_by, group_by, mask)
+    lower, upper = rolling_bounds(stats, factor)
+    x = data[order_by].iloc[positions] if order_by else positions
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=x, y=data[column].iloc[positions], mode='lines', name=column, line=dict(color='#3498db')))
+    fig.add_trace(go.Scattergl(x=x, y=upper[positions], mode='lines', name='Upper Bound', line=dict(color='red', dash='dash')))
+    fig.add_trace(go.Scattergl(x=x, y=lower[positions], mode='lines', name='Lower Bound', line=dict(color='red', dash='dash')))
+    flagged = positions[mask[positions]]
+    fig.add_trace(go.Scattergl(
+        x=data[order_by].iloc[flagged] if order_by else flagged, y=data[column].iloc[flagged],
+        mode='markers', name='Outliers', marker=dict(color='red', size=7)
+    ))
+    fig.update_layout(title=f"Rolling Outlier Detection for {column}", yaxis_title=column, height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    if outlier_count == 0:
+        return
+    
+    st.markdown("### Handling Strategy")
+    
+    action = st.selectbox(
+        "What to do with outliers?",
+        ["Remove Outliers", "Cap at Boundaries", "Replace with Rolling Centre"],
+        key="rolling_action"
+    )
+    
+    sample = np.flatnonzero(mask)[:PREVIEW_ROWS]
+    st.markdown("**Sample flagged rows:**")
+    st.dataframe(
+        data.iloc[sample][[column]].assign(**{
+            'Rolling Centre': stats['center'][sample],
+            'Lower Bound': lower[sample],
+            'Upper Bound': upper[sample]
+        }),
+        use_container_width=True
+    )
+    
+    if st.button(f"✅ Apply {action}", key="apply_rolling"):
+        apply_recipe_step(
+            data, f"Rolling outlier handling ({method}, window {window}): {action} on column '{column}'",
+            'handle_rolling_outliers', column=column, order_by=order_by, window=window, method=method,
+            factor=factor, action=action, group_by=group_by or None
+        )
+        st.success(f"✅ Applied {action}")
+        st.rerun()
+
+def order_positions_for_plot(data, order_by, group_by, mask, points=ROLLING_PLOT_POINTS):
+    """Ordered positions of the first group's series, thinned to about the given number of points plus all outliers"""
+    positions = order_positions(data, order_by, group_by)
+    if group_by:
+        keys = data[group_by].iloc[positions]
+        first = keys.iloc[0]
+        positions = positions[((keys == first) | (keys.isna() & first.isna())).all(axis=1).to_numpy()]
+    
+    step = max(1, len(positions) // points)
+    keep = np.zeros(len(positions), dtype=bool)
+    keep[::step] = True
+    return positions[keep | mask[positions]]
+
 def detect_outliers_iqr(data, multiplier=1.5):
     """Detect outliers using IQR method"""
     Q1 = data.quantile(0.25)
@@ -464,6 +839,83 @@ def detect_outliers_zscore(data, threshold=3):
     
     return outliers, lower_bound, upper_bound
 
+def detect_outliers_mad(data, threshold=3.5):
+    """Detect outliers using the median absolute deviation (robust z-score)"""
+    median = data.median()
+    spread = (data - median).abs().median() * MAD_SCALE
+    
+    lower_bound = median - threshold * spread
+    upper_bound = median + threshold * spread
+    
+    outliers = data[(data < lower_bound) | (data > upper_bound)]
+    
+    return outliers, lower_bound, upper_bound
+
+def handle_anomalies(data, numeric_cols):
+    """Flag rows that are unusual across several columns with Isolation Forest or LOF"""
+    st.info("Multivariate detectors find rows whose combination of values is unusual, even when each value is normal on its own")
+    
+    columns = st.multiselect("Feature columns", numeric_cols, default=numeric_cols, key="anomaly_columns")
+    model = st.radio("Model:", ANOMALY_MODELS, horizontal=True, key="anomaly_model")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        contamination = st.slider("Expected share of anomalies (%)", 0.1, 20.0, 1.0, 0.1, key="anomaly_share") / 100
+    with col2:
+        sample_rows = int(st.number_input(
+            "Rows to fit the model on", 1000, 1_000_000, ANOMALY_SAMPLE_ROWS[model], step=1000,
+            key=f"anomaly_sample_{model}",
+            help="The model is fitted on a random sample; all rows are then scored"
+        ))
+    
+    if not columns:
+        return
+    
+    # Scores are cached, so changing the expected share only re-thresholds
+    scores = cached_anomaly_scores(data, columns, model, sample_rows, compute=False)
+    if scores is None:
+        if st.button("🔍 Score Rows", key="score_anomalies"):
+            progress_bar = st.progress(0.0, text="Scoring rows...")
+            scores = cached_anomaly_scores(
+                data, columns, model, sample_rows,
+                progress=lambda fraction: progress_bar.progress(fraction, text=f"Scoring rows... {fraction:.0%}")
+            )
+            progress_bar.empty()
+        else:
+            return
+    
+    flagged = anomaly_mask(scores, contamination)
+    st.metric("Rows Flagged", f"{int(flagged.sum())} ({(flagged.mean() * 100):.2f}%)")
+    
+    fig = px.histogram(x=scores, nbins=50, labels={'x': 'Anomaly score'}, title="Anomaly Score Distribution")
+    if flagged.any():
+        fig.add_vline(x=float(scores[flagged].min()), line_dash="dash", line_color="red")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("**Most anomalous rows:**")
+    top = np.argsort(scores)[::-1][:PREVIEW_ROWS]
+    st.dataframe(data.iloc[top][columns].assign(anomaly_score=scores[top]), use_container_width=True)
+    
+    action = st.selectbox(
+        "What to do with flagged rows?",
+        ["Remove Flagged Rows", "Add Score Column"],
+        key="anomaly_action",
+        help=f"Add Score Column stores the score as '{ANOMALY_SCORE_COLUMN}' so the single-column tools can remove or cap on it"
+    )
+    
+    if st.button(f"✅ Apply {action}", key="apply_anomalies"):
+        if action == "Remove Flagged Rows":
+            cleaned = data[~flagged]
+        else:
+            cleaned = data.assign(**{ANOMALY_SCORE_COLUMN: scores})
+        commit_cleaning_step(
+            cleaned, f"{model} on {len(columns)} columns: {action}",
+            recipe_step('detect_anomalies', columns=columns, model=model, contamination=contamination,
+                        action=action, sample_rows=sample_rows)
+        )
+        st.success(f"✅ Applied {action}")
+        st.rerun()
+
 def optimize_data_types(data):
     """Data type optimization and conversion"""
     st.subheader("Data Type Optimization")
@@ -471,16 +923,21 @@ def optimize_data_types(data):
     # Current data types
     st.markdown("### Current Data Types")
     
+    exact_memory = st.checkbox("Exact memory usage", key="exact_memory",
+                               help=f"Text columns are otherwise estimated from {MEMORY_SAMPLE_ROWS:,} sampled values")
+    memory = frame_memory(data, exact=exact_memory)
+    
     dtype_df = pd.DataFrame({
         'Column': data.columns,
         'Current Type': [str(dtype) for dtype in data.dtypes],
-        'Memory (MB)': [data[col].memory_usage(deep=True) / 1024 / 1024 for col in data.columns]
+        'Memory (MB)': (memory['bytes'] / 1024 / 1024).to_numpy()
     })
+    if not memory['exact']:
+        dtype_df['± MB (95%)'] = (memory['margin'] / 1024 / 1024).to_numpy()
     
     st.dataframe(dtype_df, use_container_width=True)
     
-    total_memory = data.memory_usage(deep=True).sum() / 1024 / 1024
-    st.metric("Total Memory Usage", f"{total_memory:.2f} MB")
+    st.metric("Total Memory Usage", format_memory(memory['total'], memory['total_margin']))
     
     st.markdown("---")
     
@@ -505,67 +962,33 @@ def auto_optimize_types(data):
     """Automatically optimize data types"""
     st.markdown("#### Auto-Optimize Data Types")
     
-    st.info("This will automatically convert numeric columns to more efficient types and object columns to categories where appropriate")
+    st.info("Converts only where no information is lost: smaller integer types, float32 when every value survives the round trip, "
+            "nullable integers for whole-number floats with gaps, booleans, and categories or Arrow strings for text, whichever is smaller")
     
     if st.button("🚀 Auto-Optimize", key="auto_optimize"):
-        optimized_data = data.copy()
-        changes = []
-        
-        # Optimize numeric columns
-        for col in optimized_data.select_dtypes(include=['int64']).columns:
-            col_min = optimized_data[col].min()
-            col_max = optimized_data[col].max()
-            
-            if col_min >= 0:
-                if col_max < 255:
-                    optimized_data[col] = optimized_data[col].astype('uint8')
-                    changes.append(f"{col}: int64 → uint8")
-                elif col_max < 65535:
-                    optimized_data[col] = optimized_data[col].astype('uint16')
-                    changes.append(f"{col}: int64 → uint16")
-                elif col_max < 4294967295:
-                    optimized_data[col] = optimized_data[col].astype('uint32')
-                    changes.append(f"{col}: int64 → uint32")
-            else:
-                if col_min > -128 and col_max < 127:
-                    optimized_data[col] = optimized_data[col].astype('int8')
-                    changes.append(f"{col}: int64 → int8")
-                elif col_min > -32768 and col_max < 32767:
-                    optimized_data[col] = optimized_data[col].astype('int16')
-                    changes.append(f"{col}: int64 → int16")
-                elif col_min > -2147483648 and col_max < 2147483647:
-                    optimized_data[col] = optimized_data[col].astype('int32')
-                    changes.append(f"{col}: int64 → int32")
-        
-        # Optimize float columns
-        for col in optimized_data.select_dtypes(include=['float64']).columns:
-            optimized_data[col] = optimized_data[col].astype('float32')
-            changes.append(f"{col}: float64 → float32")
-        
-        # Convert low-cardinality object columns to category
-        for col in optimized_data.select_dtypes(include=['object']).columns:
-            num_unique = optimized_data[col].nunique()
-            num_total = len(optimized_data[col])
-            if num_unique / num_total < 0.5:  # Less than 50% unique
-                optimized_data[col] = optimized_data[col].astype('category')
-                changes.append(f"{col}: object → category")
+        optimized_data, report = optimize_dtypes(data)
         
-        # Calculate memory savings
-        original_memory = data.memory_usage(deep=True).sum() / 1024 / 1024
-        optimized_memory = optimized_data.memory_usage(deep=True).sum() / 1024 / 1024
-        savings = original_memory - optimized_memory
-        savings_pct = (savings / original_memory) * 100
-        
-        st.session_state.cleaned_data = optimized_data
-        log_cleaning_action(f"Auto-optimized data types: {len(changes)} changes, saved {savings:.2f} MB")
-        
-        st.success(f"✅ Optimized! Saved {savings:.2f} MB ({savings_pct:.1f}%)")
+        # Exact bytes of the converted columns
+        savings = int(report['Bytes Before'].sum() - report['Bytes After'].sum())
+        savings_pct = savings / max(frame_memory(data)['total'], 1) * 100
         
+        if report.empty:
+            st.session_state.pop('type_optimization_report', None)
+            st.success("✅ All columns already use their smallest lossless type")
+        else:
+            commit_cleaning_step(
+                optimized_data, f"Auto-optimized data types: {len(report)} changes, saved {savings / 1024 / 1024:.2f} MB",
+                recipe_step('optimize_types')
+            )
+            st.session_state.type_optimization_report = report
+            st.session_state.type_optimization_savings = (savings, savings_pct)
+            st.rerun()
+    
+    if 'type_optimization_report' in st.session_state:
+        savings, savings_pct = st.session_state.type_optimization_savings
+        st.success(f"✅ Optimized! Saved {savings:,} bytes ({savings_pct:.1f}%)")
         with st.expander("View Changes"):
-            for change in changes:
-                st.text(change)
-        
-        st.rerun()
+            st.dataframe(st.session_state.type_optimization_report, use_container_width=True)
 
 def manual_type_conversion(data):
     """Manual type conversion"""
@@ -585,9 +1008,10 @@ def manual_type_conversion(data):
         
         if st.button(f"Convert {selected_col} to {new_type}", key="manual_convert"):
             try:
-                data[selected_col] = data[selected_col].astype(new_type)
-                st.session_state.cleaned_data = data
-                log_cleaning_action(f"Converted column '{selected_col}' from {current_type} to {new_type}")
+                apply_recipe_step(
+                    data, f"Converted column '{selected_col}' from {current_type} to {new_type}",
+                    'convert_type', column=selected_col, dtype=new_type
+                )
                 st.success(f"✅ Converted {selected_col} to {new_type}")
                 st.rerun()
             except Exception as e:
@@ -597,66 +1021,80 @@ def parse_dates(data):
     """Parse date columns"""
     st.markdown("#### Parse Date Columns")
     
-    object_cols = data.select_dtypes(include=['object']).columns.tolist()
+    object_cols = text_columns(data)
     
     if not object_cols:
         st.warning("No object columns found to parse as dates")
         return
     
-    selected_col = st.selectbox("Select column to parse as date", object_cols)
+    selected_cols = st.multiselect("Select columns to parse as dates", object_cols, key="date_columns")
     
-    if selected_col:
-        # Show sample values
-        st.markdown("**Sample values:**")
-        st.write(data[selected_col].head(10).tolist())
-        
+    if selected_cols:
         date_format = st.text_input(
             "Date format (optional)",
             placeholder="e.g., %Y-%m-%d or leave empty for auto-detection",
-            help="Use Python strftime format codes"
+            help="Use Python strftime format codes. When empty, formats are inferred from a sample of distinct values; "
+                 "columns mixing several formats get one format per style"
         )
         
-        if st.button(f"Parse {selected_col} as datetime", key="parse_date"):
-            try:
-                if date_format:
-                    data[selected_col] = pd.to_datetime(data[selected_col], format=date_format)
-                else:
-                    data[selected_col] = pd.to_datetime(data[selected_col], infer_datetime_format=True)
-                
-                st.session_state.cleaned_data = data
-                log_cleaning_action(f"Parsed column '{selected_col}' as datetime")
-                st.success(f"✅ Parsed {selected_col} as datetime")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Parsing failed: {str(e)}")
+        # Distinct values are parsed once per column and dataset version, columns in parallel
+        if date_format:
+            formats = {col: [date_format] for col in selected_cols}
+            results = parse_date_columns(data, selected_cols, formats)
+        else:
+            results = cached_date_parses(data, selected_cols)
+            formats = {col: results[col]['formats'] for col in selected_cols}
+        
+        summary = pd.DataFrame({
+            'Column': selected_cols,
+            'Detected Formats': [", ".join(results[col]['formats']) or "none" for col in selected_cols],
+            'Parsed': [int(results[col]['values'].notna().sum()) for col in selected_cols],
+            'Failed': [int(results[col]['failed'].sum()) for col in selected_cols]
+        })
+        st.dataframe(summary, use_container_width=True)
+        
+        failed_cols = [col for col in selected_cols if results[col]['failed'].any()]
+        for col in failed_cols:
+            failed_values = data[col][results[col]['failed']].unique()[:PREVIEW_ROWS]
+            st.warning(f"'{col}': values that did not parse become missing, e.g. {', '.join(map(str, failed_values))}")
+        
+        flag_failures = bool(failed_cols) and st.checkbox(
+            f"Add a '{PARSE_FAILED_SUFFIX}' flag column for values that did not parse", key="date_flag_failures"
+        )
+        
+        if st.button(f"Parse {len(selected_cols)} columns as datetime", key="parse_date"):
+            commit_cleaning_step(
+                apply_date_parses(data, results, flag_failures),
+                f"Parsed {len(selected_cols)} columns as datetime: {', '.join(map(str, selected_cols))}",
+                recipe_step('parse_dates', formats=formats, flag_failures=flag_failures)
+            )
+            st.success(f"✅ Parsed {len(selected_cols)} columns as datetime")
+            st.rerun()
 
 def optimize_categories(data):
     """Optimize categorical columns"""
     st.markdown("#### Optimize Categorical Columns")
     
-    object_cols = data.select_dtypes(include=['object']).columns.tolist()
+    object_cols = data.select_dtypes(include=['object', 'string']).columns.tolist()
     
     if not object_cols:
         st.warning("No object columns found")
         return
     
-    # Show candidates for category conversion
+    # Savings are estimated from unique counts and sampled string sizes, cached per dataset version;
+    # only the columns selected below are actually converted
+    estimates = category_estimates(data, object_cols)
     candidates = []
     for col in object_cols:
-        num_unique = data[col].nunique()
-        num_total = len(data[col])
-        cardinality_ratio = num_unique / num_total
+        estimate = estimates[col]
+        savings = (estimate['current'] - estimate['category']) / 1024
         
-        if cardinality_ratio < 0.5:
-            current_memory = data[col].memory_usage(deep=True) / 1024
-            potential_memory = data[col].astype('category').memory_usage(deep=True) / 1024
-            savings = current_memory - potential_memory
-            
+        if savings > 0:
             candidates.append({
                 'Column': col,
-                'Unique Values': num_unique,
-                'Cardinality %': f"{cardinality_ratio*100:.1f}%",
-                'Current Memory (KB)': f"{current_memory:.2f}",
+                'Unique Values': estimate['unique'],
+                'Cardinality %': f"{estimate['unique'] / max(len(data), 1) * 100:.1f}%",
+                'Current Memory (KB)': f"{estimate['current'] / 1024:.2f}",
                 'Potential Savings (KB)': f"{savings:.2f}"
             })
     
@@ -669,11 +1107,10 @@ def optimize_categories(data):
         )
         
         if cols_to_convert and st.button("Convert to Category", key="convert_category"):
-            for col in cols_to_convert:
-                data[col] = data[col].astype('category')
-            
-            st.session_state.cleaned_data = data
-            log_cleaning_action(f"Converted {len(cols_to_convert)} columns to category type")
+            apply_recipe_step(
+                data, f"Converted {len(cols_to_convert)} columns to category type",
+                'convert_categories', columns=cols_to_convert
+            )
             st.success(f"✅ Converted {len(cols_to_convert)} columns to category")
             st.rerun()
     else:
@@ -685,10 +1122,12 @@ def validate_data(data):
     
     validation_type = st.selectbox(
         "Select validation type:",
-        ["Range Validation", "Pattern Matching (Regex)", "Unique Value Constraints", "Cross-Column Validation"]
+        ["Rule Set", "Range Validation", "Pattern Matching (Regex)", "Unique Value Constraints", "Cross-Column Validation"]
     )
     
-    if validation_type == "Range Validation":
+    if validation_type == "Rule Set":
+        rule_set_validation(data)
+    elif validation_type == "Range Validation":
         range_validation(data)
     elif validation_type == "Pattern Matching (Regex)":
         pattern_validation(data)
@@ -697,6 +1136,141 @@ def validate_data(data):
     else:
         cross_column_validation(data)
 
+def rule_set_validation(data):
+    """Check many named rules at once; rules are kept for the session and can be saved"""
+    st.markdown("#### Rule Set")
+    
+    st.info("Add one rule per row. Expression rules take any boolean column expression, e.g. "
+            "`start <= end and price * quantity == total` (backticks around names with spaces)")
+    
+    baseline = st.session_state.setdefault('validation_rules', [])
+    version = st.session_state.setdefault('rule_set_version', 0)
+    # The editor shows column names as text; rules keep the real labels (e.g. integers)
+    labels = {str(col): col for col in data.columns}
+    
+    edited = st.data_editor(
+        pd.DataFrame({
+            'Name': [rule['name'] for rule in baseline],
+            'Rule': [rule['type'] for rule in baseline],
+            'Column': [None if rule['column'] is None else str(rule['column']) for rule in baseline],
+            'Min': [rule['min'] for rule in baseline],
+            'Max': [rule['max'] for rule in baseline],
+            'Pattern / Expression': [rule['argument'] for rule in baseline],
+            'Allow Missing': [rule.get('allow_missing', False) for rule in baseline]
+        }, dtype=object),
+        column_config={
+            'Rule': st.column_config.SelectboxColumn("Rule", options=list(RULE_TYPES), required=True),
+            'Column': st.column_config.SelectboxColumn("Column", options=list(labels)),
+            'Min': st.column_config.NumberColumn("Min", help="Range rules"),
+            'Max': st.column_config.NumberColumn("Max", help="Range rules"),
+            'Pattern / Expression': st.column_config.TextColumn(
+                "Pattern / Expression", help="Regex for Pattern rules, boolean expression for Expression rules"
+            ),
+            'Allow Missing': st.column_config.CheckboxColumn(
+                "Allow Missing", help="Pattern rules: missing values pass instead of counting as violations"
+            )
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key=f"rule_editor_{version}"
+    )
+    
+    rules = [
+        make_rule(
+            row['Name'] or f"Rule {i + 1}", row['Rule'],
+            None if pd.isna(row['Column']) else labels.get(row['Column'], row['Column']),
+            None if pd.isna(row['Min']) else float(row['Min']),
+            None if pd.isna(row['Max']) else float(row['Max']),
+            None if pd.isna(row['Pattern / Expression']) else row['Pattern / Expression'],
+            row['Allow Missing'] is True
+        )
+        for i, (_, row) in enumerate(edited.iterrows())
+        if not pd.isna(row['Rule'])
+    ]
+    
+    # Keep edits as the session's rule set so they survive tab switches and new uploads
+    if rules != baseline:
+        st.session_state.validation_rules = rules
+        st.session_state.rule_set_version = version + 1
+        st.rerun()
+    
+    rule_file_controls(rules)
+    
+    if not rules:
+        return
+    
+    problems = check_rules(data, rules)
+    for problem in problems:
+        st.error(f"❌ {problem}")
+    if problems:
+        return
+    
+    # One pass over the data into a per-rule violation bitmap, cached per dataset version and rule set
+    try:
+        evaluation = cached_rule_evaluation(data, rules)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    
+    any_violation = violation_mask(evaluation, range(len(rules)))
+    st.metric("Rows Violating Any Rule", f"{int(any_violation.sum())} ({any_violation.mean() * 100:.2f}%)")
+    st.dataframe(pd.DataFrame({
+        'Rule': [rule['name'] for rule in rules],
+        'Type': [rule['type'] for rule in rules],
+        'Violations': evaluation['counts'],
+        'Violations %': (evaluation['counts'] / max(len(data), 1) * 100).round(2)
+    }), use_container_width=True)
+    
+    if not any_violation.any():
+        st.success("✅ All rows satisfy every rule!")
+        return
+    
+    names = [rule['name'] for rule in rules]
+    violated = [name for name, count in zip(names, evaluation['counts']) if count > 0]
+    
+    # Violating rows are only materialized for the rule asked about
+    shown = st.selectbox("Show violating rows for", ["(none)"] + violated, key="rule_show")
+    if shown != "(none)":
+        positions = np.flatnonzero(violation_mask(evaluation, [names.index(shown)]))
+        st.caption(f"First {min(len(positions), 1000)} of {len(positions)} rows")
+        st.dataframe(data.iloc[positions[:1000]], use_container_width=True)
+    
+    enforced = st.multiselect("Remove rows violating", violated, default=violated, key="rule_enforce")
+    if enforced:
+        remove = violation_mask(evaluation, [names.index(name) for name in enforced])
+        if st.button(f"Remove {int(remove.sum())} Violating Rows", key="apply_rules"):
+            commit_cleaning_step(
+                data[~remove], f"Rule set validation ({len(enforced)} rules): removed {int(remove.sum())} rows",
+                recipe_step('validate_rules', rules=[rules[names.index(name)] for name in enforced])
+            )
+            st.success(f"✅ Removed {int(remove.sum())} violating rows")
+            st.rerun()
+
+def rule_file_controls(rules):
+    """Download the rule set as JSON, or load a saved one"""
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.download_button(
+            label=f"💾 Download Rules ({len(rules)})",
+            data=save_rules(rules),
+            file_name="validation_rules.json",
+            mime="application/json",
+            disabled=not rules,
+            use_container_width=True
+        )
+    
+    with col2:
+        rules_file = st.file_uploader("Load saved rules", type=['json'], key="rules_upload")
+        if rules_file is not None and st.button("📂 Load Rules", key="load_rules"):
+            try:
+                st.session_state.validation_rules = load_rules(rules_file.getvalue())
+                st.session_state.rule_set_version += 1
+                st.rerun()
+            except (ValueError, KeyError) as e:
+                st.error(f"❌ Could not load rules: {str(e)}")
+
 def range_validation(data):
     """Validate numeric ranges"""
     st.markdown("#### Range Validation")
@@ -730,15 +1304,10 @@ def range_validation(data):
             action = st.selectbox("Action for violations:", ["Remove Rows", "Clip to Range", "Set to NaN"])
             
             if st.button("Apply Validation", key="apply_range"):
-                if action == "Remove Rows":
-                    data = data[(data[selected_col] >= min_val) & (data[selected_col] <= max_val)]
-                elif action == "Clip to Range":
-                    data[selected_col] = data[selected_col].clip(min_val, max_val)
-                else:
-                    data.loc[(data[selected_col] < min_val) | (data[selected_col] > max_val), selected_col] = np.nan
-                
-                st.session_state.cleaned_data = data
-                log_cleaning_action(f"Range validation on '{selected_col}': {action}")
+                apply_recipe_step(
+                    data, f"Range validation on '{selected_col}': {action}",
+                    'validate_range', column=selected_col, min_value=min_val, max_value=max_val, action=action
+                )
                 st.success(f"✅ Applied {action}")
                 st.rerun()
 
@@ -746,7 +1315,7 @@ def pattern_validation(data):
     """Validate using regex patterns"""
     st.markdown("#### Pattern Matching (Regex)")
     
-    object_cols = data.select_dtypes(include=['object']).columns.tolist()
+    object_cols = text_columns(data)
     
     if not object_cols:
         st.warning("No text columns found")
@@ -760,11 +1329,15 @@ def pattern_validation(data):
             placeholder="e.g., ^[A-Z]{2}\\d{4}$ for format like AB1234",
             help="Use Python regex syntax"
         )
+        allow_missing = not st.checkbox(
+            "Count missing values as violations", value=True, key="pattern_missing",
+            help="Missing values cannot match a pattern; untick to keep them"
+        )
         
         if pattern:
             try:
-                matches = data[selected_col].astype(str).str.match(pattern, na=False)
-                violations = data[~matches]
+                codes, uniques = factorize_column(data, selected_col)
+                violations = data[~pattern_mask(codes, uniques, pattern, allow_missing)]
                 
                 st.metric("Violations Found", len(violations))
                 
@@ -773,9 +1346,10 @@ def pattern_validation(data):
                         st.dataframe(violations[[selected_col]], use_container_width=True)
                     
                     if st.button("Remove Invalid Rows", key="apply_pattern"):
-                        data = data[matches]
-                        st.session_state.cleaned_data = data
-                        log_cleaning_action(f"Pattern validation on '{selected_col}': removed {len(violations)} rows")
+                        apply_recipe_step(
+                            data, f"Pattern validation on '{selected_col}': removed {len(violations)} rows",
+                            'validate_pattern', column=selected_col, pattern=pattern, allow_missing=allow_missing
+                        )
                         st.success(f"✅ Removed {len(violations)} invalid rows")
                         st.rerun()
                 else:
@@ -790,28 +1364,39 @@ def unique_validation(data):
     
     selected_col = st.selectbox("Select column that should be unique", data.columns, key="unique_col")
     
+    near = st.checkbox("Treat near-identical text as duplicates", key="unique_near",
+                       help="Values differing only by typos, casing, punctuation or whitespace")
+    threshold = DEFAULT_THRESHOLD
+    if near:
+        threshold = st.slider("Similarity threshold", 0.5, 1.0, DEFAULT_THRESHOLD, 0.05, key="unique_near_threshold")
+    
     if selected_col:
-        duplicates = data[data.duplicated(subset=[selected_col], keep=False)]
-        duplicate_count = len(duplicates)
+        if near:
+            with st.spinner("Clustering near-identical values..."):
+                near_result = cached_near_duplicates(data, [selected_col], threshold)
+            duplicate_mask = near_result['sizes'] > 1
+        else:
+            duplicate_mask = duplicated_mask(data, subset=[selected_col], keep=False)
+        duplicate_count = int(duplicate_mask.sum())
         
         st.metric("Duplicate Values Found", duplicate_count)
         
         if duplicate_count > 0:
             if st.checkbox("Show duplicates"):
-                st.dataframe(duplicates, use_container_width=True)
+                st.dataframe(data[duplicate_mask], use_container_width=True)
             
             action = st.selectbox("Action:", ["Keep First", "Keep Last", "Remove All Duplicates"])
             
             if st.button("Apply Constraint", key="apply_unique"):
-                if action == "Keep First":
-                    data.drop_duplicates(subset=[selected_col], keep='first', inplace=True)
-                elif action == "Keep Last":
-                    data.drop_duplicates(subset=[selected_col], keep='last', inplace=True)
+                keep = {"Keep First": 'first', "Keep Last": 'last'}.get(action, False)
+                if near:
+                    data = data[~near_duplicate_mask(near_result, keep)]
+                    step = recipe_step('drop_near_duplicates', columns=[selected_col], threshold=threshold, keep=keep)
                 else:
-                    data = data[~data.duplicated(subset=[selected_col], keep=False)]
+                    data = drop_duplicate_rows(data, subset=[selected_col], keep=keep)
+                    step = recipe_step('drop_duplicates', subset=[selected_col], keep=keep)
                 
-                st.session_state.cleaned_data = data
-                log_cleaning_action(f"Unique constraint on '{selected_col}': {action}")
+                commit_cleaning_step(data, f"Unique constraint on '{selected_col}': {action}", step)
                 st.success(f"✅ Applied {action}")
                 st.rerun()
         else:
@@ -855,9 +1440,10 @@ def cross_column_validation(data):
                 st.dataframe(violations[[col1, col2]], use_container_width=True)
             
             if st.button("Remove Violating Rows", key="apply_cross"):
-                valid_data = data[~data.index.isin(violations.index)]
-                st.session_state.cleaned_data = valid_data
-                log_cleaning_action(f"Cross-column validation: {col1} {operator} {col2}, removed {len(violations)} rows")
+                apply_recipe_step(
+                    data, f"Cross-column validation: {col1} {operator} {col2}, removed {len(violations)} rows",
+                    'validate_cross_column', left=col1, operator=operator, right=col2
+                )
                 st.success(f"✅ Removed {len(violations)} violating rows")
                 st.rerun()
         else:
@@ -867,36 +1453,77 @@ def export_and_history(cleaned_data, original_data):
     """Export cleaned data and view cleaning history"""
     st.subheader("Export & History")
     
+    journal = st.session_state.cleaning_journal
+    
     # Undo/Redo functionality
     st.markdown("### 🔄 Undo/Redo")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("↩️ Undo (Reset to Original)", key="undo"):
+        if st.button("↩️ Undo", key="undo", disabled=not journal.done, use_container_width=True):
+            undo_cleaning_step()
+            st.rerun()
+    
+    with col2:
+        if st.button("↪️ Redo", key="redo", disabled=not journal.undone, use_container_width=True):
+            redo_cleaning_step()
+            st.rerun()
+    
+    with col3:
+        if st.button("⏮️ Reset to Original", key="reset_original", use_container_width=True):
             st.session_state.cleaned_data = original_data.copy()
             st.session_state.cleaning_history = []
+            st.session_state.cleaning_journal = CleaningJournal()
             st.success("✅ Reset to original data")
             st.rerun()
     
-    with col2:
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
         st.metric("Cleaning Steps", len(st.session_state.cleaning_history))
     
-    with col3:
+    with col2:
         original_rows = len(original_data)
         current_rows = len(cleaned_data)
         row_diff = current_rows - original_rows
         st.metric("Row Change", f"{row_diff:+d}")
     
+    with col3:
+        st.metric("Journal Size (MB)", f"{journal.nbytes() / 1024 / 1024:.2f}")
+    
+    if journal.evicted:
+        st.caption(f"The {journal.evicted} oldest step(s) were dropped from the journal to bound memory and can no longer be undone.")
+    
+    # Jump to any step still held in the journal
+    steps = list(range(journal.evicted, journal.position() + len(journal.undone) + 1))
+    if len(steps) > 1:
+        labels = step_labels(journal)
+        target = st.selectbox(
+            "Go to step",
+            steps,
+            index=steps.index(journal.position()),
+            format_func=lambda step: labels.get(step, f"Step {step}"),
+            key="journal_target"
+        )
+        if target != journal.position() and st.button("⏩ Go to Step", key="journal_go"):
+            move_to_step(target)
+            st.rerun()
+    
     # Cleaning history log
     st.markdown("### 📋 Cleaning History")
     
     if st.session_state.cleaning_history:
-        history_df = pd.DataFrame(st.session_state.cleaning_history)
+        history_df = history_frame()
         st.dataframe(history_df, use_container_width=True)
     else:
         st.info("No cleaning operations performed yet")
     
+    if journal.undone:
+        st.caption(f"{len(journal.undone)} undone step(s) can be redone")
+    
+    recipe_controls(cleaned_data)
+    
     st.markdown("---")
     
     # Export section
@@ -910,9 +1537,11 @@ def export_and_history(cleaned_data, original_data):
     with col2:
         st.metric("Cleaned Rows", len(cleaned_data))
     with col3:
-        original_memory = original_data.memory_usage(deep=True).sum() / 1024 / 1024
-        cleaned_memory = cleaned_data.memory_usage(deep=True).sum() / 1024 / 1024
-        st.metric("Memory (MB)", f"{cleaned_memory:.2f}", delta=f"{cleaned_memory - original_memory:.2f}")
+        original_memory = frame_memory(original_data)['total'] / 1024 / 1024
+        cleaned_memory = frame_memory(cleaned_data)
+        st.metric("Memory (MB)", f"{cleaned_memory['total'] / 1024 / 1024:.2f}",
+                  delta=f"{cleaned_memory['total'] / 1024 / 1024 - original_memory:.2f}",
+                  help=None if cleaned_memory['exact'] else "Text columns estimated from a sample")
     with col4:
         missing_before = original_data.isnull().sum().sum()
         missing_after = cleaned_data.isnull().sum().sum()
@@ -921,82 +1550,72 @@ def export_and_history(cleaned_data, original_data):
     # Export format selection
     export_format = st.selectbox(
         "Select export format:",
-        ["CSV", "Excel (XLSX)", "Parquet", "JSON"]
+        list(EXPORT_FORMATS),
+        help=FORMAT_HELP
     )
     
+    compression = "none"
+    if export_format in TEXT_FORMATS:
+        compression = st.selectbox("Compression:", COMPRESSIONS, key="export_compression")
+    
     include_report = st.checkbox("Include cleaning report", value=True)
     
-    # Generate download button
-    if export_format == "CSV":
-        file_data = cleaned_data.to_csv(index=False).encode('utf-8')
-        file_name = "cleaned_data.csv"
-        mime_type = "text/csv"
+    if export_format == "Excel (XLSX)" and len(cleaned_data) >= EXCEL_MAX_ROWS:
+        st.error(f"❌ Excel sheets hold at most {EXCEL_MAX_ROWS - 1:,} rows; choose another format")
+        return
     
-    elif export_format == "Excel (XLSX)":
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            cleaned_data.to_excel(writer, sheet_name='Cleaned Data', index=False)
-            
-            if include_report:
-                # Add summary sheet
-                summary_data = {
-                    'Metric': ['Original Rows', 'Cleaned Rows', 'Rows Removed', 'Original Columns', 
-                              'Cleaned Columns', 'Missing Values (Before)', 'Missing Values (After)'],
-                    'Value': [
-                        len(original_data),
-                        len(cleaned_data),
-                        len(original_data) - len(cleaned_data),
-                        len(original_data.columns),
-                        len(cleaned_data.columns),
-                        original_data.isnull().sum().sum(),
-                        cleaned_data.isnull().sum().sum()
-                    ]
-                }
-                pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Add cleaning history
-                if st.session_state.cleaning_history:
-                    pd.DataFrame(st.session_state.cleaning_history).to_excel(
-                        writer, sheet_name='Cleaning History', index=False
-                    )
-        
-        file_data = buffer.getvalue()
-        file_name = "cleaned_data.xlsx"
-        mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    
-    elif export_format == "Parquet":
-        buffer = BytesIO()
-        cleaned_data.to_parquet(buffer, index=False)
-        file_data = buffer.getvalue()
-        file_name = "cleaned_data.parquet"
-        mime_type = "application/octet-stream"
-    
-    else:  # JSON
-        file_data = cleaned_data.to_json(orient='records', indent=2).encode('utf-8')
-        file_name = "cleaned_data.json"
-        mime_type = "application/json"
+    # Files are only written when a download is clicked, then reused until the data changes
+    prune_exports()
+    cache = versioned_cache('exports', cleaned_data)
+    history = list(st.session_state.cleaning_history)
+    key = (export_format, compression, include_report, len(history))
+    directory = export_dir()
+    
+    def report_sheets():
+        return excel_report_sheets(original_data, cleaned_data, history) if include_report else None
     
     st.download_button(
         label=f"📥 Download {export_format}",
-        data=file_data,
-        file_name=file_name,
-        mime=mime_type,
+        data=lambda: export_bytes(cache, key, cleaned_data, export_format, compression, report_sheets, directory),
+        file_name=export_file_name(export_format, compression),
+        mime=export_mime(export_format, compression),
         use_container_width=True
     )
     
     # Generate cleaning report separately
     if include_report and export_format != "Excel (XLSX)":
-        report = generate_cleaning_report(original_data, cleaned_data)
         st.download_button(
             label="📄 Download Cleaning Report (TXT)",
-            data=report,
+            data=lambda: generate_cleaning_report(original_data, cleaned_data, history),
             file_name="cleaning_report.txt",
             mime="text/plain",
             use_container_width=True
         )
 
-def generate_cleaning_report(original_data, cleaned_data):
-    """Generate a text cleaning report"""
+def excel_report_sheets(original_data, cleaned_data, history):
+    """Summary and cleaning history sheets for the Excel export"""
+    summary_data = {
+        'Metric': ['Original Rows', 'Cleaned Rows', 'Rows Removed', 'Original Columns', 
+                  'Cleaned Columns', 'Missing Values (Before)', 'Missing Values (After)'],
+        'Value': [
+            len(original_data),
+            len(cleaned_data),
+            len(original_data) - len(cleaned_data),
+            len(original_data.columns),
+            len(cleaned_data.columns),
+            original_data.isnull().sum().sum(),
+            cleaned_data.isnull().sum().sum()
+        ]
+    }
+    sheets = {'Summary': pd.DataFrame(summary_data)}
+    if history:
+        sheets['Cleaning History'] = pd.DataFrame(history).drop(columns='Operation', errors='ignore')
+    return sheets
+
+def generate_cleaning_report(original_data, cleaned_data, history=None):
+    """Generate a text cleaning report; history defaults to the session's cleaning history"""
+    if history is None:
+        history = st.session_state.cleaning_history
     report = []
     report.append("=" * 60)
     report.append("DATA CLEANING REPORT")
@@ -1015,24 +1634,107 @@ def generate_cleaning_report(original_data, cleaned_data):
     report.append(f"After: {cleaned_data.isnull().sum().sum():,}")
     
     report.append("\n--- MEMORY USAGE ---")
-    original_memory = original_data.memory_usage(deep=True).sum() / 1024 / 1024
-    cleaned_memory = cleaned_data.memory_usage(deep=True).sum() / 1024 / 1024
+    # Sampled estimates: the report is built off the script thread, so without the session cache
+    original_memory = frame_memory(original_data, cached=False)['total'] / 1024 / 1024
+    cleaned_memory = frame_memory(cleaned_data, cached=False)['total'] / 1024 / 1024
     report.append(f"Before: {original_memory:.2f} MB")
     report.append(f"After: {cleaned_memory:.2f} MB")
     report.append(f"Savings: {original_memory - cleaned_memory:.2f} MB")
     
-    if st.session_state.cleaning_history:
+    if history:
         report.append("\n--- CLEANING OPERATIONS ---")
-        for i, action in enumerate(st.session_state.cleaning_history, 1):
+        for i, action in enumerate(history, 1):
             report.append(f"{i}. [{action['Timestamp']}] {action['Action']}")
     
     report.append("\n" + "=" * 60)
     
     return "\n".join(report)
 
-def log_cleaning_action(action):
-    """Log a cleaning action to history"""
-    st.session_state.cleaning_history.append({
+def apply_recipe_step(data, action, op, /, **params):
+    """Run a recipe operation on the cleaned data and commit it as a cleaning step"""
+    step = recipe_step(op, **params)
+    commit_cleaning_step(apply_operation(data, step), action, step)
+
+def commit_cleaning_step(data, action, operation=None):
+    """
+    Make data the cleaned dataset and record the step as a reversible delta.
+    operation is the recipe step that reproduces the action on other files.
+    """
+    entry = {
         'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'Action': action
-    })
\ No newline at end of file
+    }
+    if operation is not None:
+        entry['Operation'] = operation
+    st.session_state.cleaning_journal.record(st.session_state.cleaned_data, data, entry)
+    st.session_state.cleaned_data = data
+    log_cleaning_action(entry)
+
+def history_frame():
+    """Cleaning history as a table, without the recipe operations"""
+    return pd.DataFrame(st.session_state.cleaning_history).drop(columns='Operation', errors='ignore')
+
+def recipe_controls(data):
+    """Download the applied steps as a recipe, or apply a saved recipe to this dataset"""
+    st.markdown("### 📜 Cleaning Recipe")
+    
+    steps = [entry['Operation'] for entry in st.session_state.cleaning_history if 'Operation' in entry]
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.download_button(
+            label=f"📜 Download Recipe ({len(steps)} steps)",
+            data=save_recipe(steps),
+            file_name="cleaning_recipe.json",
+            mime="application/json",
+            disabled=not steps,
+            use_container_width=True
+        )
+        st.caption("Replay on a folder of files with `python cleaning_recipes.py cleaning_recipe.json <folder>`")
+    
+    with col2:
+        recipe_file = st.file_uploader("Apply a saved recipe", type=['json'], key="recipe_upload")
+        if recipe_file is not None and st.button("▶️ Apply Recipe", key="apply_recipe"):
+            try:
+                recipe_steps = load_recipe(recipe_file.getvalue())
+                for step in recipe_steps:
+                    data = apply_operation(data, step)
+                    commit_cleaning_step(data, f"Recipe: {step['op']}", step)
+                st.success(f"✅ Applied {len(recipe_steps)} recipe steps")
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Could not apply recipe: {str(e)}")
+
+def log_cleaning_action(entry):
+    """Log a cleaning action to history"""
+    st.session_state.cleaning_history.append(entry)
+
+def undo_cleaning_step():
+    """Revert the most recent cleaning step"""
+    data, _ = st.session_state.cleaning_journal.undo(st.session_state.cleaned_data)
+    st.session_state.cleaned_data = data
+    st.session_state.cleaning_history.pop()
+
+def redo_cleaning_step():
+    """Re-apply the most recently undone cleaning step"""
+    data, entry = st.session_state.cleaning_journal.redo(st.session_state.cleaned_data)
+    st.session_state.cleaned_data = data
+    log_cleaning_action(entry)
+
+def move_to_step(target):
+    """Undo or redo until the dataset is at the given step"""
+    journal = st.session_state.cleaning_journal
+    while journal.position() > target:
+        undo_cleaning_step()
+    while journal.position() < target:
+        redo_cleaning_step()
+
+def step_labels(journal):
+    """Selectbox labels for every step the journal can move to"""
+    labels = {0: "0 · Original data"}
+    steps = journal.done + journal.undone[::-1]
+    for i, step in enumerate(steps, journal.evicted + 1):
+        suffix = " (undone)" if i > journal.position() else ""
+        labels[i] = f"{i} · {step['entry']['Action']}{suffix}"
+    return labels
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+import gzip
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+
+# Rows serialized per chunk; also the Parquet row group size
+EXPORT_CHUNK_ROWS = 100_000
+
+# Rows an Excel sheet holds, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+COMPRESSIONS = ["gzip", "zstd", "none"]
+
+# File extension and MIME type per export format
+EXPORT_FORMATS = {
+    "CSV": ('.csv', 'text/csv'),
+    "Excel (XLSX)": ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    "Parquet": ('.parquet', 'application/octet-stream'),
+    "JSON": ('.json', 'application/json'),
+    "JSON Lines": ('.jsonl', 'application/x-ndjson')
+}
+
+# Formats written as text chunks, which can be gzip/zstd compressed
+TEXT_FORMATS = ("CSV", "JSON", "JSON Lines")
+
+FORMAT_HELP = "JSON is a single array of records; JSON Lines has one record per line, for streaming and big-data tools"
+
+def iter_chunks(data, rows=EXPORT_CHUNK_ROWS, positions=None):
+    """
+    Consecutive row slices of the frame (views, not copies), or of the rows
+    at positions in that order, gathered one chunk at a time.
+    """
+    if positions is None:
+        for start in range(0, max(len(data), 1), rows):
+            yield data.iloc[start:start + rows]
+        return
+    for start in range(0, max(len(positions), 1), rows):
+        yield data.iloc[positions[start:start + rows]]
+
+def compress_chunk(raw, compression):
+    """
+    Compress one serialized chunk as a self-contained gzip member or zstd
+    frame; concatenated members/frames decompress as one stream.
+    """
+    if compression == "gzip":
+        return gzip.compress(raw, compresslevel=6)
+    if compression == "zstd":
+        import pyarrow as pa
+        return pa.Codec('zstd').compress(raw, asbytes=True)
+    return raw
+
+def write_text_chunks(path, chunks, compression, workers=None):
+    """
+    Write serialized chunks in order, compressing them on a thread pool
+    (zlib and zstd release the GIL) while the next chunks are serialized.
+    At most two chunks per worker are held in memory.
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+    with open(path, 'wb') as f, ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(compress_chunk, chunk.encode('utf-8'), compression))
+            if len(pending) >= 2 * workers:
+                f.write(pending.popleft().result())
+        while pending:
+            f.write(pending.popleft().result())
+
+def write_csv(data, path, compression, positions=None):
+    """CSV in chunks, header on the first only"""
+    chunks = (chunk.to_csv(index=False, header=i == 0) for i, chunk in enumerate(iter_chunks(data, positions=positions)))
+    write_text_chunks(path, chunks, compression)
+
+def write_jsonl(data, path, compression, positions=None):
+    """One JSON record per line, dates in ISO format"""
+    chunks = (
+        chunk.to_json(orient='records', lines=True, date_format='iso') if len(chunk) else ''
+        for chunk in iter_chunks(data, positions=positions)
+    )
+    write_text_chunks(path, chunks, compression)
+
+def json_array_chunks(data, positions=None):
+    """One indented array of records, as pandas writes it, produced a chunk of records at a time"""
+    first = True
+    for chunk in iter_chunks(data, positions=positions):
+        if not len(chunk):
+            continue
+        # Drop the chunk's own '[\n' and '\n]'
+        records = chunk.to_json(orient='records', indent=2)[2:-2]
+        yield ('[\n' if first else ',\n') + records
+        first = False
+    yield '[\n\n]' if first else '\n]'
+
+def write_json(data, path, compression, positions=None):
+    """JSON array of records, the format of the original JSON download"""
+    write_text_chunks(path, json_array_chunks(data, positions), compression)
+
+def write_parquet(data, path, positions=None):
+    """zstd-compressed Parquet written one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.Schema.from_pandas(data, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in iter_chunks(data, positions=positions):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def excel_rows(data, positions=None):
+    """Header then value rows with missing values as empty cells, converted a chunk at a time"""
+    yield [str(col) for col in data.columns]
+    for chunk in iter_chunks(data, positions=positions):
+        for col in chunk.columns:
+            # Excel has no time zones
+            if isinstance(chunk[col].dtype, pd.DatetimeTZDtype):
+                chunk = chunk.assign(**{col: chunk[col].dt.tz_localize(None)})
+        values = chunk.astype(object).to_numpy(copy=True)
+        values[pd.isna(values)] = None
+        yield from values.tolist()
+
+def write_excel(data, path, sheets=None, positions=None):
+    """
+    Workbook in openpyxl's write-only mode, which streams rows to disk
+    instead of holding every cell. sheets maps extra sheet names to frames.
+    """
+    from openpyxl import Workbook
+    
+    if (len(data) if positions is None else len(positions)) >= EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS - 1:,} data rows")
+    
+    workbook = Workbook(write_only=True)
+    for name, frame in {'Cleaned Data': data, **(sheets or {})}.items():
+        sheet = workbook.create_sheet(name)
+        for row in excel_rows(frame, positions if frame is data else None):
+            sheet.append(row)
+    workbook.save(path)
+
+def export_file_name(export_format, compression, base="cleaned_data"):
+    """Download name, with the compression suffix for text formats"""
+    extension = EXPORT_FORMATS[export_format][0]
+    if export_format in TEXT_FORMATS and compression != "none":
+        extension += '.gz' if compression == "gzip" else '.zst'
+    return base + extension
+
+def export_mime(export_format, compression):
+    """MIME type of the download"""
+    if export_format in TEXT_FORMATS and compression != "none":
+        return 'application/gzip' if compression == "gzip" else 'application/zstd'
+    return EXPORT_FORMATS[export_format][1]
+
+def write_export(data, path, export_format, compression="none", sheets=None, positions=None):
+    """
+    Write the export file for one format; sheets is called for the Excel
+    extra sheets. With positions only those rows are written, in that order.
+    """
+    if export_format == "CSV":
+        write_csv(data, path, compression, positions)
+    elif export_format == "JSON":
+        write_json(data, path, compression, positions)
+    elif export_format == "JSON Lines":
+        write_jsonl(data, path, compression, positions)
+    elif export_format == "Parquet":
+        write_parquet(data, path, positions)
+    else:
+        write_excel(data, path, sheets() if sheets else None, positions)
+
+def export_dir():
+    """Temporary directory holding this session's export files"""
+    if 'export_dir' not in st.session_state or not os.path.isdir(st.session_state.export_dir):
+        st.session_state.export_dir = tempfile.mkdtemp(prefix='datagent_export_')
+    return st.session_state.export_dir
+
+def prune_exports():
+    """Delete export files no longer referenced by a live dataset version"""
+    entries = st.session_state.get('versioned_caches', {}).get('exports', [])
+    live = {path for entry in entries for path in entry['values'].values()}
+    directory = export_dir()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        # Files still being written end in .part
+        if path not in live and not name.endswith('.part'):
+            os.remove(path)
+
+def export_bytes(cache, key, data, export_format, compression="none", sheets=None, directory=None, positions=None):
+    """
+    Export file contents, written once per dataset version and key into a
+    temporary file and read back on later downloads. Safe to call from the
+    download button's worker thread: cache and directory are passed in.
+    """
+    path = cache.get(key)
+    if path is None or not os.path.exists(path):
+        fd, part_path = tempfile.mkstemp(dir=directory, suffix=EXPORT_FORMATS[export_format][0] + '.part')
+        os.close(fd)
+        try:
+            write_export(data, part_path, export_format, compression, sheets, positions)
+        except BaseException:
+            os.remove(part_path)
+            raise
+        path = part_path[:-len('.part')]
+        os.replace(part_path, path)
+        cache[key] = path
+    
+    with open(path, 'rb') as f:
+        return f.read()
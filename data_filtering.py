@@ -1,5 +1,25 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
+from string_dictionary import column_uniques
+from filter_index import is_range_column, column_range, filter_mask
+from result_viewer import result_viewer
+from row_selection import set_row_selection
+
+# Largest integer a slider can carry (JavaScript numbers are doubles)
+MAX_SLIDER_INT = 2 ** 53 - 1
+
+def integer_range_input(column, bounds):
+    """Range of a column with integers too large for a slider, typed in exactly"""
+    col1, col2 = st.columns(2)
+    with col1:
+        low = st.text_input(f"{column} from", str(bounds[0]), key=f"filter_low_{column}")
+    with col2:
+        high = st.text_input(f"{column} to", str(bounds[1]), key=f"filter_high_{column}")
+    try:
+        return int(low), int(high)
+    except ValueError:
+        st.error(f"❌ {column}: enter whole numbers")
+        return bounds
 
 def data_filtering_section(data):
     st.markdown("### Interactive Data Filtering")
@@ -7,18 +27,27 @@ def data_filtering_section(data):
     columns_to_filter = st.multiselect("Select columns to filter", data.columns)
     filters = {}
     for column in columns_to_filter:
-        if data[column].dtype == 'object':
-            filters[column] = st.multiselect(f"Filter {column}", data[column].unique())
-        else:
-            min_val = float(data[column].min())
-            max_val = float(data[column].max())
-            filters[column] = st.slider(f"Filter {column}", min_val, max_val, (min_val, max_val))
-
-    filtered_data = data.copy()
-    for column, filter_val in filters.items():
-        if data[column].dtype == 'object':
-            filtered_data = filtered_data[filtered_data[column].isin(filter_val)]
+        if is_range_column(data[column]):
+            # Bounds come from the column's sorted index instead of a min/max scan
+            bounds = column_range(data, column)
+            if bounds is None or bounds[0] == bounds[1]:
+                st.caption(f"{column}: only one value, nothing to filter")
+                continue
+            if isinstance(bounds[0], int) and max(abs(bounds[0]), abs(bounds[1])) > MAX_SLIDER_INT:
+                filters[column] = integer_range_input(column, bounds)
+            else:
+                filters[column] = st.slider(f"Filter {column}", bounds[0], bounds[1], bounds)
         else:
-            filtered_data = filtered_data[(filtered_data[column] >= filter_val[0]) & (filtered_data[column] <= filter_val[1])]
-
-    st.write(filtered_data)
\ No newline at end of file
+            filters[column] = st.multiselect(f"Filter {column}", column_uniques(data, column))
+    
+    # One mask for all filters; only the visible page of rows is copied
+    mask = filter_mask(data, filters)
+    positions = None if mask is None else np.flatnonzero(mask)
+    
+    # The other tabs read the filtered rows as positions into the same frame
+    if st.toggle("Use the filtered rows in the other tabs", value=True, key="share_filter"):
+        positions = set_row_selection(data, positions)
+    else:
+        set_row_selection(data, None)
+    
+    result_viewer(data, positions, key="filter", file_name="filtered_data")
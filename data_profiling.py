@@ -7,26 +7,120 @@ from plotly.subplots import make_subplots
 import seaborn as sns
 import matplotlib.pyplot as plt
 from io import BytesIO
+from profiling_jobs import get_profiling_job, cancel_profiling_job, raise_if_cancelled
+from row_fingerprints import row_fingerprints
+from memory_accounting import column_memory
+from missing_patterns import analyze_missing_patterns
+from profile_store import load_snapshot, save_snapshot, has_snapshot, export_snapshot, import_snapshot
 
-def data_profiling_dashboard(data):
+# Seconds between refreshes of the dashboard while profiling is still running
+PROFILE_REFRESH_SECONDS = 1.0
+
+# Maximum number of rows drawn in the missing values heatmap
+HEATMAP_MAX_ROWS = 1000
+
+# Bump whenever the structure of a profile section changes so stale snapshots are recomputed
+PROFILE_SCHEMA_VERSION = 3
+
+# Distribution tab: histogram bins, KDE grid points and outlier points sent to the browser
+HISTOGRAM_BINS = 50
+KDE_GRID_SIZE = 512
+BOX_MAX_OUTLIERS = 200
+
+def data_profiling_dashboard(data, version=None):
     """
-    Comprehensive data profiling dashboard with quality metrics and visualizations
+    Comprehensive data profiling dashboard with quality metrics and visualizations.
+    Profiling runs as a background job per dataset version; each tab renders as
+    soon as its section is ready. When version is the upload's content hash the
+    finished profile is persisted and reused on re-upload.
     """
     st.header("📊 Data Profiling Dashboard")
     
-    # Overview metrics
-    col1, col2, col3, col4 = st.columns(4)
+    persist = version is not None
+    if version is None:
+        version = id(data)
+    
+    job = get_profiling_job(
+        data, version, PROFILE_SECTIONS,
+        load_results=(lambda: load_snapshot(version, PROFILE_SCHEMA_VERSION)) if persist else None,
+        on_complete=(lambda results: save_snapshot(version, results, PROFILE_SCHEMA_VERSION)) if persist else None
+    )
+    
+    # Poll for finished sections only while the job is still running
+    polling = not job.done()
+    refresh = PROFILE_REFRESH_SECONDS if polling else None
+    st.fragment(show_profile, run_every=refresh)(data, job, polling)
+    
+    if persist:
+        show_snapshot_controls(version, job)
+
+def show_snapshot_controls(version, job):
+    """Export the stored profile or attach one computed elsewhere"""
+    st.markdown("#### 💾 Profile Snapshot")
+    
+    col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Total Rows", f"{len(data):,}")
+        if job.done() and has_snapshot(version, PROFILE_SCHEMA_VERSION):
+            st.download_button(
+                label="📥 Export Profile",
+                data=export_snapshot(version),
+                file_name=f"profile_{version[:12]}.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+        else:
+            st.caption("The profile can be exported once profiling has finished.")
+    
     with col2:
-        st.metric("Total Columns", len(data.columns))
-    with col3:
-        missing_pct = (data.isnull().sum().sum() / (len(data) * len(data.columns)) * 100)
-        st.metric("Missing Values", f"{missing_pct:.2f}%")
-    with col4:
-        duplicate_count = data.duplicated().sum()
-        st.metric("Duplicate Rows", f"{duplicate_count:,}")
+        snapshot_file = st.file_uploader("Import a profile snapshot", type=["zip"], key="profile_snapshot_upload")
+        
+        if snapshot_file is not None and st.session_state.get('imported_snapshot_id') != snapshot_file.file_id:
+            st.session_state.imported_snapshot_id = snapshot_file.file_id
+            try:
+                source_key = import_snapshot(snapshot_file.getvalue(), version, PROFILE_SCHEMA_VERSION)
+            except Exception as e:
+                st.error(f"❌ Import failed: {str(e)}")
+            else:
+                if source_key != version:
+                    st.session_state.snapshot_import_warning = "⚠️ The imported profile was computed on a different file than the current upload"
+                cancel_profiling_job()
+                st.rerun()
+        
+        if 'snapshot_import_warning' in st.session_state:
+            st.warning(st.session_state.pop('snapshot_import_warning'))
+
+def show_profile(data, job, polling):
+    """Render the profile sections that are ready and progress for the rest"""
+    if polling and job.done():
+        # Rerun once so the dashboard is rebuilt without the polling timer
+        st.rerun()
+    
+    if not job.done():
+        st.progress(job.progress(), text=f"Profiling in progress... {job.progress():.0%} complete")
+    
+    # Overview metrics
+    overview = job.result('overview')
+    col1, col2, col3, col4 = st.columns(4)
+    
+    if overview is None:
+        with col1:
+            st.metric("Total Rows", f"{len(data):,}")
+        with col2:
+            st.metric("Total Columns", len(data.columns))
+        with col3:
+            st.metric("Missing Values", "…")
+        with col4:
+            st.metric("Duplicate Rows", "…")
+    else:
+        with col1:
+            st.metric("Total Rows", f"{overview['rows']:,}")
+        with col2:
+            st.metric("Total Columns", overview['columns'])
+        with col3:
+            st.metric("Missing Values", f"{overview['missing_pct']:.2f}%")
+        with col4:
+            st.metric("Duplicate Rows", f"{overview['duplicate_count']:,}")
     
     # Create tabs for different profiling sections
     prof_tab1, prof_tab2, prof_tab3, prof_tab4, prof_tab5 = st.tabs([
@@ -38,42 +132,77 @@ def data_profiling_dashboard(data):
     ])
     
     with prof_tab1:
-        show_data_quality_report(data)
+        if section_ready(job, 'quality'):
+            show_data_quality_report(job.result('quality'))
     
     with prof_tab2:
-        show_missing_values_heatmap(data)
+        if section_ready(job, 'missing'):
+            show_missing_values_heatmap(job.result('missing'))
     
     with prof_tab3:
-        show_distribution_analysis(data)
+        if section_ready(job, 'distribution'):
+            show_distribution_analysis(job.result('distribution'))
     
     with prof_tab4:
-        show_correlation_analysis(data)
+        if section_ready(job, 'correlation'):
+            show_correlation_analysis(job.result('correlation'))
     
     with prof_tab5:
-        show_column_statistics(data)
+        if section_ready(job, 'statistics'):
+            show_column_statistics(data, job.result('statistics'))
 
-def show_data_quality_report(data):
-    """Generate comprehensive data quality report"""
-    st.subheader("Data Quality Report")
+def section_ready(job, name):
+    """Show a progress placeholder or error for a section; True once it can be rendered"""
+    if not job.is_ready(name):
+        st.info("⏳ Computing this section in the background...")
+        st.progress(job.progress())
+        return False
+    
+    error = job.error(name)
+    if error is not None:
+        st.error(f"❌ Profiling failed: {error}")
+        return False
+    
+    return True
+
+def compute_overview(data, cancel_event=None):
+    """Dataset-level metrics shown above the profiling tabs"""
+    total_cells = len(data) * len(data.columns)
+    missing_count = int(data.isnull().sum().sum())
+    raise_if_cancelled(cancel_event)
+    
+    return {
+        'rows': len(data),
+        'columns': len(data.columns),
+        'missing_pct': (missing_count / total_cells * 100) if total_cells else 0.0,
+        'duplicate_count': int(pd.Series(row_fingerprints(data)).duplicated().sum())
+    }
+
+def compute_quality_report(data, cancel_event=None):
+    """Per-column quality metrics and detected issues"""
+    missing_counts = data.isnull().sum()
+    raise_if_cancelled(cancel_event)
     
-    # Create quality report dataframe
     quality_report = []
+    unique_counts = {}
     
     for col in data.columns:
+        raise_if_cancelled(cancel_event)
         col_data = data[col]
         
         # Basic stats
         total_count = len(col_data)
-        missing_count = col_data.isnull().sum()
-        missing_pct = (missing_count / total_count * 100)
+        missing_count = int(missing_counts[col])
+        missing_pct = (missing_count / total_count * 100) if total_count else 0.0
         unique_count = col_data.nunique()
-        unique_pct = (unique_count / total_count * 100)
+        unique_pct = (unique_count / total_count * 100) if total_count else 0.0
+        unique_counts[col] = unique_count
         
         # Data type
         dtype = str(col_data.dtype)
         
         # Memory usage
-        memory_mb = col_data.memory_usage(deep=True) / 1024 / 1024
+        memory_mb = column_memory(col_data)['bytes'] / 1024 / 1024
         
         # Quality score (simple heuristic)
         quality_score = 100 - missing_pct
@@ -91,7 +220,232 @@ def show_data_quality_report(data):
             'Quality Score': f"{quality_score:.1f}"
         })
     
-    quality_df = pd.DataFrame(quality_report)
+    return {
+        'report': pd.DataFrame(quality_report),
+        'constant_cols': [col for col, n in unique_counts.items() if n == 1],
+        'high_cardinality': [col for col, n in unique_counts.items() if n > len(data) * 0.9],
+        'potential_ids': [col for col, n in unique_counts.items() if n == len(data)]
+    }
+
+def compute_missing_summary(data, cancel_event=None):
+    """Missing value counts plus a row sample of the null mask for the heatmap"""
+    missing_counts = data.isnull().sum()
+    raise_if_cancelled(cancel_event)
+    
+    missing_summary = pd.DataFrame({
+        'Column': data.columns,
+        'Missing Count': missing_counts.values,
+        'Missing Percentage': (missing_counts.values / max(len(data), 1) * 100).round(2)
+    })
+    missing_summary = missing_summary[missing_summary['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
+    
+    # Evenly spaced rows keep the heatmap size independent of the row count
+    if len(data) > HEATMAP_MAX_ROWS:
+        positions = np.linspace(0, len(data) - 1, HEATMAP_MAX_ROWS).astype(int)
+        heatmap_mask = data.iloc[positions].isnull()
+    else:
+        heatmap_mask = data.isnull()
+    
+    return {
+        'total_missing': int(missing_counts.sum()),
+        'summary': missing_summary,
+        'heatmap_mask': heatmap_mask,
+        'patterns': analyze_missing_patterns(data, cancel_event=cancel_event)
+    }
+
+def compute_distributions(data, cancel_event=None):
+    """Summary statistics for the distribution tab"""
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+    
+    numeric_stats = {}
+    if numeric_cols:
+        stats = data[numeric_cols].agg(['mean', 'median', 'std', 'min', 'max'])
+        raise_if_cancelled(cancel_event)
+        for col in numeric_cols:
+            raise_if_cancelled(cancel_event)
+            values = data[col].to_numpy(dtype=float, na_value=np.nan)
+            values = values[np.isfinite(values)]
+            
+            numeric_stats[col] = {
+                'mean': stats.at['mean', col],
+                'median': stats.at['median', col],
+                'std': stats.at['std', col],
+                'range': stats.at['max', col] - stats.at['min', col],
+                'histogram': histogram_summary(values, HISTOGRAM_BINS),
+                'box': box_summary(values, BOX_MAX_OUTLIERS),
+                'kde': fft_kde(values, KDE_GRID_SIZE)
+            }
+    
+    categorical_stats = {}
+    for col in categorical_cols:
+        raise_if_cancelled(cancel_event)
+        value_counts = data[col].value_counts()
+        categorical_stats[col] = {
+            'top_values': value_counts.head(20),
+            'unique_count': len(value_counts)
+        }
+    
+    return {
+        'numeric_cols': numeric_cols,
+        'categorical_cols': categorical_cols,
+        'numeric_stats': numeric_stats,
+        'categorical_stats': categorical_stats
+    }
+
+def histogram_summary(values, bins):
+    """Histogram counts and bin edges computed on the server"""
+    if len(values) == 0:
+        return {'counts': np.array([], dtype=np.int64), 'edges': np.array([], dtype=float)}
+    
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+def box_summary(values, max_outliers, seed=0):
+    """Quartiles, Tukey whiskers and a sample of the points beyond them"""
+    if len(values) == 0:
+        return None
+    
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    
+    # Whiskers end at the most extreme values inside 1.5 * IQR, as in a Plotly box
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    
+    outlier_count = len(outliers)
+    if outlier_count > max_outliers:
+        rng = np.random.default_rng(seed)
+        outliers = rng.choice(outliers, size=max_outliers, replace=False)
+    
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lower_whisker': inside.min(),
+        'upper_whisker': inside.max(),
+        'mean': values.mean(),
+        'outliers': outliers,
+        'outlier_count': outlier_count
+    }
+
+def fft_kde(values, grid_size):
+    """
+    Gaussian kernel density estimate on an evenly spaced grid.
+    Values are linearly binned onto the grid and convolved with the kernel via
+    FFT, so the cost is O(n + grid_size log grid_size) instead of O(n * grid_size).
+    """
+    n = len(values)
+    if n < 2:
+        return None
+    
+    std = values.std(ddof=1)
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = min(std, (q3 - q1) / 1.34) if q3 > q1 else std
+    if not spread > 0:
+        return None
+    
+    # Silverman's rule of thumb
+    bandwidth = 0.9 * spread * n ** (-0.2)
+    
+    low = values.min() - 3 * bandwidth
+    high = values.max() + 3 * bandwidth
+    grid = np.linspace(low, high, grid_size)
+    delta = grid[1] - grid[0]
+    
+    # Linear binning: split each value's weight between its two nearest grid points
+    position = (values - low) / delta
+    left = np.clip(np.floor(position).astype(np.int64), 0, grid_size - 2)
+    weight = position - left
+    counts = (
+        np.bincount(left, weights=1 - weight, minlength=grid_size) +
+        np.bincount(left + 1, weights=weight, minlength=grid_size)
+    )
+    
+    # Kernel evaluated at grid offsets, truncated at 4 bandwidths
+    reach = min(grid_size - 1, int(np.ceil(4 * bandwidth / delta)))
+    offsets = np.arange(-reach, reach + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    
+    size = 1 << int(np.ceil(np.log2(grid_size + len(kernel))))
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(smoothed[reach:reach + grid_size], 0) / n
+    
+    return {'grid': grid, 'density': density, 'bandwidth': bandwidth}
+
+def compute_correlation(data, cancel_event=None):
+    """Correlation matrix for numeric columns"""
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    
+    if len(numeric_cols) < 2:
+        return {'numeric_cols': numeric_cols, 'matrix': None}
+    
+    return {'numeric_cols': numeric_cols, 'matrix': data[numeric_cols].corr()}
+
+def compute_column_statistics(data, cancel_event=None):
+    """Detailed per-column statistics for the column statistics tab"""
+    non_null_counts = data.count()
+    null_counts = data.isnull().sum()
+    unique_counts = data.nunique()
+    raise_if_cancelled(cancel_event)
+    
+    numeric_cols = data.select_dtypes(include=[np.number]).columns
+    numeric_table = None
+    if len(numeric_cols) > 0:
+        numeric_data = data[numeric_cols]
+        numeric_table = numeric_data.agg(['count', 'mean', 'std', 'min']).T
+        quantiles = numeric_data.quantile([0.25, 0.50, 0.75]).T
+        numeric_table['25%'] = quantiles[0.25]
+        numeric_table['50%'] = quantiles[0.50]
+        numeric_table['75%'] = quantiles[0.75]
+        numeric_table['max'] = numeric_data.max()
+        numeric_table['skew'] = numeric_data.skew()
+        numeric_table['kurtosis'] = numeric_data.kurtosis()
+    
+    columns = {}
+    for col in data.columns:
+        raise_if_cancelled(cancel_event)
+        col_stats = {
+            'dtype': str(data[col].dtype),
+            'non_null': int(non_null_counts[col]),
+            'null': int(null_counts[col]),
+            'unique': int(unique_counts[col])
+        }
+        
+        if col in numeric_cols:
+            row = numeric_table.loc[col]
+            col_stats['numeric'] = pd.DataFrame({
+                'Statistic': ['Count', 'Mean', 'Std', 'Min', '25%', '50%', '75%', 'Max', 'Skewness', 'Kurtosis'],
+                'Value': [row['count'], row['mean'], row['std'], row['min'], row['25%'],
+                          row['50%'], row['75%'], row['max'], row['skew'], row['kurtosis']]
+            })
+        else:
+            value_counts = data[col].value_counts().head(10)
+            col_stats['categorical'] = pd.DataFrame({
+                'Value': value_counts.index,
+                'Count': value_counts.values,
+                'Percentage': (value_counts.values / max(len(data), 1) * 100).round(2)
+            })
+        
+        columns[col] = col_stats
+    
+    return {'columns': columns}
+
+# Background sections of the profiling job, in display order
+PROFILE_SECTIONS = {
+    'overview': compute_overview,
+    'quality': compute_quality_report,
+    'missing': compute_missing_summary,
+    'distribution': compute_distributions,
+    'correlation': compute_correlation,
+    'statistics': compute_column_statistics
+}
+
+def show_data_quality_report(quality):
+    """Generate comprehensive data quality report"""
+    st.subheader("Data Quality Report")
+    
+    quality_df = quality['report']
     
     # Display with color coding
     st.dataframe(
@@ -111,19 +465,19 @@ def show_data_quality_report(data):
         issues.append(f"**{len(high_missing)} columns** have missing values")
     
     # Check for constant columns
-    constant_cols = [col for col in data.columns if data[col].nunique() == 1]
+    constant_cols = quality['constant_cols']
     if constant_cols:
-        issues.append(f"**{len(constant_cols)} columns** have only one unique value: {', '.join(constant_cols)}")
+        issues.append(f"**{len(constant_cols)} columns** have only one unique value: {', '.join(map(str, constant_cols))}")
     
     # Check for high cardinality
-    high_cardinality = [col for col in data.columns if data[col].nunique() > len(data) * 0.9]
+    high_cardinality = quality['high_cardinality']
     if high_cardinality:
         issues.append(f"**{len(high_cardinality)} columns** have very high cardinality (>90% unique)")
     
     # Check for potential ID columns
-    potential_ids = [col for col in data.columns if data[col].nunique() == len(data)]
+    potential_ids = quality['potential_ids']
     if potential_ids:
-        issues.append(f"**{len(potential_ids)} columns** appear to be ID columns: {', '.join(potential_ids)}")
+        issues.append(f"**{len(potential_ids)} columns** appear to be ID columns: {', '.join(map(str, potential_ids))}")
     
     if issues:
         for issue in issues:
@@ -131,19 +485,19 @@ def show_data_quality_report(data):
     else:
         st.success("✅ No major data quality issues detected!")
 
-def show_missing_values_heatmap(data):
+def show_missing_values_heatmap(missing):
     """Display missing values heatmap"""
     st.subheader("Missing Values Heatmap")
     
-    missing_data = data.isnull()
-    
-    if missing_data.sum().sum() == 0:
+    if missing['total_missing'] == 0:
         st.success("✅ No missing values in the dataset!")
         return
     
+    missing_data = missing['heatmap_mask']
+    
     # Create heatmap using plotly
     fig = go.Figure(data=go.Heatmap(
-        z=missing_data.T.values,
+        z=missing_data.T.values.astype(int),
         x=missing_data.index,
         y=missing_data.columns,
         colorscale=[[0, '#2ecc71'], [1, '#e74c3c']],
@@ -155,7 +509,7 @@ def show_missing_values_heatmap(data):
         title="Missing Values Pattern",
         xaxis_title="Row Index",
         yaxis_title="Columns",
-        height=max(400, len(data.columns) * 20),
+        height=max(400, len(missing_data.columns) * 20),
         xaxis=dict(showticklabels=False)
     )
     
@@ -163,12 +517,7 @@ def show_missing_values_heatmap(data):
     
     # Missing values summary
     st.subheader("Missing Values Summary")
-    missing_summary = pd.DataFrame({
-        'Column': data.columns,
-        'Missing Count': data.isnull().sum().values,
-        'Missing Percentage': (data.isnull().sum().values / len(data) * 100).round(2)
-    })
-    missing_summary = missing_summary[missing_summary['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
+    missing_summary = missing['summary']
     
     if not missing_summary.empty:
         # Bar chart of missing values
@@ -184,14 +533,46 @@ def show_missing_values_heatmap(data):
         st.plotly_chart(fig_bar, use_container_width=True)
         
         st.dataframe(missing_summary, use_container_width=True)
+    
+    show_missing_patterns(missing['patterns'])
+
+def show_missing_patterns(patterns):
+    """Nullity correlation between columns and the most common row-level missing patterns"""
+    nullity_corr = patterns['nullity_corr']
+    
+    if nullity_corr is not None and len(nullity_corr.columns) >= 2:
+        st.subheader("Nullity Correlation")
+        st.caption("How strongly the missingness of one column predicts the missingness of another (1 = always missing together, -1 = never missing together)")
+        
+        fig = go.Figure(data=go.Heatmap(
+            z=nullity_corr.values,
+            x=[str(c) for c in nullity_corr.columns],
+            y=[str(c) for c in nullity_corr.index],
+            colorscale='RdBu',
+            zmin=-1,
+            zmax=1,
+            text=np.round(nullity_corr.values, 2),
+            texttemplate='%{text}',
+            textfont={"size": 10},
+            colorbar=dict(title="Nullity Corr.")
+        ))
+        fig.update_layout(height=max(400, len(nullity_corr.columns) * 30))
+        st.plotly_chart(fig, use_container_width=True)
+        
+        with st.popover("View co-missing row counts"):
+            st.dataframe(patterns['co_missing'], use_container_width=True)
+    
+    if patterns['patterns'] is not None:
+        st.subheader("Most Common Missing Patterns")
+        st.caption(f"{patterns['distinct_patterns']:,} distinct row patterns of missing values")
+        st.dataframe(patterns['patterns'], use_container_width=True, hide_index=True)
 
-def show_distribution_analysis(data):
+def show_distribution_analysis(distribution):
     """Show distribution visualizations for all columns"""
     st.subheader("Distribution Analysis")
     
-    # Separate numeric and categorical columns
-    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-    categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+    numeric_cols = distribution['numeric_cols']
+    categorical_cols = distribution['categorical_cols']
     
     if numeric_cols:
         st.markdown("### 📊 Numeric Columns")
@@ -200,43 +581,30 @@ def show_distribution_analysis(data):
         selected_num_col = st.selectbox("Select numeric column", numeric_cols, key="dist_num")
         
         if selected_num_col:
-            col_data = data[selected_num_col].dropna()
+            stats = distribution['numeric_stats'][selected_num_col]
+            show_kde = st.checkbox("Overlay density estimate (KDE)", value=False, key="dist_kde")
             
             col1, col2 = st.columns(2)
             
             with col1:
-                # Histogram
-                fig_hist = px.histogram(
-                    col_data,
-                    nbins=50,
-                    title=f"Distribution of {selected_num_col}",
-                    labels={selected_num_col: selected_num_col, 'count': 'Frequency'}
-                )
-                fig_hist.update_traces(marker_color='#3498db')
-                st.plotly_chart(fig_hist, use_container_width=True)
+                # Histogram from pre-binned counts
+                st.plotly_chart(build_histogram_figure(selected_num_col, stats, show_kde), use_container_width=True)
             
             with col2:
-                # Box plot
-                fig_box = px.box(
-                    col_data,
-                    y=col_data.values,
-                    title=f"Box Plot of {selected_num_col}",
-                    labels={'y': selected_num_col}
-                )
-                fig_box.update_traces(marker_color='#e74c3c')
-                st.plotly_chart(fig_box, use_container_width=True)
+                # Box plot from precomputed quartiles and whiskers
+                st.plotly_chart(build_box_figure(selected_num_col, stats['box']), use_container_width=True)
             
             # Statistics
             st.markdown("**Statistics:**")
             stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
             with stats_col1:
-                st.metric("Mean", f"{col_data.mean():.2f}")
+                st.metric("Mean", f"{stats['mean']:.2f}")
             with stats_col2:
-                st.metric("Median", f"{col_data.median():.2f}")
+                st.metric("Median", f"{stats['median']:.2f}")
             with stats_col3:
-                st.metric("Std Dev", f"{col_data.std():.2f}")
+                st.metric("Std Dev", f"{stats['std']:.2f}")
             with stats_col4:
-                st.metric("Range", f"{col_data.max() - col_data.min():.2f}")
+                st.metric("Range", f"{stats['range']:.2f}")
     
     if categorical_cols:
         st.markdown("### 📝 Categorical Columns")
@@ -244,8 +612,12 @@ def show_distribution_analysis(data):
         selected_cat_col = st.selectbox("Select categorical column", categorical_cols, key="dist_cat")
         
         if selected_cat_col:
-            col_data = data[selected_cat_col].dropna()
-            value_counts = col_data.value_counts().head(20)
+            stats = distribution['categorical_stats'][selected_cat_col]
+            value_counts = stats['top_values']
+            
+            if value_counts.empty:
+                st.info(f"No non-null values in {selected_cat_col}")
+                return
             
             # Bar chart
             fig_bar = px.bar(
@@ -262,24 +634,93 @@ def show_distribution_analysis(data):
             st.markdown("**Statistics:**")
             stats_col1, stats_col2, stats_col3 = st.columns(3)
             with stats_col1:
-                st.metric("Unique Values", col_data.nunique())
+                st.metric("Unique Values", stats['unique_count'])
             with stats_col2:
                 st.metric("Most Common", value_counts.index[0])
             with stats_col3:
                 st.metric("Mode Frequency", value_counts.values[0])
 
-def show_correlation_analysis(data):
+def build_histogram_figure(column, stats, show_kde):
+    """Bar chart of server-side histogram counts, optionally with the KDE curve"""
+    counts = stats['histogram']['counts']
+    edges = stats['histogram']['edges']
+    
+    fig = go.Figure()
+    if len(counts) > 0:
+        widths = np.diff(edges)
+        fig.add_trace(go.Bar(
+            x=edges[:-1] + widths / 2,
+            y=counts,
+            width=widths,
+            name="Frequency",
+            marker_color='#3498db'
+        ))
+        
+        kde = stats['kde']
+        if show_kde and kde is not None:
+            # Scale the density to the histogram's count axis
+            fig.add_trace(go.Scatter(
+                x=kde['grid'],
+                y=kde['density'] * counts.sum() * widths[0],
+                mode='lines',
+                name="KDE",
+                line=dict(color='#e67e22', width=2)
+            ))
+    
+    fig.update_layout(
+        title=f"Distribution of {column}",
+        xaxis_title=column,
+        yaxis_title="Frequency",
+        bargap=0,
+        showlegend=show_kde
+    )
+    return fig
+
+def build_box_figure(column, box):
+    """Box plot from precomputed statistics plus a sample of the outliers"""
+    fig = go.Figure()
+    if box is not None:
+        fig.add_trace(go.Box(
+            x=[column],
+            q1=[box['q1']],
+            median=[box['median']],
+            q3=[box['q3']],
+            lowerfence=[box['lower_whisker']],
+            upperfence=[box['upper_whisker']],
+            mean=[box['mean']],
+            name=column,
+            marker_color='#e74c3c',
+            boxpoints=False
+        ))
+        
+        if len(box['outliers']) > 0:
+            shown = len(box['outliers'])
+            fig.add_trace(go.Scatter(
+                x=[column] * shown,
+                y=box['outliers'],
+                mode='markers',
+                name=f"Outliers ({shown:,} of {box['outlier_count']:,})",
+                marker=dict(color='#e74c3c', size=5, opacity=0.6)
+            ))
+    
+    fig.update_layout(
+        title=f"Box Plot of {column}",
+        yaxis_title=column,
+        showlegend=False
+    )
+    return fig
+
+def show_correlation_analysis(correlation):
     """Show correlation matrix for numeric columns"""
     st.subheader("Correlation Analysis")
     
-    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    numeric_cols = correlation['numeric_cols']
     
     if len(numeric_cols) < 2:
         st.warning("Need at least 2 numeric columns for correlation analysis")
         return
     
-    # Calculate correlation matrix
-    corr_matrix = data[numeric_cols].corr()
+    corr_matrix = correlation['matrix']
     
     # Heatmap
     fig = go.Figure(data=go.Heatmap(
@@ -322,55 +763,32 @@ def show_correlation_analysis(data):
     else:
         st.info(f"No correlations found above {threshold:.2f} threshold")
 
-def show_column_statistics(data):
+def show_column_statistics(data, statistics):
     """Show detailed statistics for each column"""
     st.subheader("Detailed Column Statistics")
     
     selected_col = st.selectbox("Select column for detailed analysis", data.columns)
     
     if selected_col:
-        col_data = data[selected_col]
+        col_stats = statistics['columns'][selected_col]
         
         # Basic info
         st.markdown(f"### {selected_col}")
         
         info_col1, info_col2, info_col3, info_col4 = st.columns(4)
         with info_col1:
-            st.metric("Data Type", str(col_data.dtype))
+            st.metric("Data Type", col_stats['dtype'])
         with info_col2:
-            st.metric("Non-Null Count", col_data.count())
+            st.metric("Non-Null Count", col_stats['non_null'])
         with info_col3:
-            st.metric("Null Count", col_data.isnull().sum())
+            st.metric("Null Count", col_stats['null'])
         with info_col4:
-            st.metric("Unique Values", col_data.nunique())
+            st.metric("Unique Values", col_stats['unique'])
         
         # Type-specific statistics
-        if pd.api.types.is_numeric_dtype(col_data):
+        if 'numeric' in col_stats:
             st.markdown("#### Numeric Statistics")
-            stats_df = pd.DataFrame({
-                'Statistic': ['Count', 'Mean', 'Std', 'Min', '25%', '50%', '75%', 'Max', 'Skewness', 'Kurtosis'],
-                'Value': [
-                    col_data.count(),
-                    col_data.mean(),
-                    col_data.std(),
-                    col_data.min(),
-                    col_data.quantile(0.25),
-                    col_data.quantile(0.50),
-                    col_data.quantile(0.75),
-                    col_data.max(),
-                    col_data.skew(),
-                    col_data.kurtosis()
-                ]
-            })
-            st.dataframe(stats_df, use_container_width=True)
+            st.dataframe(col_stats['numeric'], use_container_width=True)
         else:
             st.markdown("#### Categorical Statistics")
-            value_counts = col_data.value_counts().head(10)
-            st.dataframe(
-                pd.DataFrame({
-                    'Value': value_counts.index,
-                    'Count': value_counts.values,
-                    'Percentage': (value_counts.values / len(col_data) * 100).round(2)
-                }),
-                use_container_width=True
-            )
+            st.dataframe(col_stats['categorical'], use_container_width=True)
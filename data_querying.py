@@ -5,6 +5,7 @@ import os
 import re
 import json
 import plotly.express as px
+from row_selection import selected_frame, selection_caption
 
 def display_pandasai_result(result):
     """
@@ -81,8 +82,11 @@ def display_pandasai_result(result):
     
     return False
 
-def data_querying_section(data, model, prompt_template):
+def data_querying_section(data, model, prompt_template, positions=None):
     st.markdown("### Interactive Data Querying")
+    selection_caption(data, positions)
+    # The agent needs a whole frame: the filtered rows are gathered once per selection
+    data = selected_frame(data, positions)
     
     # Get the underlying LLM for text generation tasks (not data queries)
     underlying_llm = model.langchain_llm if hasattr(model, 'langchain_llm') else None
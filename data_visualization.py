@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from row_selection import select_rows, selection_caption
 
-def data_visualization_section(data):
+def data_visualization_section(data, positions=None):
     st.markdown("### Data Visualization")
+    selection_caption(data, positions)
     
     plot_type = st.selectbox(
         "Select plot type",
@@ -31,7 +33,7 @@ def data_visualization_section(data):
     if plot_type == "Histogram":
         column = st.selectbox("Select column for histogram", data.columns)
         try:
-            fig = px.histogram(data, x=column, color=color_col, title=f"Histogram of {column}")
+            fig = px.histogram(select_rows(data, positions, [column, color_col]), x=column, color=color_col, title=f"Histogram of {column}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating histogram: {e}")
@@ -44,7 +46,7 @@ def data_visualization_section(data):
             y_axis = st.selectbox("Select Y-axis", data.columns)
             
         try:
-            fig = px.scatter(data, x=x_axis, y=y_axis, color=color_col, title=f"Scatter Plot: {x_axis} vs {y_axis}")
+            fig = px.scatter(select_rows(data, positions, [x_axis, y_axis, color_col]), x=x_axis, y=y_axis, color=color_col, title=f"Scatter Plot: {x_axis} vs {y_axis}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating scatter plot: {e}")
@@ -57,7 +59,7 @@ def data_visualization_section(data):
             y_axis = st.selectbox("Select Y-axis", data.columns)
             
         try:
-            fig = px.bar(data, x=x_axis, y=y_axis, color=color_col, title=f"Bar Plot: {x_axis} vs {y_axis}")
+            fig = px.bar(select_rows(data, positions, [x_axis, y_axis, color_col]), x=x_axis, y=y_axis, color=color_col, title=f"Bar Plot: {x_axis} vs {y_axis}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating bar plot: {e}")
@@ -68,7 +70,7 @@ def data_visualization_section(data):
             # Box plot can be vertical or horizontal. 
             # If color is provided, it groups by color.
             # We can also add a y-axis if the user wants to break it down.
-            fig = px.box(data, y=column, color=color_col, title=f"Box Plot of {column}")
+            fig = px.box(select_rows(data, positions, [column, color_col]), y=column, color=color_col, title=f"Box Plot of {column}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating box plot: {e}")
@@ -81,7 +83,7 @@ def data_visualization_section(data):
             y_axis = st.selectbox("Select Y-axis", data.columns)
             
         try:
-            fig = px.line(data, x=x_axis, y=y_axis, color=color_col, title=f"Line Plot: {x_axis} vs {y_axis}")
+            fig = px.line(select_rows(data, positions, [x_axis, y_axis, color_col]), x=x_axis, y=y_axis, color=color_col, title=f"Line Plot: {x_axis} vs {y_axis}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating line plot: {e}")
@@ -89,13 +91,13 @@ def data_visualization_section(data):
     elif plot_type == "Pie Chart":
         column = st.selectbox("Select column for pie chart", data.columns)
         try:
-            fig = px.pie(data, names=column, title=f"Pie Chart of {column}")
+            fig = px.pie(select_rows(data, positions, [column]), names=column, title=f"Pie Chart of {column}")
             st.plotly_chart(fig, width='stretch')
         except Exception as e:
             st.error(f"Error creating pie chart: {e}")
 
     elif plot_type == "Heatmap":
-        numeric_data = data.select_dtypes(include=['float64', 'int64'])
+        numeric_data = select_rows(data, positions, data.select_dtypes(include='number').columns)
         if not numeric_data.empty:
             try:
                 corr_matrix = numeric_data.corr()
@@ -124,7 +126,7 @@ def data_visualization_section(data):
 
         if st.checkbox("Show Map"):
             try:
-                fig = px.scatter_mapbox(data, lat=lat_col, lon=lon_col, zoom=3)
+                fig = px.scatter_mapbox(select_rows(data, positions, [lat_col, lon_col]), lat=lat_col, lon=lon_col, zoom=3)
                 fig.update_layout(mapbox_style="open-street-map")
                 fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
                 st.plotly_chart(fig, width='stretch')
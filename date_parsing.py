@@ -0,0 +1,154 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import versioned_cache
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# Formats tried on every column, after any previously detected or guessed ones
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S%z", "%Y/%m/%d", "%Y%m%d",
+    "%d/%m/%Y", "%m/%d/%Y", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%m/%d/%Y %H:%M:%S",
+    "%d-%m-%Y", "%m-%d-%Y", "%d.%m.%Y", "%d/%m/%y", "%m/%d/%y",
+    "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%b %d %Y", "%a, %d %b %Y %H:%M:%S"
+]
+
+# Distinct values the format inference looks at
+DATE_SAMPLE_VALUES = 1000
+
+# Formats combined for one column before the remaining values count as failures
+MAX_DATE_FORMATS = 3
+
+def parse_with_format(texts, fmt):
+    """Vectorized parse of an array of strings with one format; failures become NaT"""
+    return pd.to_datetime(texts, format=fmt, errors='coerce', utc='%z' in fmt)
+
+def candidate_formats(texts, preferred=()):
+    """Previously detected formats first, then formats guessed from a few values, then the common list"""
+    guessed = []
+    with warnings.catch_warnings():
+        # Guessing with the other dayfirst setting warns when it does not apply
+        warnings.simplefilter('ignore', UserWarning)
+        for text in texts[:20]:
+            for dayfirst in (False, True):
+                fmt = guess_datetime_format(text, dayfirst=dayfirst)
+                if fmt:
+                    guessed.append(fmt)
+    return list(dict.fromkeys([*preferred, *guessed, *DATE_FORMATS]))
+
+def infer_date_formats(texts, preferred=(), sample_values=DATE_SAMPLE_VALUES, seed=0):
+    """
+    Up to MAX_DATE_FORMATS formats that together parse a sample of the
+    distinct values, best first. Mixed-format columns get one format per
+    style. Previously detected formats that still parse the whole sample
+    are reused without searching.
+    """
+    texts = np.asarray(texts, dtype=object)
+    if len(texts) > sample_values:
+        texts = texts[np.random.default_rng(seed).choice(len(texts), sample_values, replace=False)]
+    
+    if preferred:
+        unparsed = np.ones(len(texts), dtype=bool)
+        for fmt in preferred:
+            unparsed[unparsed] = parse_with_format(texts[unparsed], fmt).isna()
+        if not unparsed.any():
+            return list(preferred)
+    
+    formats = []
+    candidates = candidate_formats(texts, preferred)
+    while len(texts) and len(formats) < MAX_DATE_FORMATS:
+        best, best_parsed = None, None
+        for fmt in candidates:
+            # Time zone aware and naive values cannot share one column
+            if formats and ('%z' in fmt) != ('%z' in formats[0]):
+                continue
+            parsed = parse_with_format(texts, fmt).notna()
+            if best is None or parsed.sum() > best_parsed.sum():
+                best, best_parsed = fmt, parsed
+            if parsed.all():
+                break
+        
+        if best is None or not best_parsed.any():
+            break
+        formats.append(best)
+        candidates.remove(best)
+        texts = texts[~np.asarray(best_parsed)]
+    
+    return formats
+
+def parse_date_column(series, formats=None, preferred=()):
+    """
+    Parse a text column as dates by parsing its distinct values only and
+    mapping the results back through the factorized codes. Returns
+    {'values', 'failed', 'formats'}: the parsed series, a mask of non-missing
+    values that did not parse, and the formats used (inferred from a sample
+    of distinct values unless given).
+    """
+    codes, uniques = pd.factorize(series)
+    texts = pd.Index(uniques).astype(str).str.strip().to_numpy(dtype=object)
+    if formats is None:
+        formats = infer_date_formats(texts, preferred)
+    
+    parsed = None
+    for fmt in formats:
+        remaining = np.arange(len(texts)) if parsed is None else np.flatnonzero(parsed.isna())
+        if len(remaining) == 0:
+            break
+        values = parse_with_format(texts[remaining], fmt)
+        if parsed is None:
+            parsed = pd.Series(values)
+        else:
+            parsed.iloc[remaining] = values
+    
+    if parsed is None:
+        parsed = pd.Series(pd.NaT, index=range(len(texts)), dtype='datetime64[ns]')
+    
+    values = pd.Series(parsed.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+    failed = (codes >= 0) & values.isna().to_numpy()
+    return {'values': values, 'failed': failed, 'formats': formats}
+
+def parse_date_columns(data, columns, formats=None, preferred=None, workers=None):
+    """Parse several columns in parallel; formats and preferred map columns to format lists"""
+    formats, preferred = formats or {}, preferred or {}
+    with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as executor:
+        futures = {
+            col: executor.submit(parse_date_column, data[col], formats.get(col), preferred.get(col, ()))
+            for col in columns
+        }
+        return {col: future.result() for col, future in futures.items()}
+
+def cached_date_parses(data, columns):
+    """
+    Parse results per column, computed once per dataset version. Detected
+    formats are remembered per column name for the session, so parsing the
+    same column of a new upload skips the format search.
+    """
+    cache = versioned_cache('date_parses', data)
+    known_formats = st.session_state.setdefault('date_formats', {})
+    
+    missing = [col for col in columns if col not in cache]
+    if missing:
+        for col, result in parse_date_columns(data, missing, preferred=known_formats).items():
+            cache[col] = result
+            if result['formats']:
+                known_formats[col] = result['formats']
+    
+    return {col: cache[col] for col in columns}
+
+def to_datetime_column(series):
+    """Parse a column as dates with its remembered or inferred formats; datetime columns pass through"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    
+    known_formats = st.session_state.setdefault('date_formats', {})
+    result = parse_date_column(series, preferred=known_formats.get(series.name, ()))
+    if result['formats']:
+        known_formats[series.name] = result['formats']
+    return result['values']
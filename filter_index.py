@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+from string_dictionary import factorize_column
+
+def is_range_column(series):
+    """Numeric and datetime columns are filtered by range, everything else by value"""
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return True
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+def index_values(series):
+    """
+    Positions and values of the non-missing entries, in a dtype that
+    compares exactly: integers stay integers (float64 would round values
+    beyond 2**53), datetimes become datetime64 in local wall time.
+    """
+    present = series.notna().to_numpy()
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        values = series.dt.tz_localize(None).to_numpy()
+    elif pd.api.types.is_datetime64_dtype(dtype):
+        values = series.to_numpy()
+    elif pd.api.types.is_integer_dtype(dtype):
+        values = series.to_numpy(dtype=getattr(dtype, 'numpy_dtype', dtype), na_value=0)
+    else:
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        present = present & ~np.isnan(values)
+    return np.flatnonzero(present), values[present]
+
+def numeric_index(data, column):
+    """
+    Row positions of a numeric or datetime column sorted by value, with the
+    sorted values; missing values are left out. Built once per dataset version.
+    """
+    cache = versioned_cache('filter_indexes', data)
+    key = ('range', column)
+    
+    if key not in cache:
+        positions, values = index_values(data[column])
+        order = np.argsort(values, kind='stable')
+        cache[key] = {'order': positions[order], 'values': values[order]}
+    
+    return cache[key]
+
+def index_scalar(value):
+    """A sorted-index value as the Python scalar widgets take (int, float or datetime)"""
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value).to_pydatetime()
+    return value.item()
+
+def index_bound(values, bound):
+    """A filter bound in the index's dtype, so comparisons stay exact"""
+    if values.dtype.kind == 'M':
+        return np.datetime64(pd.Timestamp(bound).tz_localize(None))
+    if values.dtype.kind in 'iu':
+        return values.dtype.type(bound)
+    return float(bound)
+
+def category_index(data, column):
+    """
+    Row positions grouped by value code (a posting list per distinct value),
+    with each value's start offset. Built once per dataset version.
+    """
+    cache = versioned_cache('filter_indexes', data)
+    key = ('category', column)
+    
+    if key not in cache:
+        codes, uniques = factorize_column(data, column)
+        order = np.argsort(codes, kind='stable')
+        # Missing values have code -1 and sort first
+        starts = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        cache[key] = {'order': order, 'starts': starts, 'uniques': uniques}
+    
+    return cache[key]
+
+def column_range(data, column):
+    """Smallest and largest value of a numeric or datetime column, read from its index (None if all missing)"""
+    values = numeric_index(data, column)['values']
+    if len(values) == 0:
+        return None
+    return index_scalar(values[0]), index_scalar(values[-1])
+
+def positions_mask(n_rows, positions):
+    """Boolean row mask with the given positions set"""
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[positions] = True
+    return mask
+
+def range_mask(data, column, low, high):
+    """Rows with low <= value <= high, found by binary search in the column's sorted index"""
+    index = numeric_index(data, column)
+    values = index['values']
+    start = np.searchsorted(values, index_bound(values, low), side='left')
+    end = np.searchsorted(values, index_bound(values, high), side='right')
+    return positions_mask(len(data), index['order'][start:end])
+
+def category_mask(data, column, values):
+    """Rows holding one of values, gathered from the values' posting lists"""
+    index = category_index(data, column)
+    selected = np.flatnonzero(pd.Index(index['uniques']).isin(values))
+    if len(selected) == 0:
+        return np.zeros(len(data), dtype=bool)
+    
+    order, starts = index['order'], index['starts']
+    positions = np.concatenate([order[starts[code]:starts[code + 1]] for code in selected])
+    return positions_mask(len(data), positions)
+
+def filter_mask(data, filters):
+    """
+    One boolean mask for all filters, intersected filter by filter. filters
+    maps a column to a (low, high) range or a list of values. Returns None
+    when there are no filters (every row selected).
+    """
+    mask = None
+    for column, condition in filters.items():
+        if is_range_column(data[column]):
+            column_mask = range_mask(data, column, *condition)
+        else:
+            column_mask = category_mask(data, column, condition)
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+# Memory allowed for the distance block of one chunk of rows being imputed
+KNN_CHUNK_MB = 64
+
+# Donor rows are sampled down to this many to bound the cost per imputed row
+DEFAULT_MAX_DONORS = 20_000
+
+DEFAULT_NEIGHBORS = 5
+
+def standardized_features(data, features):
+    """Feature matrix scaled to zero mean and unit variance; missing values stay NaN"""
+    values = data[features].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    return (values - np.nan_to_num(mean)) / std
+
+def knn_fill_values(features, target, k=DEFAULT_NEIGHBORS, max_donors=DEFAULT_MAX_DONORS,
+                    workers=None, progress=None, seed=0):
+    """
+    Mean target value of the k nearest donors for every row where target is missing.
+    
+    Rows with every feature observed are matched through a tree index over
+    the donors. Rows with missing features use a chunked brute-force search
+    over only their observed features, rescaled by the share observed (like
+    nan-euclidean), with distance blocks bounded by KNN_CHUNK_MB. Missing
+    donor features count as the feature mean. Chunks are spread over a
+    thread pool; the index queries and matrix products release the GIL.
+    """
+    donors = np.flatnonzero(~np.isnan(target))
+    queries = np.flatnonzero(np.isnan(target))
+    if len(queries) == 0 or len(donors) == 0:
+        return queries, np.full(len(queries), np.nan)
+    
+    if len(donors) > max_donors:
+        donors = np.sort(np.random.default_rng(seed).choice(donors, max_donors, replace=False))
+    
+    donor_features = np.nan_to_num(features[donors])
+    donor_squares = donor_features ** 2
+    donor_values = target[donors]
+    k = min(k, len(donors))
+    n_features = features.shape[1]
+    chunk_rows = max(1, int(KNN_CHUNK_MB * 1024 * 1024 / (8 * len(donors))))
+    
+    index = NearestNeighbors(n_neighbors=k).fit(donor_features)
+    complete = ~np.isnan(features[queries]).any(axis=1)
+    index_chunk_rows = max(chunk_rows, 10_000)
+    
+    def index_chunk(rows):
+        _, nearest = index.kneighbors(features[queries[rows]])
+        return rows, donor_values[nearest].mean(axis=1)
+    
+    def brute_force_chunk(rows):
+        chunk = features[queries[rows]]
+        observed = ~np.isnan(chunk)
+        filled = np.where(observed, chunk, 0.0)
+        
+        distances = (filled ** 2).sum(axis=1, keepdims=True) - 2 * filled @ donor_features.T
+        distances += observed.astype(float) @ donor_squares.T
+        n_observed = observed.sum(axis=1)
+        distances *= (n_features / np.maximum(n_observed, 1))[:, None]
+        
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        values = donor_values[nearest].mean(axis=1)
+        # Rows without any observed feature have no meaningful neighbours
+        values[n_observed == 0] = donor_values.mean()
+        return rows, values
+    
+    complete_rows = np.flatnonzero(complete)
+    partial_rows = np.flatnonzero(~complete)
+    result = np.empty(len(queries))
+    with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(index_chunk, complete_rows[start:start + index_chunk_rows])
+            for start in range(0, len(complete_rows), index_chunk_rows)
+        ] + [
+            executor.submit(brute_force_chunk, partial_rows[start:start + chunk_rows])
+            for start in range(0, len(partial_rows), chunk_rows)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            rows, values = future.result()
+            result[rows] = values
+            if progress is not None:
+                progress(done / len(futures))
+    
+    return queries, result
+
+def impute_knn(data, columns, features=None, k=DEFAULT_NEIGHBORS, max_donors=DEFAULT_MAX_DONORS,
+               workers=None, progress=None):
+    """
+    Fill missing values in numeric columns from their k nearest neighbours
+    over standardized numeric features. progress(fraction) is called as
+    the work completes.
+    """
+    if features is None:
+        features = data.select_dtypes(include=[np.number]).columns.tolist()
+    
+    data = data.copy(deep=False)
+    for i, col in enumerate(columns):
+        col_features = [f for f in features if f != col]
+        if not col_features:
+            continue
+        
+        def column_progress(fraction, i=i):
+            if progress is not None:
+                progress((i + fraction) / len(columns))
+        
+        target = data[col].to_numpy(dtype=float, na_value=np.nan)
+        positions, values = knn_fill_values(
+            standardized_features(data, col_features), target, k, max_donors, workers, column_progress
+        )
+        if pd.api.types.is_integer_dtype(data[col].dtype):
+            values = np.round(values)
+        
+        filled = data[col].copy()
+        filled.iloc[positions] = values
+        data[col] = filled
+    
+    return data
@@ -11,8 +11,13 @@ from data_visualization import data_visualization_section
 from data_querying import data_querying_section
 from advanced_querying import advanced_querying_section
 from data_filtering import data_filtering_section
+from row_selection import get_row_selection
+from result_viewer import reset_result_viewer
 from sentiment_analysis import sentiment_analysis_section
 from data_profiling import data_profiling_dashboard
+from profiling_jobs import cancel_profiling_job
+from profile_store import dataset_version
+from type_optimizer import optimize_dtypes
 from pandasai import Agent
 from langchain_community.chat_models import ChatOllama
 from pandasai_langchain import LangchainLLM
@@ -73,6 +78,7 @@ prompt_template = ChatPromptTemplate.from_template(
 # Function to restart the session
 def restart_session():
     st.session_state.api_key = ""
+    cancel_profiling_job()
     st.session_state.clear()
     st.rerun()
 
@@ -93,6 +99,11 @@ with st.sidebar.expander("Unlock Extra Features", expanded=False):
 
 # File upload function
 uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv", "xls", "xlsx"])
+st.sidebar.checkbox(
+    "⚡ Optimize data types on upload",
+    key="optimize_on_upload",
+    help="Losslessly shrink column types (smaller ints, float32 where exact, nullable ints, booleans, categories/Arrow strings) as soon as a file is read"
+)
 
 # Model Selection Section in Sidebar
 st.sidebar.header("AI Model Configuration")
@@ -214,60 +225,92 @@ if st.sidebar.button("End Session"):
 #Uploaded file logic
 if uploaded_file is not None:
     # Check if a new file has been uploaded (reset session state)
-    if 'current_file_name' not in st.session_state or st.session_state.current_file_name != uploaded_file.name:
+    if 'current_file_id' not in st.session_state or st.session_state.current_file_id != uploaded_file.file_id:
         # New file uploaded - reset all cleaning-related session state
         st.session_state.current_file_name = uploaded_file.name
+        st.session_state.current_file_id = uploaded_file.file_id
         if 'cleaning_history' in st.session_state:
             del st.session_state.cleaning_history
+        if 'cleaning_journal' in st.session_state:
+            del st.session_state.cleaning_journal
         if 'original_data' in st.session_state:
             del st.session_state.original_data
         if 'cleaned_data' in st.session_state:
             del st.session_state.cleaned_data
+        if 'raw_data' in st.session_state:
+            del st.session_state.raw_data
+        if 'type_optimization_report' in st.session_state:
+            del st.session_state.type_optimization_report
+        if 'advanced_query' in st.session_state:
+            del st.session_state.advanced_query
+        # Paging, sorting and filter inputs belong to the previous dataset
+        reset_result_viewer("query")
+        reset_result_viewer("filter")
+        cancel_profiling_job()
     
-    # Read uploaded file
-    file_type = uploaded_file.name.split('.')[-1]
+    # Read uploaded file once per upload; reruns reuse the parsed frame
+    if 'raw_data' not in st.session_state:
+        file_type = uploaded_file.name.split('.')[-1]
     
-    if file_type == 'csv':
-        # Read the CSV file
-        data = pd.read_csv(uploaded_file)
-        #st.info("Reading CSV file...")
-    elif file_type in ['xls', 'xlsx']:
-        # Read the Excel file
-        data = pd.read_excel(uploaded_file)
-        #st.info(f"Reading Excel file ({file_type.upper()})...")
-    else:
-        st.error("Unsupported file type. Please upload a CSV or Excel file.")
+        if file_type == 'csv':
+            # Read the CSV file
+            st.session_state.raw_data = pd.read_csv(uploaded_file)
+            #st.info("Reading CSV file...")
+        elif file_type in ['xls', 'xlsx']:
+            # Read the Excel file
+            st.session_state.raw_data = pd.read_excel(uploaded_file)
+            #st.info(f"Reading Excel file ({file_type.upper()})...")
+        else:
+            st.error("Unsupported file type. Please upload a CSV or Excel file.")
+            st.stop()
+        
+        if st.session_state.get('optimize_on_upload'):
+            st.session_state.raw_data, st.session_state.upload_type_report = optimize_dtypes(st.session_state.raw_data)
+        else:
+            st.session_state.upload_type_report = None
+        
+        # Content hash identifies the dataset version, also across sessions; optimized
+        # dtypes give a different profile, so they get their own version
+        st.session_state.data_version = dataset_version(uploaded_file.getvalue(), st.session_state.get('optimize_on_upload', False))
+    
+    data = st.session_state.raw_data
     
     # Data Preview
     st.subheader("Data Preview")
     st.write(data.head())
+    upload_report = st.session_state.get('upload_type_report')
+    if upload_report is not None and not upload_report.empty:
+        saved = upload_report['Bytes Before'].sum() - upload_report['Bytes After'].sum()
+        st.caption(f"⚡ Optimized {len(upload_report)} column types on upload, saving {saved / 1024 / 1024:.2f} MB")
     
-    # Data Profiling Dashboard
+    # Data Profiling Dashboard (computed in the background, never blocks the page)
     with st.expander("📊 View Data Profiling Dashboard", expanded=False):
-        data_profiling_dashboard(data)
+        data_profiling_dashboard(data, st.session_state.data_version)
 
     # Create tabs for different sections
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Data Cleaning", "Data Visualization", 
                                           "Data Querying with AI", "Advanced Querying", 
                                           "Interactive Data Filtering", "Sentiment Analysis"])
 
+    # Filtering runs first so the other tabs see this run's row selection
+    with tab5:
+        data_filtering_section(data)
+    selection = get_row_selection(data)
+
     with tab1:
         data_cleaning_section(data)
 
     with tab2:
-        data_visualization_section(data)
+        data_visualization_section(data, selection)
 
     with tab3:
-        data_querying_section(data, model, prompt_template)
+        data_querying_section(data, model, prompt_template, selection)
 
     with tab4:
-        advanced_querying_section(data)
-
-    with tab5:
-        data_filtering_section(data)
+        advanced_querying_section(data, selection)
     
     with tab6:
-        sentiment_analysis_section(data)
+        sentiment_analysis_section(data, selection)
 
 else:
     st.write("Please upload a CSV or Excel file to get started.")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import sys
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Values measured per object column when estimating its memory
+MEMORY_SAMPLE_ROWS = 10_000
+
+# Two-sided 95% normal quantile for the estimate bounds
+CONFIDENCE_Z = 1.96
+
+def column_memory(series, exact=False, sample_rows=MEMORY_SAMPLE_ROWS, seed=0):
+    """
+    Deep memory of a column's values (no index) as {'bytes', 'margin', 'exact'}.
+    
+    Fixed-width, categorical and Arrow-backed columns are measured exactly
+    without touching their values. Object columns store a pointer per row
+    plus a Python object: unless exact is set, the object sizes are measured
+    on a random sample of rows and extrapolated, with margin the half-width
+    of a 95% confidence interval for the total.
+    """
+    n = len(series)
+    if series.dtype != object or exact or n <= sample_rows:
+        return {'bytes': int(series.memory_usage(deep=True, index=False)), 'margin': 0.0, 'exact': True}
+    
+    values = series.to_numpy()
+    positions = np.random.default_rng(seed).choice(n, sample_rows, replace=False)
+    sizes = np.fromiter((sys.getsizeof(values[i]) for i in positions), dtype=np.float64, count=sample_rows)
+    # Standard error of the mean with the finite population correction
+    standard_error = sizes.std(ddof=1) / np.sqrt(sample_rows) * np.sqrt((n - sample_rows) / (n - 1))
+    return {
+        'bytes': int(values.nbytes + n * sizes.mean()),
+        'margin': float(CONFIDENCE_Z * n * standard_error),
+        'exact': False
+    }
+
+def column_key(series):
+    """
+    Identity of a column's stored values: the array owning its memory plus
+    the view into it. Frames that share an unchanged column (shallow copies,
+    other columns replaced) give the same key.
+    """
+    values = series.to_numpy() if series.dtype == object else None
+    if not isinstance(values, np.ndarray):
+        return None, None
+    
+    base = values
+    while isinstance(base.base, np.ndarray):
+        base = base.base
+    return base, (id(base), values.__array_interface__['data'][0], values.shape, values.strides)
+
+def cached_column_memory(series, exact=False):
+    """
+    column_memory reused for as long as the column's values are unchanged,
+    across dataset versions; only object columns are worth caching.
+    """
+    base, key = column_key(series)
+    if key is None:
+        return column_memory(series, exact)
+    
+    cache = st.session_state.setdefault('column_memory', {})
+    key = (*key, exact)
+    if key in cache and cache[key][0]() is base:
+        return cache[key][1]
+    
+    # Drop results for arrays that were garbage collected
+    for stale in [k for k, (ref, _) in cache.items() if ref() is None]:
+        del cache[stale]
+    
+    result = column_memory(series, exact)
+    cache[key] = (weakref.ref(base), result)
+    return result
+
+def frame_memory(data, exact=False, cached=True):
+    """
+    Deep memory per column plus the total, with the total's margin combining
+    the independent per-column margins. Returns {'bytes', 'margin', 'total',
+    'total_margin', 'exact'}; bytes and margin are Series indexed by column.
+    """
+    measure = cached_column_memory if cached else column_memory
+    results = [measure(data[col], exact) for col in data.columns]
+    column_bytes = pd.Series([r['bytes'] for r in results], index=data.columns, dtype='int64')
+    margins = pd.Series([r['margin'] for r in results], index=data.columns, dtype='float64')
+    return {
+        'bytes': column_bytes,
+        'margin': margins,
+        'total': int(column_bytes.sum()),
+        'total_margin': float(np.sqrt((margins ** 2).sum())),
+        'exact': all(r['exact'] for r in results)
+    }
+
+def format_memory(n_bytes, margin=0.0):
+    """Megabytes with the estimate's margin when there is one"""
+    text = f"{n_bytes / 1024 / 1024:.2f} MB"
+    if margin:
+        text += f" ± {margin / 1024 / 1024:.2f}"
+    return text
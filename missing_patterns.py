@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from profiling_jobs import raise_if_cancelled
+from row_fingerprints import combine_fingerprints
+
+# Set bits per byte value, used when numpy has no bitwise_count (numpy < 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount_rows(packed):
+    """Number of set bits in each row of a packed uint8 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(packed).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT_TABLE[packed].sum(axis=-1, dtype=np.int64)
+
+def analyze_missing_patterns(data, top_n=20, cancel_event=None):
+    """
+    Which columns go missing together and the most common row-level patterns.
+    
+    Each column's null mask is bit-packed once. Pairwise co-missing counts come
+    from AND + popcount over the packed masks, and row patterns are keyed by
+    a per-row bit word (one bit per column) so no n_rows x n_cols matrix is built.
+    """
+    n_rows = len(data)
+    null_counts = data.isnull().sum()
+    missing_cols = null_counts[null_counts > 0].index.tolist()
+    
+    if n_rows == 0 or not missing_cols:
+        return {'co_missing': None, 'nullity_corr': None, 'patterns': None, 'distinct_patterns': 0}
+    
+    n_cols = len(missing_cols)
+    column_bits = np.empty((n_cols, (n_rows + 7) // 8), dtype=np.uint8)
+    row_words = np.zeros((n_rows, (n_cols + 63) // 64), dtype=np.uint64)
+    
+    for i, col in enumerate(missing_cols):
+        raise_if_cancelled(cancel_event)
+        mask = data[col].isna().to_numpy()
+        column_bits[i] = np.packbits(mask)
+        row_words[:, i // 64] |= mask.astype(np.uint64) << np.uint64(i % 64)
+    
+    # Pairwise co-missing counts: popcount(mask_i & mask_j)
+    co_missing = np.empty((n_cols, n_cols), dtype=np.int64)
+    for i in range(n_cols):
+        raise_if_cancelled(cancel_event)
+        co_missing[i, i:] = popcount_rows(column_bits[i] & column_bits[i:])
+        co_missing[i:, i] = co_missing[i, i:]
+    
+    return {
+        'co_missing': pd.DataFrame(co_missing, index=missing_cols, columns=missing_cols),
+        'nullity_corr': pd.DataFrame(nullity_correlation(co_missing, n_rows), index=missing_cols, columns=missing_cols),
+        **row_patterns(row_words, missing_cols, n_rows, top_n)
+    }
+
+def nullity_correlation(co_missing, n_rows):
+    """
+    Phi coefficient between the null indicators of every column pair, derived
+    from the co-missing counts. Columns that are always or never null give NaN.
+    """
+    counts = np.diag(co_missing).astype(float)
+    numerator = n_rows * co_missing - np.outer(counts, counts)
+    variance = counts * (n_rows - counts)
+    denominator = np.sqrt(np.outer(variance, variance))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+def row_patterns(row_words, columns, n_rows, top_n):
+    """Count distinct row missingness patterns and describe the most common ones"""
+    if row_words.shape[1] == 1:
+        # A single word already identifies the pattern exactly
+        keys = row_words[:, 0]
+    else:
+        keys = combine_fingerprints([row_words[:, w] for w in range(row_words.shape[1])])
+    
+    key_series = pd.Series(keys)
+    pattern_counts = key_series.value_counts()
+    first_rows = pd.Series(np.arange(n_rows)).groupby(keys).first()
+    
+    patterns = []
+    for key, count in pattern_counts.head(top_n).items():
+        words = row_words[first_rows[key]]
+        missing = [
+            col for i, col in enumerate(columns)
+            if (int(words[i // 64]) >> (i % 64)) & 1
+        ]
+        patterns.append({
+            'Missing Columns': ', '.join(map(str, missing)) if missing else '(complete rows)',
+            'Columns Missing': len(missing),
+            'Rows': int(count),
+            'Rows (%)': round(count / n_rows * 100, 2)
+        })
+    
+    return {
+        'patterns': pd.DataFrame(patterns),
+        'distinct_patterns': int(len(pattern_counts))
+    }
@@ -0,0 +1,259 @@
+import re
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from utils import versioned_cache
+from string_dictionary import apply_to_uniques
+
+# MinHash functions per text; signatures keep the low 16 bits of each minimum
+NUM_PERM = 64
+
+# Texts hashed per batch, bounding the shingle arrays held at once
+SIGNATURE_CHUNK_TEXTS = 100_000
+
+# Candidate pairs verified per batch
+VERIFY_CHUNK_PAIRS = 200_000
+
+DEFAULT_THRESHOLD = 0.8
+
+# Chance a pair at exactly the threshold similarity must have of becoming a candidate
+LSH_RECALL = 0.99
+
+# Buckets up to this size pair every member with every other; larger ones pair with the first and previous member
+SMALL_BUCKET = 32
+
+def normalize_text(value):
+    """Lowercase, punctuation to spaces, whitespace collapsed"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', str(value).lower()).split())
+
+def row_texts(data, columns):
+    """
+    One normalized text per row from the selected columns; each column is
+    normalized per distinct value. Rows with nothing in any column get ''.
+    """
+    texts = None
+    for col in columns:
+        normalized = apply_to_uniques(data[col], normalize_text, na_value='').to_numpy(dtype=object)
+        texts = normalized if texts is None else texts + ' ' + normalized
+    if len(columns) > 1:
+        texts = pd.Series(texts, dtype=object).str.strip().to_numpy(dtype=object)
+    return texts
+
+def sorted_unique(values):
+    """Distinct values of an integer array, sorted (a plain sort beats np.unique's hashing on large arrays)"""
+    values = np.sort(values)
+    return values[np.concatenate([[True], values[1:] != values[:-1]])]
+
+def shingles(texts):
+    """
+    Character 3-grams of every text, read straight from one UTF-8 buffer.
+    Texts are padded with a space so short values still get a shingle.
+    Returns the 24-bit shingle values and the index of the text each came from.
+    """
+    buffer = np.frombuffer(('\x00'.join(f" {text} " for text in texts) + '\x00').encode('utf-8'), dtype=np.uint8)
+    separators = buffer == 0
+    text_ids = np.cumsum(separators) - separators
+    
+    values = buffer.astype(np.uint32)
+    grams = (values[:-2] << 16) | (values[1:-1] << 8) | values[2:]
+    valid = ~(separators[:-2] | separators[1:-1] | separators[2:])
+    return grams[valid], text_ids[:-2][valid]
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=0):
+    """
+    MinHash signature per text, vectorized over all shingles of a batch:
+    each hash function is a multiply-shift hash of the shingle values and
+    the minimum per text is one reduceat. Texts without shingles (empty)
+    get the maximum value everywhere.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint16).max, dtype=np.uint16)
+    for start in range(0, len(texts), SIGNATURE_CHUNK_TEXTS):
+        grams, text_ids = shingles(texts[start:start + SIGNATURE_CHUNK_TEXTS])
+        if len(grams) == 0:
+            continue
+        # Shingles come grouped by text, in text order
+        starts = np.flatnonzero(np.concatenate([[True], text_ids[1:] != text_ids[:-1]]))
+        ids = text_ids[starts]
+        grams = grams.astype(np.uint64)
+        for j in range(num_perm):
+            hashes = (multipliers[j] * grams + offsets[j]) >> np.uint64(32)
+            signatures[start + ids, j] = np.minimum.reduceat(hashes, starts).astype(np.uint16)
+    return signatures
+
+def lsh_rows_per_band(threshold, num_perm=NUM_PERM):
+    """
+    Signature values per LSH band: the most that still makes a pair at the
+    threshold similarity a candidate with probability LSH_RECALL. More rows
+    per band means fewer, more similar candidates.
+    """
+    best = 1
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= LSH_RECALL:
+            best = rows
+    return best
+
+def candidate_pairs(signatures, rows_per_band):
+    """
+    Pairs of texts sharing a band. Small buckets pair every two members, so
+    one failed verification cannot split a bucket of near-duplicates; in
+    larger buckets every member is paired with the previous member and with
+    the first one, so they cost linear rather than quadratic work.
+    """
+    n, num_perm = signatures.shape
+    pairs = []
+    for band in range(0, num_perm, rows_per_band):
+        keys = np.zeros(n, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for j in range(band, band + rows_per_band):
+                keys = (keys ^ signatures[:, j].astype(np.uint64)) * np.uint64(0x100000001B3)
+        
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        same = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1]) + 1
+        if len(same) == 0:
+            continue
+        
+        run_starts = np.ones(n, dtype=bool)
+        run_starts[same] = False
+        start_index = np.maximum.accumulate(np.where(run_starts, np.arange(n), 0))
+        run_lengths = np.diff(np.append(np.flatnonzero(run_starts), n))
+        lengths = run_lengths[np.cumsum(run_starts) - 1]
+        
+        large = same[lengths[same] > SMALL_BUCKET]
+        pairs.append(np.column_stack([order[large - 1], order[large]]))
+        pairs.append(np.column_stack([order[start_index[large]], order[large]]))
+        
+        # Every pair within small buckets: member i with member i + offset of the same bucket
+        small = same[lengths[same] <= SMALL_BUCKET]
+        for offset in range(1, min(SMALL_BUCKET, int(lengths[small].max(initial=0)))):
+            small = small[small - offset >= start_index[small]]
+            if len(small) == 0:
+                break
+            pairs.append(np.column_stack([order[small - offset], order[small]]))
+    
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1).astype(np.int64)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    # Deduplicate pairs found in several bands through one integer per pair
+    encoded = sorted_unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.column_stack([encoded // n, encoded % n])
+
+def pair_similarity(texts, pairs):
+    """
+    Exact Jaccard similarity of the 3-gram sets of each pair of texts. The
+    shingles of every left text are probed in the sorted (text, shingle)
+    keys of the texts involved, so there is no per-pair Python work.
+    """
+    involved, inverse = np.unique(pairs.ravel(), return_inverse=True)
+    local = inverse.reshape(-1, 2)
+    grams, text_ids = shingles(texts[involved])
+    keys = sorted_unique((text_ids.astype(np.int64) << 24) | grams)
+    if len(keys) == 0:
+        return np.ones(len(pairs))
+    
+    sizes = np.bincount(keys >> 24, minlength=len(involved))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    
+    # One probe per shingle of each pair's left text, against the right text's shingles
+    left, right = local[:, 0], local[:, 1]
+    counts = sizes[left]
+    pair_index = np.repeat(np.arange(len(pairs)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    probes = (right[pair_index].astype(np.int64) << 24) | (keys[starts[left][pair_index] + within] & 0xFFFFFF)
+    found = keys[np.minimum(np.searchsorted(keys, probes), len(keys) - 1)] == probes
+    
+    intersection = np.bincount(pair_index, weights=found, minlength=len(pairs))
+    union = sizes[left] + sizes[right] - intersection
+    return np.divide(intersection, union, out=np.ones(len(pairs)), where=union > 0)
+
+def verify_pairs(texts, pairs, threshold):
+    """Keep candidate pairs whose exact similarity reaches the threshold"""
+    keep = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), VERIFY_CHUNK_PAIRS):
+        chunk = pairs[start:start + VERIFY_CHUNK_PAIRS]
+        keep[start:start + len(chunk)] = pair_similarity(texts, chunk) >= threshold
+    return pairs[keep]
+
+def find_near_duplicates(data, columns, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, seed=0):
+    """
+    Cluster rows whose selected columns are near-identical text.
+    
+    Rows are normalized (case, punctuation, whitespace) and rows with equal
+    normalized text share one MinHash signature. LSH banding proposes
+    candidate pairs without comparing all pairs, and candidates are kept if
+    the exact Jaccard similarity of their character 3-grams reaches the
+    threshold; clusters are the connected components. Blank rows stay
+    singletons. Returns {'labels', 'sizes', 'n_clusters', 'n_duplicates'}:
+    a cluster label and cluster size per row (singletons get their own label),
+    the number of clusters with several rows and the rows that keeping one
+    per cluster would remove.
+    """
+    codes, texts = pd.factorize(row_texts(data, columns))
+    texts = np.asarray(texts, dtype=object)
+    
+    # Blank rows have nothing to compare; they never join a cluster
+    blank = texts == ''
+    signatures = minhash_signatures(texts, num_perm, seed)
+    candidates = candidate_pairs(signatures, lsh_rows_per_band(threshold, num_perm))
+    candidates = candidates[~(blank[candidates[:, 0]] | blank[candidates[:, 1]])]
+    pairs = verify_pairs(texts, candidates, threshold)
+    
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(len(texts), len(texts)))
+    _, components = connected_components(graph, directed=False)
+    
+    labels = components[codes]
+    blank_rows = np.flatnonzero(blank[codes])
+    labels[blank_rows] = len(texts) + np.arange(len(blank_rows))
+    counts = np.bincount(labels, minlength=components.max() + 1 if len(components) else 0)
+    return {
+        'labels': labels,
+        'sizes': counts[labels],
+        'n_clusters': int((counts > 1).sum()),
+        'n_duplicates': int(len(labels) - (counts > 0).sum())
+    }
+
+def cached_near_duplicates(data, columns, threshold=DEFAULT_THRESHOLD, compute=True):
+    """
+    Near-duplicate clusters computed once per dataset version, columns and
+    threshold. Returns None if they are not cached and compute is False.
+    """
+    cache = versioned_cache('near_duplicates', data)
+    key = (tuple(columns), threshold)
+    
+    if key not in cache:
+        if not compute:
+            return None
+        cache[key] = find_near_duplicates(data, columns, threshold)
+    
+    return cache[key]
+
+def near_duplicate_mask(result, keep='first'):
+    """Rows to drop so one row per cluster remains (keep 'first' or 'last'), or every clustered row (keep False)"""
+    if keep is False:
+        return result['sizes'] > 1
+    return pd.Series(result['labels']).duplicated(keep=keep).to_numpy()
+
+def cluster_summary(data, columns, result):
+    """Clusters with several rows, largest first, with an example of their text"""
+    clustered = np.flatnonzero(result['sizes'] > 1)
+    if len(clustered) == 0:
+        return pd.DataFrame(columns=['Cluster', 'Rows', 'Example'])
+    
+    labels = pd.Series(result['labels'][clustered])
+    first_rows = clustered[~labels.duplicated().to_numpy()]
+    examples = data[columns].iloc[first_rows].map(str).agg(' | '.join, axis=1).to_numpy()
+    summary = pd.DataFrame({
+        'Cluster': result['labels'][first_rows],
+        'Rows': result['sizes'][first_rows],
+        'Example': examples
+    })
+    return summary.sort_values('Rows', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,262 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+from type_optimizer import widen_to_fit
+
+# Scale factor that makes the MAD a consistent estimator of the standard deviation
+MAD_SCALE = 1.4826
+
+ANOMALY_MODELS = ["Isolation Forest", "Local Outlier Factor"]
+
+# Rows the anomaly models are fitted on; LOF keeps its sample for scoring, so it gets fewer
+ANOMALY_SAMPLE_ROWS = {"Isolation Forest": 50_000, "Local Outlier Factor": 10_000}
+
+# Rows scored per task when applying a fitted model to the full dataset
+SCORE_CHUNK_ROWS = 100_000
+
+ROLLING_METHODS = ["Rolling Median/MAD", "Rolling Z-Score"]
+
+# Observations a rolling window needs before its points can be flagged
+ROLLING_MIN_PERIODS = 3
+
+# Points drawn when plotting a rolling series; outliers are always drawn
+ROLLING_PLOT_POINTS = 5000
+
+def column_bounds(data, columns, method, factor):
+    """
+    Lower/upper outlier bounds for every column at once: one quantile call
+    for IQR, one mean and one std call for Z-score, two median calls for MAD.
+    """
+    subset = data[columns]
+    if method == "Z-Score":
+        mean, std = subset.mean(), subset.std()
+        return mean - factor * std, mean + factor * std
+    if method.startswith("MAD"):
+        median = subset.median()
+        spread = (subset - median).abs().median() * MAD_SCALE
+        return median - factor * spread, median + factor * spread
+    
+    quartiles = subset.quantile([0.25, 0.75])
+    q1, q3 = quartiles.iloc[0], quartiles.iloc[1]
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+def outlier_mask(data, columns, lower, upper):
+    """Boolean rows x columns matrix of values outside their column's bounds (missing is never an outlier)"""
+    values = data[columns].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return (values < lower.to_numpy(dtype=float)) | (values > upper.to_numpy(dtype=float))
+
+def compute_outlier_scan(data, method, factor, columns=None):
+    """Bounds, mask matrix and per-column/per-row outlier counts for numeric columns"""
+    if columns is None:
+        columns = data.select_dtypes(include=[np.number]).columns.tolist()
+    lower, upper = column_bounds(data, columns, method, factor)
+    mask = outlier_mask(data, columns, lower, upper)
+    return {
+        'columns': columns,
+        'lower': lower,
+        'upper': upper,
+        'mask': mask,
+        'column_counts': pd.Series(mask.sum(axis=0), index=columns),
+        'row_counts': mask.sum(axis=1)
+    }
+
+def scan_outliers(data, method, factor):
+    """Outlier scan of all numeric columns, computed once per dataset version and setting"""
+    cache = versioned_cache('outlier_scans', data)
+    key = (method, factor)
+    
+    if key not in cache:
+        cache[key] = compute_outlier_scan(data, method, factor)
+    
+    return cache[key]
+
+def apply_outlier_scan(data, scan, columns, action, min_columns=1):
+    """
+    Remove rows with outliers in at least min_columns of the given columns,
+    or cap those columns at their bounds. Driven by the positional mask.
+    """
+    positions = [scan['columns'].index(col) for col in columns]
+    mask = scan['mask'][:, positions]
+    
+    if action == "Remove Rows":
+        return data[mask.sum(axis=1) < min_columns]
+    
+    data = data.copy(deep=False)
+    lower, upper = scan['lower'][columns], scan['upper'][columns]
+    for i, col in enumerate(columns):
+        if mask[:, i].any():
+            data[col] = widen_to_fit(data[col], [lower[col], upper[col]]).clip(lower[col], upper[col])
+    return data
+
+def anomaly_scores(data, columns, model, sample_rows=None, seed=0, workers=None, progress=None):
+    """
+    Multivariate anomaly score per row (higher is more anomalous).
+    
+    The model is fitted on a random sample of rows with n_jobs parallelism,
+    then the full dataset is scored in chunks on a thread pool. Missing
+    feature values are replaced by the column median.
+    """
+    from sklearn.ensemble import IsolationForest
+    from sklearn.neighbors import LocalOutlierFactor
+    
+    values = data[columns].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        medians = np.nan_to_num(np.nanmedian(values, axis=0))
+    values = np.where(np.isnan(values), medians, values)
+    
+    if model == "Local Outlier Factor":
+        # Distance-based, so put features on a comparable scale
+        std = values.std(axis=0)
+        std[~(std > 0)] = 1.0
+        values = (values - values.mean(axis=0)) / std
+        estimator = LocalOutlierFactor(n_neighbors=20, novelty=True, n_jobs=-1)
+    else:
+        estimator = IsolationForest(n_estimators=100, random_state=seed, n_jobs=-1)
+    
+    sample_rows = sample_rows or ANOMALY_SAMPLE_ROWS[model]
+    sample = np.random.default_rng(seed).choice(len(values), min(len(values), sample_rows), replace=False)
+    estimator.fit(values[sample])
+    
+    scores = np.empty(len(values))
+    starts = range(0, len(values), SCORE_CHUNK_ROWS)
+    with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as executor:
+        futures = {
+            executor.submit(estimator.score_samples, values[start:start + SCORE_CHUNK_ROWS]): start
+            for start in starts
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            start = futures[future]
+            chunk_scores = future.result()
+            scores[start:start + len(chunk_scores)] = -chunk_scores
+            if progress is not None:
+                progress(done / len(futures))
+    
+    return scores
+
+def cached_anomaly_scores(data, columns, model, sample_rows, progress=None, compute=True):
+    """
+    Anomaly scores reused per dataset version, columns, model and sample size,
+    so changing the contamination only re-thresholds. Returns None if the
+    scores are not cached and compute is False.
+    """
+    cache = versioned_cache('anomaly_scores', data)
+    key = (tuple(columns), model, sample_rows)
+    
+    if key not in cache:
+        if not compute:
+            return None
+        cache[key] = anomaly_scores(data, columns, model, sample_rows, progress=progress)
+    
+    return cache[key]
+
+def anomaly_mask(scores, contamination):
+    """Flag the top contamination share of rows by anomaly score (ties broken by position)"""
+    mask = np.zeros(len(scores), dtype=bool)
+    n_flagged = int(round(len(scores) * contamination))
+    if n_flagged:
+        mask[np.argsort(-scores, kind='stable')[:n_flagged]] = True
+    return mask
+
+def order_positions(data, order_by=None, group_by=None):
+    """Row positions sorted by group and then by the order column (stable, missing keys last)"""
+    keys = list(group_by or []) + ([order_by] if order_by else [])
+    if not keys:
+        return np.arange(len(data))
+    return data[keys].reset_index(drop=True).sort_values(keys, kind='stable').index.to_numpy()
+
+def rolling_statistics(data, column, order_by, window, method, group_by=None):
+    """
+    Rolling centre and spread of a column, aligned to row positions.
+    
+    Rows are ordered by order_by (within each group when group_by is given)
+    and a centred window runs over them: a number of rows, or a time span
+    such as "7D" when order_by is a datetime column. Rolling Z-Score uses
+    the mean and std of the window without the point itself (a window that
+    includes it caps |z| at (n-1)/sqrt(n), so small windows could never flag
+    anything); Rolling Median/MAD uses the rolling median and the rolling
+    median of absolute deviations from it. Rows with a missing order value,
+    or too few neighbours, get NaN and are never flagged.
+    """
+    positions = order_positions(data, order_by, group_by)
+    if order_by is not None:
+        order_values = data[order_by].iloc[positions]
+        positions = positions[order_values.notna().to_numpy()]
+    
+    values = pd.Series(data[column].to_numpy(dtype=float, na_value=np.nan)[positions])
+    if isinstance(window, str):
+        values.index = pd.DatetimeIndex(data[order_by].to_numpy()[positions])
+    
+    def rolling(series):
+        if group_by:
+            keys = [data[col].to_numpy()[positions] for col in group_by]
+            # Groups are contiguous after sorting, so the results keep the row order
+            series = series.groupby(keys, sort=False, dropna=False)
+        return series.rolling(window, center=True, min_periods=ROLLING_MIN_PERIODS)
+    
+    if method == "Rolling Z-Score":
+        count = rolling(values).count().to_numpy()
+        mean = rolling(values).mean().to_numpy()
+        squares = rolling(values).var().to_numpy() * (count - 1)
+        
+        # Take the point out of its window: leave-one-out mean and sum of squared deviations
+        x = values.to_numpy()
+        own = ~np.isnan(x)
+        neighbours = count - own
+        with np.errstate(invalid='ignore', divide='ignore'):
+            center = np.where(own, (count * mean - x) / neighbours, mean)
+            squares = np.where(own, squares - (x - mean) * (x - center), squares)
+            spread = np.sqrt(np.maximum(squares, 0) / (neighbours - 1))
+        too_few = ~(neighbours >= ROLLING_MIN_PERIODS)
+        center[too_few] = np.nan
+        spread[too_few] = np.nan
+    else:
+        center = rolling(values).median().to_numpy()
+        deviation = pd.Series(np.abs(values.to_numpy() - center), index=values.index)
+        spread = rolling(deviation).median().to_numpy() * MAD_SCALE
+    
+    stats = {'center': np.full(len(data), np.nan), 'spread': np.full(len(data), np.nan)}
+    stats['center'][positions] = center
+    stats['spread'][positions] = spread
+    return stats
+
+def cached_rolling_statistics(data, column, order_by, window, method, group_by=None):
+    """Rolling statistics reused per dataset version and window, so threshold changes only re-threshold"""
+    cache = versioned_cache('rolling_statistics', data)
+    key = (column, order_by, window, method, tuple(group_by or []))
+    
+    if key not in cache:
+        cache[key] = rolling_statistics(data, column, order_by, window, method, group_by)
+    
+    return cache[key]
+
+def rolling_bounds(stats, factor):
+    """Per-row lower/upper bounds at factor rolling spreads from the rolling centre"""
+    return stats['center'] - factor * stats['spread'], stats['center'] + factor * stats['spread']
+
+def rolling_outlier_mask(data, column, stats, factor):
+    """Rows whose value lies outside its rolling bounds"""
+    lower, upper = rolling_bounds(stats, factor)
+    values = data[column].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return (values < lower) | (values > upper)
+
+def apply_rolling_outliers(data, column, stats, factor, action):
+    """Remove rows flagged against their rolling bounds, cap them at those bounds, or replace them with the rolling centre"""
+    mask = rolling_outlier_mask(data, column, stats, factor)
+    if action == "Remove Outliers":
+        return data[~mask]
+    
+    lower, upper = rolling_bounds(stats, factor)
+    if action == "Cap at Boundaries":
+        replacement = np.clip(data[column].to_numpy(dtype=float, na_value=np.nan), lower, upper)
+    else:
+        replacement = stats['center']
+    
+    data = data.copy(deep=False)
+    replacement = pd.Series(replacement, index=data.index)
+    data[column] = widen_to_fit(data[column], replacement[mask]).mask(mask, replacement)
+    return data
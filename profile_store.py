@@ -0,0 +1,295 @@
+import os
+import io
+import json
+import shutil
+import hashlib
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+
+# Local directory holding one snapshot folder per dataset content hash
+PROFILE_CACHE_DIR = os.getenv("DATAGENT_PROFILE_CACHE", os.path.join(".cache", "profiles"))
+
+# Total size the snapshot cache may grow to before the oldest snapshots are evicted
+PROFILE_CACHE_MAX_MB = float(os.getenv("DATAGENT_PROFILE_CACHE_MB", "500"))
+
+MANIFEST_NAME = "profile.json"
+
+# Object column contents that Arrow can store without conversion
+ARROW_SAFE_INFERRED_TYPES = {'string', 'empty', 'boolean', 'integer', 'floating', 'bytes', 'decimal'}
+
+def content_hash(raw_bytes):
+    """Hash of the uploaded file's bytes, used as the snapshot key"""
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+def dataset_version(raw_bytes, optimized=False):
+    """Snapshot key of an upload: its content hash, kept apart when column types were optimized on upload"""
+    key = content_hash(raw_bytes)
+    return f"{key}-optimized" if optimized else key
+
+def snapshot_path(key):
+    return os.path.join(PROFILE_CACHE_DIR, key)
+
+def has_snapshot(key, schema_version):
+    """True if a readable snapshot with the given schema exists for this key"""
+    manifest = read_manifest(snapshot_path(key))
+    return manifest is not None and manifest.get('schema_version') == schema_version
+
+def save_snapshot(key, results, schema_version):
+    """
+    Persist profile section results under the cache directory.
+    Scalars and structure go to JSON, frames/series/arrays to Parquet.
+    """
+    target = snapshot_path(key)
+    staging = target + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    
+    writer = _SnapshotWriter(staging)
+    manifest = {
+        'key': key,
+        'schema_version': schema_version,
+        'sections': {name: writer.encode(value) for name, value in results.items()}
+    }
+    with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    
+    # Swap the finished snapshot in so readers never see a partial one
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    
+    evict_snapshots()
+
+def load_snapshot(key, schema_version):
+    """Return the stored section results for this key, or None if unavailable"""
+    path = snapshot_path(key)
+    manifest = read_manifest(path)
+    if manifest is None or manifest.get('schema_version') != schema_version:
+        return None
+    
+    try:
+        reader = _SnapshotReader(path)
+        results = {name: reader.decode(value) for name, value in manifest['sections'].items()}
+    except Exception:
+        # Corrupt or foreign snapshot - drop it and let the caller recompute
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+    
+    # Mark as recently used for eviction
+    os.utime(path)
+    return results
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def evict_snapshots(max_mb=None):
+    """Remove least recently used snapshots until the cache fits in max_mb"""
+    max_bytes = (PROFILE_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    if not os.path.isdir(PROFILE_CACHE_DIR):
+        return
+    
+    snapshots = []
+    for name in os.listdir(PROFILE_CACHE_DIR):
+        path = os.path.join(PROFILE_CACHE_DIR, name)
+        if os.path.isdir(path) and not name.endswith(".tmp"):
+            snapshots.append((os.path.getmtime(path), _directory_size(path), path))
+    
+    total = sum(size for _, size, _ in snapshots)
+    for _, size, path in sorted(snapshots):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+def _directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+def export_snapshot(key):
+    """Return a snapshot as zip archive bytes for download"""
+    path = snapshot_path(key)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(os.listdir(path)):
+            archive.write(os.path.join(path, name), arcname=name)
+    return buffer.getvalue()
+
+def import_snapshot(archive_bytes, key, schema_version):
+    """
+    Attach an exported snapshot to the dataset identified by key.
+    Returns the key the snapshot was originally computed for.
+    """
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        names = archive.namelist()
+        if MANIFEST_NAME not in names:
+            raise ValueError("Archive does not contain a profile snapshot")
+        
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        if manifest.get('schema_version') != schema_version:
+            raise ValueError(
+                f"Snapshot schema {manifest.get('schema_version')} does not match "
+                f"this version of DataGent ({schema_version})"
+            )
+        
+        target = snapshot_path(key)
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in names:
+            # Only flat member names are valid; anything else could escape the cache dir
+            if os.path.basename(name) != name:
+                raise ValueError(f"Unexpected file in archive: {name}")
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(archive.read(name))
+    
+    source_key = manifest.get('key')
+    manifest['key'] = key
+    with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    evict_snapshots()
+    return source_key
+
+class _SnapshotWriter:
+    """Encodes section results into JSON-compatible structures plus Parquet files"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+    
+    def encode(self, value):
+        if isinstance(value, pd.DataFrame):
+            return {'__frame__': self._write_frame(value)}
+        if isinstance(value, pd.Series):
+            name = value.name if isinstance(value.name, (str, int, float)) else None
+            return {'__series__': self._write_frame(value.to_frame('values')), 'name': name}
+        if isinstance(value, np.ndarray):
+            return {'__array__': self._write_frame(pd.DataFrame({'values': value.ravel()})),
+                    'shape': list(value.shape)}
+        if isinstance(value, dict):
+            # Keys are often column names, which are not always strings
+            return {'__dict__': [[self.encode(k), self.encode(v)] for k, v in value.items()]}
+        if isinstance(value, (list, tuple)):
+            return [self.encode(v) for v in value]
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and not np.isfinite(value):
+            return {'__float__': repr(value)}
+        return value
+    
+    def _write_frame(self, frame):
+        """Write a frame to Parquet; labels are stored in the manifest to keep any type"""
+        self.count += 1
+        file_name = f"part-{self.count:03d}.parquet"
+        
+        flat = pd.concat([frame.index.to_frame(index=False), frame.reset_index(drop=True)], axis=1)
+        flat.columns = [f"c{i}" for i in range(flat.shape[1])]
+        
+        json_columns = []
+        for i, col in enumerate(flat.columns):
+            # Mixed-type object columns (e.g. column names 5 and 'a') cannot be stored in Arrow;
+            # keep each value as JSON so labels come back with their type
+            if flat[col].dtype == object and pd.api.types.infer_dtype(flat[col]) not in ARROW_SAFE_INFERRED_TYPES:
+                flat[col] = flat[col].map(lambda v: json.dumps(_label(v)))
+                json_columns.append(i)
+        
+        flat.to_parquet(os.path.join(self.path, file_name), index=False, compression='zstd')
+        return {
+            'file': file_name,
+            'index': [_label(name) for name in frame.index.names],
+            'columns': [_label(c) for c in frame.columns],
+            'json_columns': json_columns
+        }
+
+class _SnapshotReader:
+    """Decodes structures written by _SnapshotWriter"""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def decode(self, value):
+        if isinstance(value, dict):
+            if '__frame__' in value:
+                return self._read_frame(value['__frame__'])
+            if '__series__' in value:
+                series = self._read_frame(value['__series__'])['values']
+                series.name = value.get('name')
+                return series
+            if '__array__' in value:
+                flat = self._read_frame(value['__array__'])['values'].to_numpy()
+                return flat.reshape(value['shape'])
+            if '__dict__' in value:
+                return {_hashable(self.decode(k)): self.decode(v) for k, v in value['__dict__']}
+            if '__float__' in value:
+                return float(value['__float__'])
+            return {k: self.decode(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.decode(v) for v in value]
+        return value
+    
+    def _read_frame(self, meta):
+        frame = pd.read_parquet(os.path.join(self.path, meta['file']))
+        for i in meta.get('json_columns', []):
+            frame[frame.columns[i]] = frame[frame.columns[i]].map(lambda text: _unlabel(json.loads(text))).astype(object)
+        levels = len(meta['index'])
+        frame = frame.set_index(list(frame.columns[:levels]))
+        frame.index.names = [_unlabel(name) for name in meta['index']]
+        frame.columns = [_unlabel(label) for label in meta['columns']]
+        return frame
+
+def _label(value):
+    """JSON-safe representation of a column/index label"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, tuple):
+        return {'__tuple__': [_label(v) for v in value]}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def _unlabel(label):
+    if isinstance(label, dict) and '__tuple__' in label:
+        return tuple(_unlabel(v) for v in label['__tuple__'])
+    return label
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+def build_snapshot(file_path, output_path):
+    """Profile a file outside the app and write an importable snapshot archive"""
+    from data_profiling import PROFILE_SECTIONS, PROFILE_SCHEMA_VERSION
+    
+    with open(file_path, 'rb') as f:
+        raw_bytes = f.read()
+    
+    if file_path.lower().endswith(('.xls', '.xlsx')):
+        data = pd.read_excel(io.BytesIO(raw_bytes))
+    else:
+        data = pd.read_csv(io.BytesIO(raw_bytes))
+    
+    key = content_hash(raw_bytes)
+    results = {name: compute(data) for name, compute in PROFILE_SECTIONS.items()}
+    save_snapshot(key, results, PROFILE_SCHEMA_VERSION)
+    
+    with open(output_path, 'wb') as f:
+        f.write(export_snapshot(key))
+    return key
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute a DataGent profile snapshot for a CSV or Excel file")
+    parser.add_argument("file", help="CSV or Excel file to profile")
+    parser.add_argument("-o", "--output", default="profile_snapshot.zip", help="Snapshot archive to write")
+    args = parser.parse_args()
+    
+    key = build_snapshot(args.file, args.output)
+    print(f"Wrote profile snapshot {key[:12]} to {args.output}")
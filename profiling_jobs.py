@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, Future
+import streamlit as st
+
+# Shared pool for profiling work. Threads are used instead of processes so the
+# dataset is shared with the workers rather than pickled for every section;
+# the heavy pandas/numpy kernels release the GIL for most of their runtime.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1),
+    thread_name_prefix="profiling"
+)
+
+class ProfilingJob:
+    """A set of profiling sections computed in the background for one dataset version"""
+    
+    def __init__(self, version, data, sections, on_complete=None):
+        self.version = version
+        self.cancel_event = threading.Event()
+        self.on_complete = on_complete
+        self._pending = len(sections)
+        self._lock = threading.Lock()
+        self.futures = {
+            name: _EXECUTOR.submit(self._run_section, compute, data)
+            for name, compute in sections.items()
+        }
+        for future in self.futures.values():
+            future.add_done_callback(self._section_finished)
+    
+    @classmethod
+    def from_results(cls, version, results):
+        """Build an already finished job from previously computed section results"""
+        job = cls(version, None, {})
+        for name, result in results.items():
+            future = Future()
+            future.set_result(result)
+            job.futures[name] = future
+        return job
+    
+    def _run_section(self, compute, data):
+        """Run one section unless the job was cancelled before it started"""
+        raise_if_cancelled(self.cancel_event)
+        return compute(data, self.cancel_event)
+    
+    def _section_finished(self, future):
+        """Hand the full set of results to on_complete once every section succeeded"""
+        with self._lock:
+            self._pending -= 1
+            finished = self._pending == 0
+        
+        if not finished or self.on_complete is None or self.cancel_event.is_set():
+            return
+        if any(f.cancelled() or f.exception() is not None for f in self.futures.values()):
+            return
+        
+        self.on_complete({name: f.result() for name, f in self.futures.items()})
+    
+    def cancel(self):
+        """Stop pending sections and signal running ones to bail out"""
+        self.cancel_event.set()
+        for future in self.futures.values():
+            future.cancel()
+    
+    def is_ready(self, name):
+        return self.futures[name].done()
+    
+    def result(self, name):
+        """Return a finished section's result, or None while it is still running"""
+        future = self.futures[name]
+        if not future.done():
+            return None
+        return future.result()
+    
+    def error(self, name):
+        """Return the exception raised by a finished section, if any"""
+        future = self.futures[name]
+        if not future.done() or future.cancelled():
+            return None
+        return future.exception()
+    
+    def progress(self):
+        """Fraction of sections that have finished"""
+        done = sum(future.done() for future in self.futures.values())
+        return done / len(self.futures) if self.futures else 1.0
+    
+    def done(self):
+        return all(future.done() for future in self.futures.values())
+
+def raise_if_cancelled(cancel_event):
+    """Abort a section computation when its job has been cancelled"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError()
+
+def get_profiling_job(data, version, sections, load_results=None, on_complete=None):
+    """
+    Return the session's profiling job for this dataset version, starting a new
+    one (and cancelling the previous one) when the dataset has changed.
+    load_results may return previously stored results to skip the computation;
+    on_complete receives the results of a job that finished successfully.
+    """
+    job = st.session_state.get('profiling_job')
+    if job is not None and job.version == version:
+        return job
+    
+    if job is not None:
+        job.cancel()
+    
+    results = load_results() if load_results is not None else None
+    if results is not None:
+        job = ProfilingJob.from_results(version, results)
+    else:
+        job = ProfilingJob(version, data, sections, on_complete=on_complete)
+    st.session_state.profiling_job = job
+    return job
+
+def cancel_profiling_job():
+    """Cancel the session's profiling job, if one is running"""
+    job = st.session_state.get('profiling_job')
+    if job is not None:
+        job.cancel()
+        del st.session_state.profiling_job
@@ -0,0 +1,112 @@
+import hashlib
+import numpy as np
+import streamlit as st
+from utils import versioned_cache
+from data_export import (
+    EXPORT_FORMATS, TEXT_FORMATS, COMPRESSIONS, EXCEL_MAX_ROWS, export_bytes, export_dir, export_file_name,
+    export_mime, prune_exports, FORMAT_HELP
+)
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+# Sort orders kept per dataset version; older ones are dropped first
+MAX_CACHED_SORTS = 8
+
+def positions_digest(positions):
+    """Short digest of a row selection, for cache keys"""
+    return hashlib.blake2b(np.ascontiguousarray(positions).tobytes(), digest_size=16).hexdigest()
+
+def sorted_positions(data, positions, column, ascending=True):
+    """
+    Row positions (all rows if positions is None) ordered by a column,
+    missing values last and ties in row order. Cached per dataset version,
+    selection and sort, so paging through a sorted result sorts once.
+    """
+    cache = versioned_cache('result_sorts', data)
+    key = (None if positions is None else positions_digest(positions), column, ascending)
+    
+    if key not in cache:
+        values = data[column] if positions is None else data[column].iloc[positions]
+        order = values.reset_index(drop=True).sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        cache[key] = order if positions is None else positions[order]
+        while len(cache) > MAX_CACHED_SORTS:
+            del cache[next(iter(cache))]
+    
+    return cache[key]
+
+def reset_result_viewer(key):
+    """Forget a viewer's page, sort, column and export choices, e.g. when a new dataset is loaded"""
+    for name in [name for name in st.session_state if str(name).startswith(f"{key}_")]:
+        del st.session_state[name]
+
+def result_viewer(data, positions=None, key="result", file_name="result"):
+    """
+    Paginated view of data, or of the rows at positions. Only the visible
+    page is sent to the browser; sorting and column selection run on the
+    server, and the full result can be downloaded as a streamed export.
+    """
+    n_rows = len(data) if positions is None else len(positions)
+    all_columns = data.columns.tolist()
+    
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        columns = st.multiselect("Columns", all_columns, default=all_columns, key=f"{key}_columns") or all_columns
+    with col2:
+        sort_by = st.selectbox("Sort by", ["(row order)"] + all_columns, key=f"{key}_sort")
+    with col3:
+        ascending = st.toggle("Ascending", value=True, key=f"{key}_ascending")
+    
+    if sort_by != "(row order)":
+        positions = sorted_positions(data, positions, sort_by, ascending)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    n_pages = max(1, -(-n_rows // page_size))
+    # Keep the page valid when the result shrinks
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    with col2:
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+    
+    start = (page - 1) * page_size
+    if positions is None:
+        page_positions = np.arange(start, min(start + page_size, n_rows))
+    else:
+        page_positions = positions[start:start + page_size]
+    
+    st.dataframe(data[columns].iloc[page_positions], use_container_width=True)
+    if n_rows:
+        st.caption(f"Rows {start + 1:,}–{start + len(page_positions):,} of {n_rows:,} · {len(columns)} of {len(all_columns)} columns")
+    else:
+        st.caption("No rows match")
+    
+    with st.expander("📥 Export full result"):
+        export_format = st.selectbox("Format", list(EXPORT_FORMATS), key=f"{key}_export_format", help=FORMAT_HELP)
+        compression = "none"
+        if export_format in TEXT_FORMATS:
+            compression = st.selectbox("Compression", COMPRESSIONS, key=f"{key}_export_compression")
+        
+        if export_format == "Excel (XLSX)" and n_rows >= EXCEL_MAX_ROWS:
+            st.error(f"❌ Excel sheets hold at most {EXCEL_MAX_ROWS - 1:,} rows; choose another format")
+            return
+        
+        # Written in chunks straight from the selected rows when the download is clicked
+        prune_exports()
+        cache = versioned_cache('exports', data)
+        directory = export_dir()
+        export_data = data[columns]
+        
+        def export():
+            digest = None if positions is None else positions_digest(positions)
+            export_key = (key, export_format, compression, tuple(columns), digest)
+            return export_bytes(cache, export_key, export_data, export_format, compression, None, directory, positions)
+        
+        st.download_button(
+            label=f"📥 Download {n_rows:,} rows",
+            data=export,
+            file_name=export_file_name(export_format, compression, file_name),
+            mime=export_mime(export_format, compression),
+            key=f"{key}_download",
+            use_container_width=True
+        )
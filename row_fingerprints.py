@@ -0,0 +1,90 @@
+import numbers
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+
+# Constants for mixing per-column hashes into one row hash
+_HASH_SEED = np.uint64(0x345678)
+_HASH_MULTIPLIER = np.uint64(1000003)
+
+def value_kind(value):
+    """'number' for any numeric value, otherwise the type name"""
+    return 'number' if isinstance(value, (numbers.Number, np.bool_)) else type(value).__name__
+
+def column_fingerprints(series):
+    """64-bit hash of every value in a column (all missing markers hash equal)"""
+    if pd.api.types.is_float_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        # -0.0 and NaN payloads have different bit patterns but compare as duplicates
+        series = (series + 0.0).where(series.notna())
+    
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    
+    if series.dtype == object and pd.api.types.infer_dtype(series) in ('mixed', 'mixed-integer', 'mixed-integer-float'):
+        # Object values are hashed by their text, so keep 1 and '1' apart;
+        # equal numbers (1, 1.0, True) stay one value, as in duplicated
+        kinds = series.map(value_kind).where(series.notna(), 'missing')
+        hashes = combine_fingerprints([hashes, pd.util.hash_pandas_object(kinds, index=False).to_numpy()])
+    
+    return hashes
+
+def combine_fingerprints(column_hashes):
+    """Mix per-column hash arrays into one 64-bit hash per row"""
+    with np.errstate(over='ignore'):
+        combined = np.full(len(column_hashes[0]), _HASH_SEED, dtype=np.uint64)
+        multiplier = _HASH_MULTIPLIER
+        for i, hashes in enumerate(column_hashes):
+            combined ^= hashes
+            combined *= multiplier
+            multiplier += np.uint64(82520 + 2 * (len(column_hashes) - i))
+    return combined
+
+def row_fingerprints(data, subset=None):
+    """
+    64-bit hash per row over all columns or a subset. Equal rows always get
+    equal hashes; distinct rows collide with negligible probability (~n²/2⁶⁵).
+    """
+    columns = list(data.columns) if subset is None else list(subset)
+    if not columns or len(data) == 0:
+        return np.zeros(len(data), dtype=np.uint64)
+    return combine_fingerprints([column_fingerprints(data[col]) for col in columns])
+
+def get_row_fingerprints(data, subset=None):
+    """
+    Row hashes for data, reused until the frame changes.
+    Column hashes are cached individually so any subset only costs a cheap combine.
+    """
+    cache = versioned_cache('row_fingerprints', data)
+    columns = list(data.columns) if not subset else list(subset)
+    key = tuple(columns)
+    
+    if key not in cache:
+        column_cache = cache.setdefault('columns', {})
+        for col in columns:
+            if col not in column_cache:
+                column_cache[col] = column_fingerprints(data[col])
+        
+        if not columns or len(data) == 0:
+            cache[key] = np.zeros(len(data), dtype=np.uint64)
+        else:
+            cache[key] = combine_fingerprints([column_cache[col] for col in columns])
+    
+    return cache[key]
+
+def duplicated_mask(data, subset=None, keep='first'):
+    """Positional boolean mask equivalent to data.duplicated(subset, keep)"""
+    cache = versioned_cache('duplicated_masks', data)
+    key = (tuple(subset) if subset else None, keep)
+    
+    if key not in cache:
+        hashes = get_row_fingerprints(data, subset)
+        cache[key] = pd.Series(hashes).duplicated(keep=keep).to_numpy()
+    
+    return cache[key]
+
+def count_duplicates(data, subset=None):
+    """Number of rows that repeat an earlier row"""
+    return int(duplicated_mask(data, subset, keep='first').sum())
+
+def drop_duplicate_rows(data, subset=None, keep='first'):
+    """Equivalent of data.drop_duplicates(subset, keep) driven by the fingerprint index"""
+    return data[~duplicated_mask(data, subset, keep)]
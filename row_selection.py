@@ -0,0 +1,54 @@
+import weakref
+import numpy as np
+import streamlit as st
+from utils import versioned_cache
+
+def set_row_selection(data, positions):
+    """
+    Share the filtered rows (sorted row positions) with the other sections;
+    None clears the selection. An unchanged selection keeps its array, so
+    results derived from it stay cached. Returns the stored positions.
+    """
+    if positions is None:
+        st.session_state.pop('row_selection', None)
+        return None
+    
+    selection = st.session_state.get('row_selection')
+    if selection is not None and selection['frame']() is data and np.array_equal(selection['positions'], positions):
+        return selection['positions']
+    
+    st.session_state.row_selection = {'frame': weakref.ref(data), 'positions': positions}
+    return positions
+
+def get_row_selection(data):
+    """Positions of the shared selection, or None if there is none for this dataset version"""
+    selection = st.session_state.get('row_selection')
+    if selection is None or selection['frame']() is not data:
+        return None
+    return selection['positions']
+
+def select_rows(data, positions=None, columns=None):
+    """
+    Only the given columns (all if None; None entries are skipped) of the
+    selected rows. Without a selection this is a lazy copy of the columns,
+    so sections gather just the values they use.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(col for col in columns if col is not None))
+    subset = data if columns is None else data[columns]
+    return subset if positions is None else subset.iloc[positions]
+
+def selected_frame(data, positions=None):
+    """All columns of the selected rows, gathered once per selection for code that needs a whole frame"""
+    if positions is None:
+        return data
+    
+    cache = versioned_cache('selected_frames', data)
+    if 'frame' not in cache or cache['frame'][0] is not positions:
+        cache['frame'] = (positions, data.iloc[positions])
+    return cache['frame'][1]
+
+def selection_caption(data, positions):
+    """Note that a section works on the filtered rows"""
+    if positions is not None:
+        st.caption(f"🔎 Using the {len(positions):,} of {len(data):,} rows selected in Interactive Data Filtering")
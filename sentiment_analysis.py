@@ -10,6 +10,9 @@ import re
 import string
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
+from date_parsing import to_datetime_column
+from string_dictionary import cached_apply, apply_to_uniques, is_text_dtype
+from row_selection import select_rows, selection_caption
 
 # Download required NLTK resources (only needed once)
 nltk.download('vader_lexicon')
@@ -40,23 +43,28 @@ def text_preprocessing(text):
     # Join tokens back into a string
     return ' '.join(tokens)
 
-def sentiment_analysis_section(data):
+def sentiment_analysis_section(data, positions=None):
     st.markdown("### Sentiment Analysis")
+    selection_caption(data, positions)
     
     # Select text column for sentiment analysis
     text_column = st.selectbox("Select a text column for sentiment analysis", data.columns)
     
     if st.button("Perform Sentiment Analysis"):
-        if data[text_column].dtype == "object":
+        source = data
+        # Only the text and date columns of the selected rows; the result columns don't leak into the shared upload
+        data = select_rows(data, positions, [text_column] + [col for col in data.columns if 'date' in col.lower()])
+        
+        if is_text_dtype(data[text_column].dtype):
             
-            # Preprocess text data
-            data['Clean_Text'] = data[text_column].apply(lambda x: text_preprocessing(str(x)))
+            # Preprocess each distinct text once, reused until the data changes
+            data['Clean_Text'] = cached_apply(source, text_column, lambda x: text_preprocessing(str(x)), 'sentiment_clean_text', na_value='', positions=positions)
             
             # Initialize sentiment analyzer
             sia = SentimentIntensityAnalyzer()
             
-            # Perform sentiment analysis
-            data['Sentiment'] = data['Clean_Text'].apply(lambda x: sia.polarity_scores(x)['compound'])
+            # Perform sentiment analysis on each distinct cleaned text
+            data['Sentiment'] = apply_to_uniques(data['Clean_Text'], lambda x: sia.polarity_scores(x)['compound']).astype(float)
             
             # Create sentiment labels with improved thresholds
             data['Sentiment_Label'] = pd.cut(
@@ -151,7 +159,7 @@ def sentiment_analysis_section(data):
                 if date_column in data.columns:
                     
                     # Ensure date is in datetime format
-                    data[date_column] = pd.to_datetime(data[date_column])
+                    data[date_column] = to_datetime_column(data[date_column])
                     
                     # Group by date and calculate sentiment counts
                     daily_sentiment = data.groupby(pd.Grouper(key=date_column, freq='D'))['Sentiment_Label'].value_counts().unstack().fillna(0)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+
+def is_text_dtype(dtype):
+    """Object, string and categorical-of-text columns all hold text"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return pd.api.types.is_string_dtype(dtype)
+
+def text_columns(data):
+    """Columns holding text, including ones stored as categories by the type optimizer"""
+    return [col for col, dtype in data.dtypes.items() if is_text_dtype(dtype)]
+
+def factorize_column(data, column):
+    """Integer codes and unique values of a column (-1 marks missing), computed once per dataset version"""
+    cache = versioned_cache('string_dictionaries', data)
+    
+    if column not in cache:
+        codes, uniques = pd.factorize(data[column])
+        cache[column] = (codes, np.asarray(uniques, dtype=object))
+    
+    return cache[column]
+
+def map_codes(codes, unique_results, na_value=None):
+    """Expand one result per unique value back to one per row; missing rows get na_value"""
+    results = np.empty(len(unique_results) + 1, dtype=object)
+    results[:-1] = unique_results
+    results[-1] = na_value
+    # Code -1 picks the trailing na_value
+    return results[codes]
+
+def apply_to_uniques(series, func, na_value=None):
+    """Apply func to each distinct value of a column only, returning a per-row Series"""
+    codes, uniques = pd.factorize(series)
+    return pd.Series(map_codes(codes, [func(value) for value in uniques], na_value), index=series.index, name=series.name)
+
+def cached_apply(data, column, func, key, na_value=None, positions=None):
+    """
+    apply_to_uniques with the per-unique results cached per dataset
+    version under key, so reruns skip the work entirely. With positions
+    only those rows are returned, and func runs only on the distinct
+    values they hold that have not been computed yet.
+    """
+    cache = versioned_cache('string_results', data)
+    codes, uniques = factorize_column(data, column)
+    
+    if (column, key) not in cache:
+        cache[(column, key)] = {'results': np.empty(len(uniques), dtype=object), 'done': np.zeros(len(uniques), dtype=bool)}
+    entry = cache[(column, key)]
+    
+    row_codes = codes if positions is None else codes[positions]
+    needed = np.zeros(len(uniques), dtype=bool)
+    needed[row_codes[row_codes >= 0]] = True
+    for code in np.flatnonzero(needed & ~entry['done']):
+        entry['results'][code] = func(uniques[code])
+        entry['done'][code] = True
+    
+    index = data.index if positions is None else data.index[positions]
+    return pd.Series(map_codes(row_codes, entry['results'], na_value), index=index, name=column)
+
+def pattern_mask(codes, uniques, pattern, allow_missing=False):
+    """
+    Rows whose value matches the regex from its start; the regex runs once
+    per unique value. Missing values fail unless allow_missing is set.
+    """
+    matches = pd.Series(uniques, dtype=object).astype(str).str.match(pattern, na=False).to_numpy(dtype=bool)
+    return np.append(matches, allow_missing)[codes]
+
+def column_uniques(data, column):
+    """Distinct non-missing values of a column in order of appearance"""
+    return factorize_column(data, column)[1]
+
+def isin_mask(data, column, values):
+    """Rows whose value is one of values, compared on the codes rather than the strings"""
+    codes, uniques = factorize_column(data, column)
+    selected = np.flatnonzero(pd.Index(uniques).isin(values))
+    return np.isin(codes, selected)
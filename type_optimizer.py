@@ -0,0 +1,211 @@
+import sys
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+
+# Candidate integer types, smallest first
+UNSIGNED_TYPES = ['uint8', 'uint16', 'uint32', 'uint64']
+SIGNED_TYPES = ['int8', 'int16', 'int32', 'int64']
+
+# Rows sampled to estimate string sizes when predicting category savings
+CATEGORY_SAMPLE_ROWS = 10_000
+
+def column_bytes(series):
+    """Exact memory held by a column's values (no index)"""
+    return int(series.memory_usage(deep=True, index=False))
+
+def smallest_integer_type(col_min, col_max, nullable=False):
+    """Smallest integer dtype holding [col_min, col_max]; nullable names when missing values must be kept"""
+    candidates = UNSIGNED_TYPES if col_min >= 0 else SIGNED_TYPES
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= col_min and col_max <= info.max:
+            return dtype.capitalize().replace('Uint', 'UInt') if nullable else dtype
+    return None
+
+def optimize_integers(series):
+    """Downcast an integer column (numpy or nullable) to the smallest type that holds its range"""
+    values = series.dropna()
+    if values.empty:
+        return None
+    
+    nullable = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+    target = smallest_integer_type(int(values.min()), int(values.max()), nullable)
+    if target is None or target == str(series.dtype):
+        return None
+    return series.astype(target)
+
+def optimize_floats(series):
+    """
+    Integer-valued floats become (nullable) integers; other floats become
+    float32 only if every value survives the round trip unchanged.
+    """
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    observed = values[~np.isnan(values)]
+    if observed.size == 0 or not np.isfinite(observed).all():
+        return None
+    
+    if (np.mod(observed, 1) == 0).all() and np.abs(observed).max() < 2 ** 53:
+        has_missing = observed.size < values.size
+        target = smallest_integer_type(int(observed.min()), int(observed.max()), nullable=has_missing)
+        return series.astype(target)
+    
+    if series.dtype == np.float64 and np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+        return series.astype('float32')
+    return None
+
+def optimize_text(series):
+    """
+    Booleans stored as objects become bool/boolean. Text columns become a
+    category or an Arrow-backed string column, whichever is smaller than
+    the current column, measured exactly.
+    """
+    inferred = pd.api.types.infer_dtype(series, skipna=True)
+    if inferred == 'boolean':
+        return series.astype('boolean' if series.isna().any() else 'bool')
+    if inferred != 'string':
+        return None
+    
+    codes, uniques = pd.factorize(series)
+    candidates = [pd.Series(pd.Categorical.from_codes(codes, uniques), index=series.index, name=series.name)]
+    if series.dtype == object:
+        try:
+            candidates.append(series.astype(pd.StringDtype('pyarrow')))
+        except ImportError:
+            # Arrow-backed strings need pyarrow
+            pass
+    
+    best = min(candidates, key=column_bytes)
+    return best if column_bytes(best) < column_bytes(series) else None
+
+def category_code_bytes(n_categories):
+    """Width of the codes pandas stores for a categorical with this many categories"""
+    for dtype in SIGNED_TYPES:
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype).itemsize
+    return 8
+
+def value_bytes(values, dtype):
+    """Average bytes per value when values are held in a column of dtype"""
+    if len(values) == 0:
+        return 0.0
+    if dtype == object:
+        # Pointer plus the Python object, as memory_usage(deep=True) counts it
+        return 8 + np.mean([sys.getsizeof(value) for value in values])
+    if pd.api.types.is_string_dtype(dtype):
+        # UTF-8 bytes plus an offset per value (Arrow large strings use 8-byte offsets)
+        return 8 + np.mean([len(str(value).encode('utf-8')) for value in values])
+    return np.dtype(getattr(dtype, 'numpy_dtype', dtype)).itemsize
+
+def estimate_category_bytes(series, sample_rows=CATEGORY_SAMPLE_ROWS, seed=0):
+    """
+    Predict the memory of a column before and after conversion to category
+    without converting it: one nunique pass plus string sizes measured on a
+    sample. After = codes width per row plus the dictionary of unique values.
+    Columns that are not object-backed are measured exactly for "before".
+    """
+    n = len(series)
+    n_unique = series.nunique()
+    positions = np.sort(np.random.default_rng(seed).choice(n, min(n, sample_rows), replace=False))
+    sample = series.iloc[positions]
+    
+    if series.dtype == object:
+        current = n * value_bytes(sample.to_numpy(), object)
+    else:
+        current = column_bytes(series)
+    
+    sample_uniques = sample.dropna().unique()
+    dictionary_dtype = pd.Index(sample_uniques).dtype
+    category = n * category_code_bytes(n_unique) + n_unique * value_bytes(sample_uniques, dictionary_dtype)
+    return {'unique': n_unique, 'current': int(current), 'category': int(category)}
+
+def category_estimates(data, columns):
+    """Category conversion estimates per column, computed once per dataset version"""
+    cache = versioned_cache('category_estimates', data)
+    for col in columns:
+        if col not in cache:
+            cache[col] = estimate_category_bytes(data[col])
+    return {col: cache[col] for col in columns}
+
+def optimize_column(series):
+    """Lossless smaller representation of a column, or None if there is none"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype):
+        return optimize_integers(series)
+    if pd.api.types.is_float_dtype(dtype):
+        return optimize_floats(series)
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        return optimize_text(series)
+    return None
+
+def optimize_dtypes(data):
+    """
+    Convert every column that has a lossless smaller representation.
+    Returns the optimized frame and a report of the converted columns with
+    exact bytes before and after.
+    """
+    optimized = data.copy(deep=False)
+    rows = []
+    for col in data.columns:
+        converted = optimize_column(data[col])
+        if converted is None:
+            continue
+        
+        before, after = column_bytes(data[col]), column_bytes(converted)
+        if after >= before:
+            continue
+        optimized[col] = converted
+        rows.append({'Column': col, 'From': str(data[col].dtype), 'To': str(converted.dtype),
+                     'Bytes Before': before, 'Bytes After': after})
+    
+    report = pd.DataFrame(rows, columns=['Column', 'From', 'To', 'Bytes Before', 'Bytes After'])
+    return optimized, report
+
+def widen_to_fit(series, values):
+    """
+    Integer and boolean columns cannot store fractional or out-of-range
+    values (nullable ones raise instead of upcasting), and categoricals
+    cannot store values outside their categories. Return the column as
+    float, or with the new categories added, when values would not fit,
+    otherwise unchanged.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        new = pd.unique(pd.Series(np.ravel(values), dtype=object).dropna())
+        new = [value for value in new if value not in dtype.categories]
+        return series.cat.add_categories(new) if new else series
+    if not (pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)):
+        return series
+    
+    numbers = pd.to_numeric(pd.Series(np.ravel(values), dtype=object).dropna(), errors='coerce')
+    if pd.api.types.is_bool_dtype(dtype):
+        fits = numbers.isin([0, 1]).all()
+    else:
+        info = np.iinfo(getattr(dtype, 'numpy_dtype', dtype))
+        fits = ((numbers % 1 == 0) & numbers.between(info.min, info.max)).all()
+    if fits:
+        return series
+    
+    nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype)
+    return series.astype('Float64' if nullable else 'float64')
+
+def widen_columns(data, values):
+    """Apply widen_to_fit to every column of a {column: values} mapping or frame before a fillna"""
+    widened = {}
+    for col, col_values in values.items():
+        column = widen_to_fit(data[col], col_values)
+        if column is not data[col]:
+            widened[col] = column
+    
+    if not widened:
+        return data
+    data = data.copy(deep=False)
+    for col, column in widened.items():
+        data[col] = column
+    return data
+
+def fill_with(series, value):
+    """fillna that widens integer, boolean and categorical columns when the value would not fit"""
+    return widen_to_fit(series, value).fillna(value)
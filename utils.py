@@ -0,0 +1,28 @@
+import weakref
+import streamlit as st
+
+# Number of dataset versions kept per cache namespace (e.g. raw upload + cleaned data)
+CACHE_MAX_ENTRIES = 4
+
+def versioned_cache(namespace, data):
+    """
+    Return a dict for caching values derived from data.
+    Session frames are never modified in place (every cleaning step, undo
+    and redo makes a new frame), so each frame object is one dataset version
+    and the dict is reused for as long as the same frame is passed.
+    """
+    caches = st.session_state.setdefault('versioned_caches', {})
+    entries = caches.setdefault(namespace, [])
+    
+    for i, entry in enumerate(entries):
+        if entry['frame']() is data:
+            # Most recently used last, so frames in use are evicted last
+            entries.append(entries.pop(i))
+            return entry['values']
+    
+    # Drop entries for frames that were garbage collected
+    entries[:] = [entry for entry in entries if entry['frame']() is not None][-(CACHE_MAX_ENTRIES - 1):]
+    
+    entry = {'frame': weakref.ref(data), 'values': {}}
+    entries.append(entry)
+    return entry['values']
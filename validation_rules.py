@@ -0,0 +1,142 @@
+import re
+import json
+import numpy as np
+import pandas as pd
+from utils import versioned_cache
+from row_fingerprints import row_fingerprints
+from string_dictionary import pattern_mask
+
+RULES_VERSION = 1
+
+# Rule types and the fields each one needs besides its name
+RULE_TYPES = {
+    "Range": ['column'],
+    "Not Null": ['column'],
+    "Pattern": ['column', 'argument'],
+    "Unique": ['column'],
+    "Expression": ['argument']
+}
+
+def make_rule(name, rule_type, column=None, min_value=None, max_value=None, argument=None, allow_missing=False):
+    """
+    A rule as a plain dict. argument is the regex for Pattern rules and a
+    boolean column expression (pandas eval syntax, e.g. "start <= end and
+    price * qty == total") for Expression rules; rows where it is not true
+    violate the rule. Missing values violate Pattern rules unless
+    allow_missing is set; Range rules never flag them (use Not Null).
+    """
+    return {'name': name, 'type': rule_type, 'column': column,
+            'min': min_value, 'max': max_value, 'argument': argument, 'allow_missing': bool(allow_missing)}
+
+def check_rules(data, rules):
+    """Problems with rule definitions against this dataset, one message per bad rule"""
+    problems = []
+    for rule in rules:
+        label = f"Rule '{rule.get('name')}'"
+        if rule.get('type') not in RULE_TYPES:
+            problems.append(f"{label}: unknown rule type {rule.get('type')!r}")
+            continue
+        missing = [field for field in RULE_TYPES[rule['type']] if rule.get(field) in (None, "")]
+        if missing:
+            problems.append(f"{label}: needs {', '.join(missing)}")
+        elif rule.get('column') is not None and rule['type'] != "Expression" and rule['column'] not in data.columns:
+            problems.append(f"{label}: column {rule['column']!r} not in the data")
+        elif rule['type'] == "Pattern":
+            try:
+                re.compile(rule['argument'])
+            except re.error as e:
+                problems.append(f"{label}: invalid regex ({e})")
+    return problems
+
+def shared_column(shared, kind, data, column):
+    """Per-column work (numeric conversion, factorization, missing mask) done once for all rules on that column"""
+    key = (kind, column)
+    if key not in shared:
+        if kind == 'numeric':
+            shared[key] = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        elif kind == 'codes':
+            shared[key] = pd.factorize(data[column])
+        else:
+            codes = shared_column(shared, 'codes', data, column)[0]
+            shared[key] = codes == -1
+    return shared[key]
+
+def rule_violations(data, rule, shared):
+    """Boolean violation mask of one rule, reusing the per-column work in shared"""
+    rule_type, column = rule['type'], rule.get('column')
+    
+    if rule_type == "Range":
+        values = shared_column(shared, 'numeric', data, column)
+        violations = np.zeros(len(data), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if rule.get('min') is not None:
+                violations |= values < float(rule['min'])
+            if rule.get('max') is not None:
+                violations |= values > float(rule['max'])
+        return violations
+    if rule_type == "Not Null":
+        return shared_column(shared, 'missing', data, column)
+    if rule_type == "Pattern":
+        codes, uniques = shared_column(shared, 'codes', data, column)
+        return ~pattern_mask(codes, uniques, rule['argument'], rule.get('allow_missing', False))
+    if rule_type == "Unique":
+        return pd.Series(row_fingerprints(data, [column])).duplicated(keep=False).to_numpy()
+    
+    try:
+        result = data.eval(rule['argument'])
+    except Exception as e:
+        raise ValueError(f"Rule '{rule['name']}': cannot evaluate expression ({e})") from e
+    if not isinstance(result, pd.Series) or not (pd.api.types.is_bool_dtype(result.dtype) or result.dtype == object):
+        raise ValueError(f"Rule '{rule['name']}': expression must give True/False per row")
+    return ~result.fillna(False).to_numpy(dtype=bool)
+
+def evaluate_rules(data, rules):
+    """
+    Evaluate every rule over the data. Each rule is one vectorized pass;
+    a column is converted and factorized once for all the rules on it.
+    Returns the per-rule violation counts and a bitmap with one packed bit
+    row per rule; rows are only materialized later, for the rules asked
+    about.
+    """
+    shared = {}
+    bitmap = np.zeros((len(rules), (len(data) + 7) // 8), dtype=np.uint8)
+    counts = np.zeros(len(rules), dtype=np.int64)
+    for i, rule in enumerate(rules):
+        violations = rule_violations(data, rule, shared)
+        counts[i] = violations.sum()
+        bitmap[i] = np.packbits(violations)
+    return {'rules': rules, 'counts': counts, 'bitmap': bitmap, 'n_rows': len(data)}
+
+def cached_rule_evaluation(data, rules):
+    """Rule evaluation reused per dataset version and rule set"""
+    cache = versioned_cache('rule_evaluations', data)
+    key = json.dumps(rules, sort_keys=True, default=str)
+    
+    if key not in cache:
+        cache[key] = evaluate_rules(data, rules)
+    
+    return cache[key]
+
+def violation_mask(evaluation, rule_indices):
+    """Rows violating any of the given rules, unpacked from the bitmap"""
+    if not len(rule_indices):
+        return np.zeros(evaluation['n_rows'], dtype=bool)
+    packed = np.bitwise_or.reduce(evaluation['bitmap'][list(rule_indices)], axis=0)
+    return np.unpackbits(packed, count=evaluation['n_rows']).astype(bool)
+
+def save_rules(rules):
+    """Rule set JSON"""
+    return json.dumps({'version': RULES_VERSION, 'rules': rules}, indent=2, default=str)
+
+def load_rules(text):
+    """Parse rule set JSON, returning its rules"""
+    rule_set = json.loads(text)
+    if not isinstance(rule_set, dict) or rule_set.get('version') != RULES_VERSION:
+        raise ValueError(f"Unsupported rule set version: {rule_set.get('version') if isinstance(rule_set, dict) else None}")
+    
+    rules = rule_set.get('rules', [])
+    for rule in rules:
+        if rule.get('type') not in RULE_TYPES:
+            raise ValueError(f"Unknown rule type: {rule.get('type')}")
+    return [make_rule(rule.get('name'), rule['type'], rule.get('column'), rule.get('min'),
+                      rule.get('max'), rule.get('argument'), rule.get('allow_missing', False)) for rule in rules]